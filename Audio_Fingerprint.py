@@ -1,27 +1,60 @@
-import librosa
 import numpy as np
 from typing import Dict, List, Union
-from scipy.signal import find_peaks
 from typing import Union, Tuple
 import processing_and_searching as ps
 import json_ctrl
+from lazy_imports import lazy_import
+import fingerprint_params as fparams
+import landmarks
+import timing
+from fingerprint_record import Fingerprint_Record, PEAK_DTYPE
+from feature_registry import register_feature, profile_features, FEATURE_REGISTRY, HASH_FEATURES, Analysis_Context
+
+librosa = lazy_import('librosa')
+scipy_ndimage = lazy_import('scipy.ndimage')
+scipy_signal = lazy_import('scipy.signal')
 
 real_num = Union[int, float]
 
 class Audio_Fingerprint:
     """
 Create a finger print for an audio file. The finger print contains parameters as:\n
-path, audio_name, dimension(song, vocals, music), raw_features, hash_str.
+path, audio_name, dimension(song, vocals, music), raw_features, hash_str, landmarks.\n
+profile: which registered features are extracted into raw_features (see feature_registry.PROFILES),
+'index' for the database, 'query' for searches. Other features are computed on first `get_feature` call.\n
+The spectrogram is kept for those lazy features until `release_spectrogram`, `to_record` returns the compact
+`Fingerprint_Record` to keep instead.
     """
-    def __init__(self, audio_name:str, dimension, file_path, sampling_rate:real_num , spectrogram:np.ndarray):
+    def __init__(self, audio_name:str, dimension, file_path, sampling_rate:real_num , spectrogram:np.ndarray, peak_method:str = None, profile = 'index'):
             self.__audio_name = audio_name
             self.__path = file_path
             self.__dimension = dimension
             self.__sampling_rate = sampling_rate
             self.__sg = spectrogram
+            # intermediates shared by the extractors (power, dB, filterbanks, ...)
+            self.__context = Analysis_Context(spectrogram, sampling_rate)
+            # 'max_filter' (vectorized) or 'find_peaks' (per time frame)
+            self.__peak_method = peak_method or fparams.PEAK_METHOD
+            self.__profile = profile
+            # every feature computed so far, eager (profile) or lazy
+            self.__features: Dict = {}
+            self.__peaks_set = None
             
             self.__fingerprint = self.__create_fingerprint()
    
+    def release_spectrogram(self):
+        """
+        Drop the spectrogram and the analysis intermediates, only the features computed so far stay available.
+        """
+        self.__sg = None
+        self.__context = None
+        
+    def to_record(self) -> Fingerprint_Record:
+        """
+        return the compact record of the fingerprint (typed arrays, no spectrogram).
+        """
+        return Fingerprint_Record.from_fingerprint(self.__fingerprint)
+    
     def get_fingerprint(self):
         return self.__fingerprint
     
@@ -39,75 +72,110 @@ path, audio_name, dimension(song, vocals, music), raw_features, hash_str.
     
     def get_hash_str(self):
         return self.__fingerprint['hash_str']
+    
+    def get_landmarks(self):
+        return self.__fingerprint['landmarks']
+    
+    def get_feature(self, name:str):
+        """
+        return a registered feature, extracting it on first access.
+        """
+        if name not in self.__features:
+            if self.__context is None:
+                raise KeyError(f"Feature '{name}' was not stored with this fingerprint")
+            extractor = FEATURE_REGISTRY[name]
+            for dependency in extractor.inputs:
+                if dependency in FEATURE_REGISTRY: self.get_feature(dependency)
+            with timing.stage('feature/' + name):
+                self.__features[name] = extractor.function(self, self.__context)
+            
+        return self.__features[name]
+    
+    def computed_features(self) -> List[str]:
+        return list(self.__features)
         
     def get_spectral_peaks(self):
-        return self.__spectral_peaks
+        return self.get_feature('spectral_peaks')
     
     def get_spectral_peaks_set(self):
+        # built on first use, most callers only need the peaks array
+        if self.__peaks_set is None:
+            self.__peaks_set = set(map(tuple, self.get_spectral_peaks().tolist()))
         return self.__peaks_set
     
     def get_energy_envelope(self):
-        return self.__energy_envelope          
-      
-    def __extract_general_features(self, spectrogram:np.ndarray, sampling_rate):
+        return self.get_feature('energy_envelope')
+    
+    # Extract Spectral Bandwidth, scalar, works on audio or spectrogram
+    # spectral_bandwidth = librosa.feature.spectral_bandwidth(S=spectrogram, sr=sampling_rate)
+    
+    # # Extract Spectral Rolloff, scalar, works on audio or spectrogram
+    # spectral_rolloff = librosa.feature.spectral_rolloff(S=spectrogram, sr=sampling_rate)
+    
+    # Extract Zero Crossing Rate, float, works on the audio singal
+    # zero_crossing_rate = librosa.feature.zero_crossing_rate(y=librosa.istft(spectrogram))
+    
+    @register_feature('spectral_centroid', cost=2, inputs=['power', 'frequencies'])
+    def __extract_spectral_centroid(self, context:Analysis_Context):
         """
-        Extract general features that can  apply to all spectrograms.
+        Mean Centroid, Scalar, works on audio or spectrogram
         """
-        features = {}
-        power_spec = spectrogram ** 2
-        
-        # Extract Spectral Bandwidth, scalar, works on audio or spectrogram
-        # spectral_bandwidth = librosa.feature.spectral_bandwidth(S=spectrogram, sr=sampling_rate)
-        # features['spectral_bandwidth'] = float(spectral_bandwidth.mean())
-        
-        # # Extract Spectral Rolloff, scalar, works on audio or spectrogram
-        # spectral_rolloff = librosa.feature.spectral_rolloff(S=spectrogram, sr=sampling_rate)
-        # features['spectral_rolloff'] = float(spectral_rolloff.mean())
-        
-        # # Mean Centroid, Scalar, works on audio or spectrogram
-        spectral_centroid = librosa.feature.spectral_centroid(S=power_spec, sr=sampling_rate).mean()
-        spectral_centroid = float(spectral_centroid)
-        features['spectral_centroid'] = spectral_centroid
-
-        # # Spectral Contrast, List, works on audio or spectrogram
-        spectral_contrast = librosa.feature.spectral_contrast(S=spectrogram, sr=sampling_rate)
-        features['spectral_contrast'] = spectral_contrast.mean(axis=1).tolist()
-        
-        # Extract Zero Crossing Rate, float, works on the audio singal
-        # zero_crossing_rate = librosa.feature.zero_crossing_rate(y=librosa.istft(spectrogram))
-        # features['zero_crossing_rate'] = float(zero_crossing_rate.mean())
-         
-        #list, works on audio or spectrogram
-        mfccs = librosa.feature.mfcc(S=librosa.power_to_db(power_spec), sr=sampling_rate, n_mfcc=13)
+        # librosa.feature.spectral_centroid on the shared power spectrogram and frequency axis
+        power = context.power
+        total = power.sum(axis=0)
+        centroid = np.divide(context.frequencies @ power, total, out=np.zeros_like(total), where=total > 0)
+        return float(centroid.mean())
+    
+    @register_feature('spectral_contrast', cost=4, inputs=['spectrogram', 'frequencies'])
+    def __extract_spectral_contrast(self, context:Analysis_Context):
+        """
+        Spectral Contrast, List, works on audio or spectrogram
+        """
+        spectral_contrast = librosa.feature.spectral_contrast(S=context.spectrogram, sr=context.sampling_rate,
+                                                              n_fft=context.n_fft, freq=context.frequencies)
+        return spectral_contrast.mean(axis=1).tolist()
+    
+    @register_feature('mfccs', cost=5, inputs=['db_power'])
+    def __extract_mfccs(self, context:Analysis_Context):
+        """
+        list, works on audio or spectrogram
+        """
+        mfccs = librosa.feature.mfcc(S=context.db_power, sr=context.sampling_rate, n_mfcc=fparams.N_MFCC)
         mfccs = mfccs.mean(axis=1).tolist()
         for i in range(len(mfccs)): mfccs[i] = float(mfccs[i])
-        features['mfccs'] = mfccs
-        
-        # Min-Max Normalized Energy Distribution, List
-        energy = np.sum(spectrogram, axis=0)
-        energy = ps.min_max_normalize(energy)
-        energy = energy.tolist()
-        self.__energy_envelope = features['energy_envelope'] = energy
-        
-        #Shazam Spectral Peaks
-        self.__spectral_peaks, self.__peaks_set = self.__calculate_spectral_peaks(spectrogram)
-        features['spectral_peaks'] = self.__spectral_peaks
-
-        return features
+        return mfccs
     
-    def __extract_chroma(self, spectrogram, sampling_rate):
+    @register_feature('energy_envelope', cost=1, inputs=['frame_energy'])
+    def __extract_energy_envelope(self, context:Analysis_Context):
+        """
+        Min-Max Normalized Energy Distribution, resampled to the canonical length and z-normalized once, see ps.canonical_envelope
+        """
+        energy = ps.min_max_normalize(context.frame_energy)
+        return ps.canonical_envelope(energy)
+    
+    @register_feature('spectral_peaks', cost=3)
+    def __extract_spectral_peaks(self, context:Analysis_Context):
+        """
+        Shazam Spectral Peaks
+        """
+        return self.__calculate_spectral_peaks(context.spectrogram)
+    
+    @register_feature('chroma', cost=4, inputs=['spectrogram', 'tuning'])
+    def __extract_chroma(self, context:Analysis_Context):
         """
         return chroma list, works on audio or spectrogram
         """
-        chroma = librosa.feature.chroma_stft(S=spectrogram, sr=sampling_rate)
+        # librosa.feature.chroma_stft with the tuning taken from the shared pitch track and a cached filterbank
+        chroma = librosa.util.normalize(context.chroma_filterbank() @ context.spectrogram, norm=np.inf, axis=0)
         chroma = chroma.mean(axis=1).tolist()
         
         for i in range(len(chroma)): chroma[i] = float(chroma[i])
         
         return chroma
     
-    def __extract_onset_strength(self, spectrogram, sampling_rate):
-        onset_env = librosa.onset.onset_strength(S=spectrogram, sr=sampling_rate).tolist()
+    @register_feature('onset_strength', cost=3)
+    def __extract_onset_strength(self, context:Analysis_Context):
+        onset_env = librosa.onset.onset_strength(S=context.spectrogram, sr=context.sampling_rate).tolist()
         return onset_env
     
     #applied on the audio signal
@@ -120,99 +188,41 @@ path, audio_name, dimension(song, vocals, music), raw_features, hash_str.
     #     tonnetz = librosa.feature.tonnetz(chroma=librosa.feature.chroma_cqt(S=sg, sr=sr))
     #     return tonnetz.mean(axis=1).tolist() 
    
-    def __extract_energy_entropy(self, sg):
-        energy_entropy = -np.sum((sg / np.sum(sg, axis=0)) * np.log2(sg / (np.sum(sg, axis=0) + 0.000001)), axis=0)
+    @register_feature('energy_entropy', cost=2, inputs=['spectrogram', 'frame_energy'])
+    def __extract_energy_entropy(self, context:Analysis_Context):
+        sg, energy = context.spectrogram, context.frame_energy
+        energy_entropy = -np.sum((sg / energy) * np.log2(sg / (energy + 0.000001)), axis=0)
         return energy_entropy.tolist()
 
-    def __extract_spectral_flateness(self, sg):
+    @register_feature('spectral_flatness', cost=2, inputs=['power'])
+    def __extract_spectral_flateness(self, context:Analysis_Context):
         """
     return spectral flateness mean value, works on audio and spectrogram   
         """
-        spectral_flatness = librosa.feature.spectral_flatness(S=sg)
+        # librosa.feature.spectral_flatness, on the shared power spectrogram
+        power = np.maximum(1e-10, context.power)
+        spectral_flatness = np.exp(np.mean(np.log(power), axis=0)) / np.mean(power, axis=0)
         return float(spectral_flatness.mean())
-         
-    def __extract_full_song_features(self, spectrogram:np.ndarray, sampling_rate):
+    
+    @register_feature('pitch', cost=8, inputs=['pitch_track'])
+    def __extract_pitch(self, context:Analysis_Context):
         """
-    Features that best apply to the full song spectrogram.\n
+        Extract Pitch --  Scalar, work on audio and spectrogram
         """
-        features = {}
-        
-        #chroma, List
-        features["full_chroma"] = self.__extract_chroma(spectrogram, sampling_rate)
-        
-        #onset strength
-        features["full_onset_strength"] = self.__extract_onset_strength(spectrogram, sampling_rate)
-        
-        #tempo
-        # features["full_tempo"] = self.__extract_tempo(spectrogram, sampling_rate, features['full_onset_strength'])
-        
-        # #full tonnetz
-        # features['full_tonnetz'] = self.__extract_tonnetz(spectrogram, sampling_rate)
-        
-        #entropy
-        features['full_energy_entropy'] = self.__extract_energy_entropy(spectrogram)
-        
-        #spectral_flateness
-        features['spectral_flateness'] =self.__extract_spectral_flateness(spectrogram)
-        
-        return features
-        
-    def __extract_vocal_features(self, spectrogram:np.ndarray, sampling_rate):
+        pitches, magnitudes = context.pitch_track
+        return float(pitches[pitches > 0].mean() if pitches.any() else 0)
+    
+    @register_feature('hnr', cost=2)
+    def __extract_hnr(self, context:Analysis_Context):
         """
-        Extract vocal-specific features from the vocals spectrogram.\n
-        pitch, formants, HNR, 
+        Extract harmonics to noise ratio, Scalar,works on spectrogram or audio
         """
-        features = {}
-        
-        #spectral flateness 
-        features['vocals_spectral_flateness'] = self.__extract_spectral_flateness(spectrogram)
-        
-        #Extract Pitch --  Scalar, work on audio and spectrogram
-        pitches, magnitudes = librosa.piptrack(S=spectrogram, sr=sampling_rate)
-        features['vocals_pitch'] = float(pitches[pitches > 0].mean() if pitches.any() else 0)
-        
-        #Extract harmonics to noise ratio, Scalar,works on spectrogram or audio
+        spectrogram = context.spectrogram
         hnr = librosa.feature.rms(S=spectrogram) / (np.std(spectrogram, axis=0) + 1e-10)
-        features['HNR'] = float(hnr.mean())
+        return float(hnr.mean())
         
-        #jitter
-        #shimmer
-        #spectral envelope
-        #voice activity detection
-        #Cepstral Peak Prominence
-        
-        return features
-
-    def __extract_instrument_features(self, spectrogram:np.ndarray, sampling_rate):
-        """
-        Extract instrument-specific features from the music spectrogram.\n
-        beat, strength
-        """
-        features = {}
-        
-        #tonnetz
-        # features['music_tonnetz'] = self.__extract_tonnetz(spectrogram, sampling_rate)
-        
-        #energy entropy
-        features['music_energy_entropy'] = self.__extract_energy_entropy(spectrogram)
-        
-        #List
-        features['music_chroma'] = self.__extract_chroma(spectrogram, sampling_rate)
-        
-        #Extract Pitch --  Scalar
-        pitches, magnitudes = librosa.piptrack(S=np.abs(spectrogram), sr=sampling_rate)
-        features['music_pitch'] = float(pitches[pitches > 0].mean() if pitches.any() else 0)
-
-        #onset strength, list
-        features['music_onset_strength'] = self.__extract_onset_strength(spectrogram, sampling_rate)
-        
-        return features
-        
-        #tempo, audio feature
-        # features['music_tempo'] = self.__extract_tempo(spectrogram, sampling_rate, features['music_onset_strength'])
-         
-        #inharmonicity
-        #energy envelope 
+    #vocals: jitter, shimmer, spectral envelope, voice activity detection, Cepstral Peak Prominence
+    #music: inharmonicity, tempo (audio feature)
     
     def __calculate_spectral_peaks(self, spectrogram):
         """
@@ -220,32 +230,70 @@ path, audio_name, dimension(song, vocals, music), raw_features, hash_str.
 
         Args:
             spectrogram (2D array): Magnitude spectrogram (frequency x time).
-            min_peak_height (float): Minimum magnitude for a peak to be considered.
-            neighborhood_size (int): Size of the local neighborhood to identify peaks.
 
         Returns:
-            List of spectral peaks  + set of [(freq_bin, time_bin), ...].
+            (P, 2) uint16 array of [freq_bin, time_bin] ordered by time.
         """
         min_peak_height, neighborhood_size = self.__obtain_min_peaks_and_neighborhood_size(spectrogram)
         
+        if self.__peak_method == 'find_peaks':
+            return self.__find_peaks_per_column(spectrogram, min_peak_height, neighborhood_size)
+        elif self.__peak_method == 'max_filter':
+            return self.__find_peaks_max_filter(spectrogram, min_peak_height, neighborhood_size)
+        else:
+            raise ValueError(f"Invalid peak method '{self.__peak_method}'. Supported methods: 'max_filter', 'find_peaks'.")
+    
+    def __find_peaks_per_column(self, spectrogram, min_peak_height, neighborhood_size):
+        """
+        Reference implementation, runs scipy's find_peaks on every time frame.
+        """
         peaks: List[List] = []
-        peaks_set = set()
         # Iterate over time frames (columns in the spectrogram)
         for time_idx in range(spectrogram.shape[1]):
             # Extract the frequency magnitudes for the current time frame
             freq_magnitudes = spectrogram[:, time_idx]
 
             # Find peaks (local maxima) in the frequency spectrum
-            peak_indices, _ = find_peaks(freq_magnitudes, height=min_peak_height, distance=neighborhood_size)
+            peak_indices, _ = scipy_signal.find_peaks(freq_magnitudes, height=min_peak_height, distance=neighborhood_size)
 
             # Append (frequency bin, time bin) for each peak
             for freq_idx in peak_indices:
                 peaks.append([int(freq_idx), time_idx])
-                peaks_set.add((int(freq_idx), time_idx))
         
-        return peaks, peaks_set
+        return np.array(peaks, dtype=PEAK_DTYPE).reshape(len(peaks), 2)
+    
+    def __find_peaks_max_filter(self, spectrogram, min_peak_height, neighborhood_size):
+        """
+        Vectorized peak picking over the whole spectrogram.\n
+        Local maxima along frequency above min_peak_height compete inside a (frequency x time) neighborhood,
+        following find_peaks' `distance` rule: the highest remaining candidates are kept and suppress
+        every lower candidate around them, repeated until no candidate is left (a few passes).\n
+        With a time neighborhood of 1 this matches the per-column find_peaks mode up to ties.
+        """
+        # strict local maxima along the frequency axis, first and last bins excluded like find_peaks
+        local_max = np.zeros(spectrogram.shape, dtype=bool)
+        center = spectrogram[1:-1]
+        local_max[1:-1] = (center > spectrogram[:-2]) & (center >= spectrogram[2:]) & (center >= min_peak_height)
+        
+        footprint = (2 * neighborhood_size - 1, fparams.PEAK_TIME_NEIGHBORHOOD)
+        candidates = np.where(local_max, spectrogram, -np.inf)
+        peaks_mask = np.zeros(spectrogram.shape, dtype=bool)
+        
+        while local_max.any():
+            neighborhood_max = scipy_ndimage.maximum_filter(candidates, size=footprint, mode='constant', cval=-np.inf)
+            kept = local_max & (candidates == neighborhood_max)
+            peaks_mask |= kept
+            
+            suppressed = scipy_ndimage.maximum_filter(kept, size=footprint, mode='constant', cval=False)
+            local_max &= ~suppressed
+            candidates[suppressed] = -np.inf
+        
+        # nonzero on the transpose gives time-major order, same as the per-column loop
+        time_idx, freq_idx = np.nonzero(peaks_mask.T)
+        
+        return np.stack([freq_idx, time_idx], axis=1).astype(PEAK_DTYPE)
     
-    def __obtain_min_peaks_and_neighborhood_size(self, spectrogram, fft_size:int = 2048):
+    def __obtain_min_peaks_and_neighborhood_size(self, spectrogram, fft_size:int = fparams.N_FFT):
         """
         Analyze the spectrogram to determine suitable min_peak_height and neighborhood_size.
 
@@ -279,15 +327,21 @@ path, audio_name, dimension(song, vocals, music), raw_features, hash_str.
         return min_peak_height, neighborhood_size
 
     def __create_fingerprint(self):
-        raw_features = self.__extract_general_features(self.__sg, self.__sampling_rate)
-        hash_str = ps.p_hash(raw_features)
+        raw_features = {name: self.get_feature(name) for name in profile_features(self.__profile)}
+        # the hash inputs are computed even when the profile does not store them
+        hash_str = ps.p_hash({name: self.get_feature(name) for name in HASH_FEATURES})
+        
+        with timing.stage('landmarks'):
+            constellation = landmarks.select_constellation(self.get_spectral_peaks(), self.__sg)
+            landmark_hashes = landmarks.generate_landmarks(constellation)
         
         fingerprint = {
             'file_path': self.__path,
             'audio_name': self.__audio_name,
             'dimension' : self.__dimension,
             'raw_features' : raw_features,
-            'hash_str': hash_str
+            'hash_str': hash_str,
+            'landmarks': landmark_hashes
         }
         return fingerprint
     
@@ -0,0 +1,161 @@
+"""
+Headless batch matching.
+
+The index is loaded once, query files are decoded and fingerprinted in a process pool and
+scored in the main process. One JSON line is written per query, in input order, as soon as
+it is ready:
+
+    {"query": path, "matches": [top-k matches], "timings": {...}}
+    {"query": path, "error": message}
+
+usage: python batch_search.py QUERY [QUERY ...] [--list FILE] [--top-k 10] [--min-score S] [--workers N]
+       [--dimension D ...] [--shards N] [--mode landmarks|lsh|scan] [--candidates 50] [--output results.jsonl]
+
+QUERY is an audio file or a folder (searched recursively), --list reads one path per line ('-' for stdin).
+"""
+from typing import Dict, Iterable, List
+import os
+import sys
+import json
+import time
+import argparse
+import contextlib
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import processing_and_searching as ps
+from Audio_Fingerprint import Audio_Fingerprint
+from matchmaker import Match_Maker
+from json_ctrl import to_builtin
+import timing
+
+QUERY_EXTENSIONS = ('.wav', '.mp3', '.flac', '.ogg', '.aiff', '.aif')
+
+def collect_queries(inputs: Iterable[str]) -> List[str]:
+    """
+    return the query files of the given files and folders, folders are searched recursively in sorted order.
+    """
+    queries = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for root, folders, files in os.walk(path):
+                folders.sort()
+                queries.extend(os.path.join(root, file) for file in sorted(files) if file.lower().endswith(QUERY_EXTENSIONS))
+        else:
+            queries.append(path)
+
+    return [os.path.normpath(query) for query in queries]
+
+def fingerprint_query(file_path: str) -> Dict:
+    """
+    Decode and fingerprint one query (runs in a worker process).\n
+    return {'query', 'fingerprint' (compact record), 'timings'} or {'query', 'error'}, errors never stop the batch.
+    """
+    try:
+        with timing.collect() as report:
+            start = time.perf_counter()
+            audio, sr = ps.extract_audio_signal(file_path)
+            sg = ps.generate_spectrogram(audio)
+            decoded = time.perf_counter()
+
+            audio_name, ext = os.path.splitext(os.path.basename(file_path))
+            fp = Audio_Fingerprint(audio_name=audio_name, dimension='none', file_path=file_path, sampling_rate=sr, spectrogram=sg, profile='query')
+            done = time.perf_counter()
+    except Exception as error:
+        return {'query': file_path, 'error': f"{type(error).__name__}: {error}"}
+
+    return {'query': file_path, 'fingerprint': fp.to_record(),
+            'timings': {'decode_s': decoded - start, 'fingerprint_s': done - decoded, 'stages': report.as_dict()['stages']}}
+
+def fingerprint_queries(queries: List[str], workers: int = None) -> Iterable[Dict]:
+    """
+    yield fingerprint_query results in input order, computed by `workers` processes (1 --> serial).
+    """
+    if workers is None: workers = os.cpu_count() or 1
+    workers = min(workers, len(queries))
+
+    if workers <= 1:
+        yield from map(fingerprint_query, queries)
+        return
+
+    # small chunks so results stream out while the rest of the batch is processed
+    chunksize = max(1, min(16, len(queries) // (workers * 8)))
+    # spawned, not forked: the caller may be a threaded server or the GUI
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        yield from pool.map(fingerprint_query, queries, chunksize=chunksize)
+
+def run_batch(queries: List[str], output, match_maker: Match_Maker, top_k: int = 10, workers: int = None,
+              min_score: float = None, dimensions: List[str] = None) -> Dict:
+    """
+    Search every query and write one JSON line per query to `output`.\n
+    Only the `top_k` best matches scoring at least `min_score` are selected and written, from the `dimensions`
+    partitions (default: the whole database).\n
+    return summary counts and timings.
+    """
+    start = time.perf_counter()
+    n_errors = 0
+
+    for result in fingerprint_queries(queries, workers):
+        if 'error' not in result:
+            search_start = time.perf_counter()
+            with timing.collect() as report:
+                matches = match_maker.search_fingerprint(result.pop('fingerprint'), top_k, min_score, dimensions)
+            result['timings']['search_s'] = time.perf_counter() - search_start
+            result['timings']['stages'].update(report.as_dict()['stages'])
+            result['matches'] = matches
+        else:
+            n_errors += 1
+
+        output.write(json.dumps(result, default=to_builtin) + '\n')
+        output.flush()
+
+    elapsed = time.perf_counter() - start
+    return {'queries': len(queries), 'errors': n_errors, 'elapsed_s': elapsed,
+            'queries_per_s': len(queries) / elapsed if elapsed > 0 else 0.0}
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Match audio files against the fingerprint database, results as JSON Lines.")
+    parser.add_argument('queries', nargs='*', help="query files or folders")
+    parser.add_argument('--list', dest='list_file', help="file with one query path per line, '-' for stdin")
+    parser.add_argument('--top-k', type=int, default=10, help="matches written per query")
+    parser.add_argument('--min-score', type=float, default=None, help="drop matches scoring below it (0-100)")
+    parser.add_argument('--dimension', dest='dimensions', action='append', default=None,
+                        help="only match this dimension (full_song, vocals, music or all), repeatable")
+    parser.add_argument('--workers', type=int, default=None, help="fingerprinting processes, default: one per CPU core")
+    parser.add_argument('--shards', type=int, default=None, help="search processes each keeping a shard of the index, see shard_search")
+    parser.add_argument('--mode', default='landmarks', choices=['landmarks', 'lsh', 'scan'], help="Match_Maker search mode")
+    parser.add_argument('--candidates', type=int, default=50, help="tracks fully scored per query (landmarks, lsh)")
+    parser.add_argument('--output', '-o', default='-', help="JSON Lines output file, '-' for stdout")
+    args = parser.parse_args(argv)
+
+    inputs = list(args.queries)
+    if args.list_file:
+        lines = sys.stdin if args.list_file == '-' else open(args.list_file, encoding='utf-8')
+        with lines:
+            inputs.extend(line.strip() for line in lines if line.strip())
+    queries = collect_queries(inputs)
+    if not queries:
+        parser.error("no query files given")
+
+    # index refresh messages go to stderr, stdout may carry the results
+    with contextlib.redirect_stdout(sys.stderr):
+        match_maker = Match_Maker(search_mode=args.mode, candidates_n=args.candidates, shards=args.shards)
+
+    # checked once, before any query is fingerprinted
+    try:
+        dimensions = match_maker.select_dimensions(args.dimensions)
+    except ValueError as error:
+        match_maker.close()
+        parser.error(str(error))
+
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        summary = run_batch(queries, output, match_maker, args.top_k, args.workers, args.min_score, dimensions)
+    finally:
+        if output is not sys.stdout: output.close()
+        match_maker.close()
+
+    print(f"{summary['queries']} queries, {summary['errors']} errors, {summary['elapsed_s']:.1f} s "
+          f"({summary['queries_per_s']:.2f} queries/s)", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+"""
+Benchmark suite for fingerprinting, search and startup.
+
+Startup: wall time of a fresh interpreter importing each entry module (IMPORT_MODULES), heavy
+dependencies are imported lazily (see lazy_imports). A median above the import budget fails the run
+(exit code 1), so CLI tools and workers keep starting in well under a second.
+
+Stages measured on a real audio file: extract_audio_signal, generate_spectrogram, Audio_Fingerprint
+construction and the spectral peak picking. Search latency is measured for every search mode against
+synthetic databases of increasing size (10 to 100k entries by default, see synthetic_corpus), built
+with a fixed seed so runs are reproducible.
+
+Every result reports wall time (min / median / mean over the repeats), throughput and the peak RSS of
+the process so far (cumulative_peak_rss_mb: it never decreases, so it also covers every earlier result),
+the whole run is written as JSON. Two runs are compared with --compare, a median
+slower by more than the threshold is a regression (exit code 1).
+
+usage: python benchmark.py [--audio FILE] [--sizes 10 100 1000 10000 100000] [--repeat 5] [--shards N] [--output bench.json]
+       python benchmark.py --imports-only [--import-budget 0.5]
+       python benchmark.py --compare baseline.json current.json [--threshold 0.1]
+"""
+from typing import Callable, Dict, List
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import subprocess
+import tempfile
+import numpy as np
+import processing_and_searching as ps
+import fingerprint_params as fparams
+import database
+import index_store
+import synthetic_corpus
+from Audio_Fingerprint import Audio_Fingerprint
+from matchmaker import Match_Maker
+
+DEFAULT_SIZES = [10, 100, 1000, 10000, 100000]
+SEARCH_MODES = ['landmarks', 'lsh', 'scan']
+IMPORT_MODULES = ['matchmaker', 'database', 'batch_search', 'match_server']
+#seconds a fresh interpreter may take to import one entry module
+IMPORT_BUDGET_S = 0.5
+
+def peak_rss_mb():
+    """
+    return the peak resident set size of the process in MB, None where the platform does not report it.
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+def measure(name: str, function: Callable, repeat: int = 5, warmup: int = 1, items: int = 1, **info) -> Dict:
+    """
+    Time `repeat` calls of function() after `warmup` untimed calls.\n
+    items: work items per call (e.g. database entries), throughput is items per second of the median time.
+    """
+    for _ in range(warmup):
+        function()
+
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+
+    median = statistics.median(times)
+    return dict(info, name=name, repeat=repeat, items=items,
+                wall_s={'min': min(times), 'median': median, 'mean': statistics.fmean(times)},
+                throughput_per_s=items / median if median > 0 else None,
+                cumulative_peak_rss_mb=peak_rss_mb())
+
+def bench_stages(audio_path: str, repeat: int) -> List[Dict]:
+    """
+    Per stage timings of the fingerprinting pipeline on one file.
+    """
+    audio, sr = ps.extract_audio_signal(audio_path)
+    sg = ps.generate_spectrogram(audio)
+    fingerprint = Audio_Fingerprint('benchmark', 'none', audio_path, sr, sg)
+    seconds = len(audio) / sr
+
+    def peaks():
+        # private to Audio_Fingerprint, reached through its mangled name
+        return fingerprint._Audio_Fingerprint__calculate_spectral_peaks(sg)
+
+    info = {'audio': os.path.basename(audio_path), 'audio_seconds': seconds}
+    return [
+        measure('extract_audio_signal', lambda: ps.extract_audio_signal(audio_path), repeat, items=1, **info),
+        measure('generate_spectrogram', lambda: ps.generate_spectrogram(audio), repeat, items=1, **info),
+        measure('audio_fingerprint_index', lambda: Audio_Fingerprint('benchmark', 'none', audio_path, sr, sg), repeat, **info),
+        measure('audio_fingerprint_query', lambda: Audio_Fingerprint('benchmark', 'none', audio_path, sr, sg, profile='query'), repeat, **info),
+        measure('spectral_peaks', peaks, repeat, **info),
+    ]
+
+def bench_imports(repeat: int, budget: float = IMPORT_BUDGET_S) -> List[Dict]:
+    """
+    Startup time of every entry module: a fresh interpreter (cwd = repository) running `import module`.
+    """
+    folder = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in IMPORT_MODULES:
+        command = [sys.executable, '-c', f'import {module}']
+        result = measure('import', lambda: subprocess.run(command, cwd=folder, check=True), repeat, module=module, budget_s=budget)
+        result['within_budget'] = result['wall_s']['median'] <= budget
+        results.append(result)
+
+    return results
+
+def bench_search(audio_path: str, sizes: List[int], repeat: int, n_peaks: int, seed: int = 0, shards: int = None) -> List[Dict]:
+    """
+    Search latency of every search mode against synthetic databases of the given sizes,
+    also on `shards` worker processes when given (see shard_search).
+    """
+    audio, sr = ps.extract_audio_signal(audio_path)
+    query = Audio_Fingerprint('benchmark', 'none', audio_path, sr, ps.generate_spectrogram(audio), profile='query')
+
+    results = []
+    folder = tempfile.mkdtemp(prefix='fp_benchmark_')
+    try:
+        for n in sizes:
+            file_path = os.path.join(folder, f'synthetic_{n}.idx')
+            start = time.perf_counter()
+            index = synthetic_corpus.write_corpus_index(file_path, n, seed, n_peaks)
+            info = {'size': n, 'peaks_per_entry': n_peaks, 'build_s': time.perf_counter() - start}
+
+            results.append(measure('index_load', lambda: Match_Maker(index=index_store.load_index(file_path)), repeat, items=n, **info))
+            for mode in SEARCH_MODES:
+                match_maker = Match_Maker(search_mode=mode, index=index)
+                results.append(measure('search', lambda: match_maker.search_fingerprint(query), repeat, items=n, mode=mode, **info))
+                results.append(measure('search_top10', lambda: match_maker.search_fingerprint(query, top_k=10), repeat, items=n, mode=mode, **info))
+                if shards and shards > 1:
+                    sharded = Match_Maker(search_mode=mode, index=index, shards=shards)
+                    results.append(measure('search_top10', lambda: sharded.search_fingerprint(query, top_k=10), repeat, items=n, mode=mode, shards=shards, **info))
+                    sharded.close()
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    return results
+
+def run_metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'fingerprint_params': fparams.params_digest(),
+    }
+
+def result_key(result: Dict):
+    return (result['name'], result.get('module'), result.get('mode'), result.get('size'), result.get('shards'))
+
+def compare_runs(baseline: Dict, current: Dict, threshold: float = 0.1):
+    """
+    return (rows, regressions): the median wall time change of every result present in both runs.\n
+    A result more than `threshold` (relative) slower than the baseline is a regression.
+    """
+    base = {result_key(result): result for result in baseline['results']}
+    rows, regressions = [], []
+    for result in current['results']:
+        key = result_key(result)
+        if key not in base:
+            continue
+        before, after = base[key]['wall_s']['median'], result['wall_s']['median']
+        change = (after - before) / before if before > 0 else 0.0
+        row = {'key': key, 'baseline_s': before, 'current_s': after, 'change': change}
+        rows.append(row)
+        if change > threshold: regressions.append(row)
+
+    return rows, regressions
+
+def print_comparison(rows: List[Dict], regressions: List[Dict], threshold: float):
+    print(f"{'benchmark':<40}{'baseline':>12}{'current':>12}{'change':>10}")
+    for row in rows:
+        label = ' '.join(str(part) for part in row['key'] if part is not None)
+        flag = '  REGRESSION' if row in regressions else ''
+        print(f"{label:<40}{row['baseline_s'] * 1e3:>10.2f}ms{row['current_s'] * 1e3:>10.2f}ms{row['change']:>+10.1%}{flag}")
+    print(f"{len(regressions)} regression(s) above {threshold:.0%}")
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark fingerprinting stages and search latency.")
+    parser.add_argument('--audio', default=None, help="audio file for the stage benchmarks and the query, default: first database source")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="synthetic database sizes")
+    parser.add_argument('--peaks', type=int, default=500, help="spectral peaks per synthetic entry")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shards', type=int, default=None, help="also time searches sharded over this many processes")
+    parser.add_argument('--skip-stages', action='store_true', help="only benchmark search")
+    parser.add_argument('--imports-only', action='store_true', help="only benchmark the startup imports")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET_S, help="seconds allowed to import an entry module")
+    parser.add_argument('--output', '-o', default='benchmark_results.json')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'), help="compare two result files")
+    parser.add_argument('--threshold', type=float, default=0.1, help="relative slowdown reported as a regression")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as file: baseline = json.load(file)
+        with open(args.compare[1]) as file: current = json.load(file)
+        rows, regressions = compare_runs(baseline, current, args.threshold)
+        print_comparison(rows, regressions, args.threshold)
+        sys.exit(1 if regressions else 0)
+
+    results = bench_imports(args.repeat, args.import_budget)
+    if not args.imports_only:
+        audio_path = args.audio or database.scan_sources()[0]['file_path']
+        if not args.skip_stages:
+            results += bench_stages(audio_path, args.repeat)
+        results += bench_search(audio_path, args.sizes, args.repeat, args.peaks, args.seed, args.shards)
+
+    run = {'meta': dict(run_metadata(), argv=sys.argv[1:]), 'results': results}
+    with open(args.output, 'w') as file:
+        json.dump(run, file, indent=2)
+
+    for result in results:
+        label = ' '.join(str(part) for part in result_key(result) if part is not None)
+        print(f"{label:<40}{result['wall_s']['median'] * 1e3:>10.2f} ms  peak RSS so far {result['cumulative_peak_rss_mb'] or 0:.0f} MB")
+
+    over_budget = [result['module'] for result in results if result.get('within_budget') is False]
+    if over_budget:
+        print(f"Import budget of {args.import_budget:.2f} s exceeded by: {', '.join(over_budget)}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -1,15 +1,23 @@
-from typing import List, Dict, Union
-import os, librosa
+from typing import Callable, List, Dict, Union
+import os
 import numpy as np
 from Audio_Fingerprint import Audio_Fingerprint
+from fingerprint_record import Fingerprint_Record
 import hashlib
 from copy import copy
 import json
 from pprint import pprint
 import json_ctrl
 import processing_and_searching as ps
+import fingerprint_params as fparams
+import index_store
+import partitions
+import spectrogram_cache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 
 database_json_file = 'json_files/db.json'
+index_file = 'Data/index/fingerprints.idx'
 
 real_number = Union[int, float]
 
@@ -23,32 +31,182 @@ music_files_path = 'Data/original_data/music'
 paths = [full_songs_path, vocals_files_path, music_files_path]
 dim = ['full_song', 'vocals', 'music']
 
-def create_database():
+#worker processes used to build the database, None --> one per CPU core
+build_workers = None
+
+def create_database(workers: int = None):
+    """
+Database is a list of fingerprints.\n
+Files are fingerprinted in parallel, see `fingerprint_sources`.
+    """
+    full_database = [record.get_fingerprint() for record in fingerprint_sources(scan_sources(), workers)]
+            
+    print("Database Created successfully")
+    return full_database    
+
+def scan_sources() -> List[Dict]:
+    """
+    return a manifest entry (dimension, path, size, mtime) for every file the database is built from.
+    """
+    sources = []
+    for folder, dimension in zip(paths, dim):
+        for file_path in ps.list_audio_files(folder):
+            stat = os.stat(file_path)
+            sources.append({'dimension': dimension, 'file_path': file_path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns})
+                
+    return sources
+
+def fingerprint_file(source: Dict) -> Fingerprint_Record:
     """
-Database is a list of fingerprints.    
+    Decode, transform and fingerprint a single manifest entry.\n
+    Every file is decoded at the common sampling rate, so files can be processed independently.\n
+    Spectrograms come from the content-addressed cache, keyed by the manifest digest.\n
+    return the compact record, the spectrogram is not sent back to the parent process.
     """
-    global number_of_songs, paths, dim
+    file_path = source['file_path']
+    audio_name, ext = os.path.splitext(os.path.basename(file_path))
     
-    spectrograms: List[List[Dict]] = ps.generate_dataset_spectrograms(paths)
-    full_database = []
+    spectrogram, sr = spectrogram_cache.get_spectrogram(file_path, source.get('digest'))
+    
+    fp = Audio_Fingerprint(audio_name=audio_name, dimension=source['dimension'], file_path=file_path, sampling_rate=sr, spectrogram=spectrogram)
+    return fp.to_record()
+
+def fingerprint_sources(sources: List[Dict], workers: int = None, progress: Callable[[int, int], None] = None) -> List[Fingerprint_Record]:
+    """
+    return the fingerprint records of the given manifest entries, in the same order.\n
+    workers: number of worker processes, None --> `build_workers` (default: one per CPU core), 1 --> serial.\n
+    progress: called as progress(done, total) after every fingerprinted file.
+    """
+    if workers is None: workers = build_workers or os.cpu_count() or 1
+    workers = min(workers, len(sources))
+    
+    if workers <= 1:
+        return __collect(map(fingerprint_file, sources), len(sources), progress)
+    
+    # map keeps the input order, so the merged database is deterministic
+    chunksize = max(1, len(sources) // (workers * 4))
+    # spawned, not forked: refresh_index also runs on the GUI's worker threads
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as pool:
+        return __collect(pool.map(fingerprint_file, sources, chunksize=chunksize), len(sources), progress)
+
+def __collect(fingerprints, total: int, progress: Callable = None) -> List[Fingerprint_Record]:
+    collected = []
+    for fp in fingerprints:
+        collected.append(fp)
+        if progress: progress(len(collected), total)
+    return collected
+
+def __index_record(index, i: int) -> Fingerprint_Record:
+    # copied out of the memory map, which is released before the index is rewritten
+    return Fingerprint_Record.from_fingerprint(index.fingerprint(i, as_list=False, copy=True))
+
+def __load_existing_index(file_path: str):
+    if index_store.read_header(file_path) is None:
+        return None
+    return index_store.load_index(file_path)
+
+def refresh_index(file_path: str = None, verbose: bool = True, workers: int = None, progress: Callable[[int, int], None] = None):
+    """
+    Bring the on-disk index up to date with the source folders and return it.\n
+    Only added or changed files are decoded and fingerprinted, entries of deleted files are dropped.\n
+    Rows are grouped by dimension into partitions (see partitions), an index without them is rewritten.\n
+    A file counts as changed when its size, mtime or fingerprint parameters differ from the manifest,
+    unless its content digest still matches (e.g. a touched or copied file).\n
+    workers: number of build processes, see `fingerprint_sources`.\n
+    progress: called as progress(done, total) while stale files are fingerprinted.\n
+    Refreshes of the same index are serialized (index_store.lock_index): a process that waited finds the index
+    already rebuilt by the other one and only loads it.
+    """
+    file_path = file_path or index_file
+    with index_store.lock_index(file_path):
+        return __refresh_index(file_path, verbose, workers, progress)
+
+def __refresh_index(file_path: str, verbose: bool, workers: int, progress: Callable[[int, int], None]):
+    params = fparams.get_params()
+    params_version = fparams.params_digest(params)
     
-    i = 0
-    for dimension in spectrograms:    
-        for sg in dimension:
-            file_path = sg['file_path']
-            name = sg['audio_name']
-            spectrogram = sg['SG']
-            sr = sg['SR']
+    index = __load_existing_index(file_path)
+    old_manifest = {}
+    if index is not None:
+        for i, entry in enumerate(index.sources.get('manifest', [])):
+            old_manifest[entry['file_path']] = (i, entry)
             
-            fp = Audio_Fingerprint(audio_name=name, dimension=dim[i], file_path=file_path, sampling_rate=sr, spectrogram=spectrogram)
-            full_database.append(fp.get_fingerprint())
+    manifest = []
+    # kept and new entries are held as compact records until the index is written
+    fingerprints: List[Union[Fingerprint_Record, None]] = []
+    stale = []
+    dirty = index is None or len(old_manifest) != len(index) or not partitions.has_partitions(index)
+    
+    for source in scan_sources():
+        old = old_manifest.pop(source['file_path'], None)
+        i, entry = old if old else (None, None)
+        
+        if entry is not None and entry['params'] == params_version and entry['dimension'] == source['dimension']:
+            if entry['size'] == source['size'] and entry['mtime_ns'] == source['mtime_ns']:
+                manifest.append(entry)
+                fingerprints.append(__index_record(index, i))
+                continue
             
-        i+=1    
+            if entry['size'] == source['size'] and entry['digest'] == ps.file_digest(source['file_path']):
+                manifest.append(dict(entry, mtime_ns=source['mtime_ns']))
+                fingerprints.append(__index_record(index, i))
+                dirty = True
+                continue
+        
+        source = dict(source, digest=ps.file_digest(source['file_path']), params=params_version)
+        manifest.append(source)
+        fingerprints.append(None)
+        stale.append(len(manifest) - 1)
+        
+    dirty = dirty or bool(stale) or bool(old_manifest)
+    
+    if not dirty:
+        return index
+    
+    # release the memory map before the index file gets replaced
+    index = None
+    
+    if stale:
+        new_fingerprints = fingerprint_sources([manifest[i] for i in stale], workers, progress)
+        for i, fp in zip(stale, new_fingerprints):
+            fingerprints[i] = fp
             
-    print("Database Created successfully")
-    return full_database    
+    if verbose:
+        print(f"Index refreshed: {len(stale)} fingerprinted, {len(old_manifest)} removed, {len(manifest) - len(stale)} reused")
+    
+    # rows grouped by dimension, every dimension is one partition with its own inverted index
+    order = partitions.group_order([entry['dimension'] for entry in manifest], dim)
+    manifest = [manifest[i] for i in order]
+    fingerprints = [fingerprints[i] for i in order]
+    
+    extra_arrays = partitions.partition_arrays([record.dimension for record in fingerprints], [record.landmarks for record in fingerprints], dim)
+    extra_arrays['hash/words'] = np.array([record.hash_words for record in fingerprints], dtype=np.uint64).reshape(len(fingerprints), fparams.HASH_BITS // 64)
+    
+    index_store.write_index(file_path, [record.get_fingerprint() for record in fingerprints], params, {'manifest': manifest}, extra_arrays)
+    
+    return index_store.load_index(file_path)
+
+def hash_words_matrix(fingerprints: List[Dict]) -> np.ndarray:
+    """
+    return the packed perceptual hashes of all fingerprints as a (N, HASH_BITS / 64) uint64 matrix.
+    """
+    words = np.zeros((len(fingerprints), fparams.HASH_BITS // 64), dtype=np.uint64)
+    for i, fp in enumerate(fingerprints):
+        words[i] = ps.hash_to_words(fp['hash_str'])
+        
+    return words
+
+def build_index(file_path: str = None, workers: int = None):
+    """
+    Fingerprint every source file from scratch and write the result into the on-disk index.
+    """
+    file_path = file_path or index_file
+    if os.path.exists(file_path): os.remove(file_path)
+    
+    return refresh_index(file_path, workers=workers)
 
 def main():
+    json_ctrl.clear_output_files()
     json_ctrl.clear_json_file(database_json_file)
     db = create_database()
     json_ctrl.write_in_json_file(database_json_file, db[0])
@@ -0,0 +1,166 @@
+"""
+Registry of the features an `Audio_Fingerprint` can extract.
+
+Every extractor declares its name, a relative cost and its inputs. A profile lists the
+features computed eagerly when a fingerprint is created, anything else is computed lazily
+the first time it is requested through `Audio_Fingerprint.get_feature`.
+
+Extractors read their inputs from an `Analysis_Context`: the intermediates shared between
+features (power spectrogram, dB power, frequency axis, pitch tracking, filterbanks) are
+computed at most once per fingerprint, filterbanks once per (sampling rate, n_fft).
+"""
+from typing import Callable, Dict, List, Union
+from functools import lru_cache
+import numpy as np
+from lazy_imports import lazy_import
+
+librosa = lazy_import('librosa')
+
+class Feature_Extractor:
+    """
+name: key of the feature in raw_features\n
+function: extractor, called as function(fingerprint, context) with an `Analysis_Context`\n
+cost: relative extraction cost (1 = a reduction over the spectrogram)\n
+inputs: what the extractor reads, `Analysis_Context` intermediates or names of other features
+    """
+    __slots__ = ('name', 'function', 'cost', 'inputs')
+
+    def __init__(self, name: str, function: Callable, cost: float, inputs: List[str]):
+        self.name = name
+        self.function = function
+        self.cost = cost
+        self.inputs = inputs
+
+    def __repr__(self):
+        return f"Feature_Extractor({self.name!r}, cost={self.cost}, inputs={self.inputs})"
+
+@lru_cache(maxsize=8)
+def fft_frequencies(sampling_rate, n_fft: int) -> np.ndarray:
+    frequencies = librosa.fft_frequencies(sr=sampling_rate, n_fft=n_fft)
+    frequencies.flags.writeable = False
+    return frequencies
+
+@lru_cache(maxsize=32)
+def chroma_filterbank(sampling_rate, n_fft: int, tuning: float = 0.0, n_chroma: int = 12) -> np.ndarray:
+    # tuning is quantized to 0.01 bins by librosa.pitch_tuning, so the cache stays small
+    filterbank = librosa.filters.chroma(sr=sampling_rate, n_fft=n_fft, tuning=tuning, n_chroma=n_chroma)
+    filterbank.flags.writeable = False
+    return filterbank
+
+class Analysis_Context:
+    """
+Intermediate representations of one spectrogram, each computed on first access and shared by all extractors.\n
+spectrogram: magnitude spectrogram (frequency x time)\n
+power: spectrogram ** 2\n
+db_power: power in dB, see librosa.power_to_db\n
+frame_energy: per frame sum of the magnitudes\n
+frequencies: centre frequency of every bin\n
+pitch_track: (pitches, magnitudes) of librosa.piptrack, shared by pitch and the chroma tuning estimate\n
+tuning: tuning deviation in fractions of a chroma bin, see librosa.estimate_tuning
+    """
+    def __init__(self, spectrogram: np.ndarray, sampling_rate):
+        self.spectrogram = spectrogram
+        self.sampling_rate = sampling_rate
+        self.n_fft = 2 * (spectrogram.shape[0] - 1)
+        self.__cache: Dict = {}
+
+    def __cached(self, name: str, compute: Callable):
+        if name not in self.__cache:
+            self.__cache[name] = compute()
+        return self.__cache[name]
+
+    def computed(self) -> List[str]:
+        return list(self.__cache)
+
+    @property
+    def power(self) -> np.ndarray:
+        return self.__cached('power', lambda: self.spectrogram ** 2)
+
+    @property
+    def db_power(self) -> np.ndarray:
+        return self.__cached('db_power', lambda: librosa.power_to_db(self.power))
+
+    @property
+    def frame_energy(self) -> np.ndarray:
+        return self.__cached('frame_energy', lambda: np.sum(self.spectrogram, axis=0))
+
+    @property
+    def frequencies(self) -> np.ndarray:
+        return fft_frequencies(self.sampling_rate, self.n_fft)
+
+    @property
+    def pitch_track(self):
+        return self.__cached('pitch_track', lambda: librosa.piptrack(S=self.spectrogram, sr=self.sampling_rate, n_fft=self.n_fft))
+
+    @property
+    def tuning(self) -> float:
+        return self.__cached('tuning', self.__estimate_tuning)
+
+    def __estimate_tuning(self) -> float:
+        """
+        librosa.estimate_tuning on the shared pitch track: pitches of the louder half of the peaks.
+        """
+        pitches, magnitudes = self.pitch_track
+        pitch_mask = pitches > 0
+        threshold = np.median(magnitudes[pitch_mask]) if pitch_mask.any() else 0.0
+        return float(librosa.pitch_tuning(pitches[(magnitudes >= threshold) & pitch_mask], bins_per_octave=12))
+
+    def chroma_filterbank(self) -> np.ndarray:
+        return chroma_filterbank(self.sampling_rate, self.n_fft, self.tuning)
+
+FEATURE_REGISTRY: Dict[str, Feature_Extractor] = {}
+
+def register_feature(name: str, cost: float, inputs: List[str] = None):
+    """
+    Decorator registering an extractor under `name`.
+    """
+    def decorator(function):
+        FEATURE_REGISTRY[name] = Feature_Extractor(name, function, cost, inputs or ['spectrogram'])
+        return function
+    return decorator
+
+#features used to build the perceptual hash, see ps.lsh_feature_vector
+HASH_FEATURES = ['mfccs', 'spectral_contrast', 'energy_envelope', 'spectral_peaks']
+#features read by the scorer (scoring.Database_Matrix), besides the hash
+SCORE_FEATURES = ['energy_envelope', 'spectral_peaks']
+
+PROFILES: Dict[str, List[str]] = {
+    # stored in the database index
+    'index': ['spectral_centroid', 'spectral_contrast', 'mfccs', 'energy_envelope', 'spectral_peaks'],
+    # only what the active scorer and the hash need
+    'query': sorted(set(HASH_FEATURES) | set(SCORE_FEATURES)),
+    # features that best apply to one dimension
+    'full_song': ['chroma', 'onset_strength', 'energy_entropy', 'spectral_flatness'],
+    'vocals': ['spectral_flatness', 'pitch', 'hnr'],
+    'music': ['energy_entropy', 'chroma', 'pitch', 'onset_strength'],
+}
+
+def profile_features(profile: Union[str, List[str]]) -> List[str]:
+    """
+    return the feature names of a profile, in dependency order.\n
+    profile: a PROFILES key, 'all', or an explicit list of feature names.
+    """
+    if isinstance(profile, str):
+        if profile == 'all':
+            names = list(FEATURE_REGISTRY)
+        elif profile in PROFILES:
+            names = PROFILES[profile]
+        else:
+            raise ValueError(f"Unknown feature profile '{profile}'. Supported: {sorted(PROFILES)} or 'all'.")
+    else:
+        names = list(profile)
+
+    ordered = []
+
+    def visit(name):
+        if name in ordered:
+            return
+        if name not in FEATURE_REGISTRY:
+            raise KeyError(f"Unknown feature '{name}'")
+        for dependency in FEATURE_REGISTRY[name].inputs:
+            if dependency in FEATURE_REGISTRY: visit(dependency)
+        ordered.append(name)
+
+    for name in names: visit(name)
+
+    return ordered
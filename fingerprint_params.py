@@ -0,0 +1,69 @@
+from typing import Dict
+import hashlib
+import json
+
+# Bump whenever the fingerprint code changes in a way that makes stored
+# fingerprints incompatible with freshly computed ones.
+FINGERPRINT_VERSION = 1
+
+SAMPLE_RATE = 48000
+ANALYSIS_SECONDS = 18
+N_FFT = 2048
+HOP_LENGTH = 512
+N_MFCC = 13
+# spectrogram cache storage: 'float32' (exact) or 'uint8' (quantized to 1/255)
+SPECTROGRAM_DTYPE = 'float32'
+# locality-sensitive p_hash: random-hyperplane SimHash packed into HASH_BITS / 64 uint64 words
+HASH_ALGORITHM = 'simhash'
+HASH_BITS = 128
+HASH_SEED = 0
+LSH_ENVELOPE_LENGTH = 64
+LSH_PEAK_BANDS = 32
+
+# energy envelopes are FFT resampled to this length and z-normalized at fingerprint time
+ENVELOPE_LENGTH = 256
+
+# spectral peak picking: 'max_filter' (vectorized) or 'find_peaks' (per time frame)
+PEAK_METHOD = 'max_filter'
+# time frames covered by the max_filter neighborhood, 1 --> per frame peaks
+PEAK_TIME_NEIGHBORHOOD = 1
+
+# landmark (anchor, target, dt) hashes: strongest peaks kept per frame, targets per anchor, max frames between them
+LANDMARK_PEAKS_PER_FRAME = 3
+LANDMARK_FAN_OUT = 5
+LANDMARK_MAX_DT = 32
+
+def get_params() -> Dict:
+    """
+    return every parameter that affects the content of a fingerprint.\n
+    Stored in the header of the on-disk index.
+    """
+    return {
+        'fingerprint_version': FINGERPRINT_VERSION,
+        'sample_rate': SAMPLE_RATE,
+        'analysis_seconds': ANALYSIS_SECONDS,
+        'n_fft': N_FFT,
+        'hop_length': HOP_LENGTH,
+        'n_mfcc': N_MFCC,
+        'spectrogram_dtype': SPECTROGRAM_DTYPE,
+        'hash_algorithm': HASH_ALGORITHM,
+        'hash_bits': HASH_BITS,
+        'hash_seed': HASH_SEED,
+        'lsh_envelope_length': LSH_ENVELOPE_LENGTH,
+        'lsh_peak_bands': LSH_PEAK_BANDS,
+        'envelope_length': ENVELOPE_LENGTH,
+        'peak_method': PEAK_METHOD,
+        'peak_time_neighborhood': PEAK_TIME_NEIGHBORHOOD,
+        'landmark_peaks_per_frame': LANDMARK_PEAKS_PER_FRAME,
+        'landmark_fan_out': LANDMARK_FAN_OUT,
+        'landmark_max_dt': LANDMARK_MAX_DT,
+    }
+
+def params_digest(params: Dict = None) -> str:
+    """
+    return a short digest of the fingerprint parameters, used to detect stale indexes.
+    """
+    if params is None: params = get_params()
+    encoded = json.dumps(params, sort_keys=True).encode()
+
+    return hashlib.sha1(encoded).hexdigest()[:16]
@@ -0,0 +1,110 @@
+"""
+Compact in-memory fingerprint.
+
+`Audio_Fingerprint` keeps its spectrogram and the analysis intermediates (power, dB, filterbanks)
+so more features can be extracted later, tens of MB per track. Once the features are extracted,
+`Fingerprint_Record` keeps only what matching reads, in typed arrays:
+
+    hash_words   (HASH_BITS / 64,) uint64    packed perceptual hash
+    peaks        (P, 2) uint16               [freq_bin, time_bin], both below 2**16 for the analysed window
+    landmarks    (L, 2) int32                [hash, anchor_time]
+    vectors      float32 (energy_envelope, mfccs, spectral_contrast, other list features)
+    scalars      float (spectral_centroid, ...)
+
+A record answers the same getters the scorers and the search read (get_hash_str, get_spectral_peaks,
+get_energy_envelope, get_landmarks, ...), so it can be searched with and stored in place of a fingerprint.
+"""
+from typing import Dict, List
+import numpy as np
+import processing_and_searching as ps
+
+PEAK_DTYPE = np.uint16
+VECTOR_DTYPE = np.float32
+LANDMARK_DTYPE = np.int32
+
+def compact_feature(value):
+    """
+    return a raw feature in its compact type: peaks uint16 (P, 2), other lists float32, scalars float.
+    """
+    if np.isscalar(value):
+        return float(value)
+    array = np.asarray(value)
+    if array.ndim == 2:
+        return np.ascontiguousarray(array, dtype=PEAK_DTYPE)
+    return np.ascontiguousarray(array, dtype=VECTOR_DTYPE)
+
+class Fingerprint_Record:
+    """
+Matching data of one track without its spectrogram, see the module docstring.\n
+Build it with `Fingerprint_Record.from_fingerprint(fingerprint dict)` or `Audio_Fingerprint.to_record()`.
+    """
+    __slots__ = ('audio_name', 'file_path', 'dimension', 'hash_words', 'landmarks', 'features')
+
+    def __init__(self, audio_name: str, file_path: str, dimension: str, hash_words: np.ndarray, landmarks: np.ndarray,
+                 features: Dict):
+        self.audio_name = audio_name
+        self.file_path = file_path
+        self.dimension = dimension
+        self.hash_words = np.asarray(hash_words, dtype=np.uint64)
+        self.landmarks = np.ascontiguousarray(landmarks, dtype=LANDMARK_DTYPE).reshape(-1, 2)
+        self.features = {name: compact_feature(value) for name, value in features.items()}
+
+    @classmethod
+    def from_fingerprint(cls, fingerprint: Dict):
+        """
+        return the record of a fingerprint dict (Audio_Fingerprint.get_fingerprint, Fingerprint_Index.fingerprint).
+        """
+        return cls(fingerprint['audio_name'], fingerprint['file_path'], fingerprint['dimension'],
+                   ps.hash_to_words(fingerprint['hash_str']), fingerprint.get('landmarks', ()), fingerprint['raw_features'])
+
+    def get_fingerprint(self) -> Dict:
+        """
+        return the fingerprint dict of the record, arrays are shared with the record.
+        """
+        return {
+            'file_path': self.file_path,
+            'audio_name': self.audio_name,
+            'dimension': self.dimension,
+            'raw_features': dict(self.features),
+            'hash_str': self.get_hash_str(),
+            'landmarks': self.landmarks
+        }
+
+    def get_raw_features(self):
+        return self.features
+
+    def get_file_path(self):
+        return self.file_path
+
+    def get_audio_name(self):
+        return self.audio_name
+
+    def get_dimension(self):
+        return self.dimension
+
+    def get_hash_str(self):
+        return ps.words_to_hash(self.hash_words)
+
+    def get_landmarks(self):
+        return self.landmarks
+
+    def get_feature(self, name: str):
+        if name not in self.features:
+            raise KeyError(f"Feature '{name}' was not stored with this fingerprint")
+        return self.features[name]
+
+    def computed_features(self) -> List[str]:
+        return list(self.features)
+
+    def get_spectral_peaks(self):
+        return self.get_feature('spectral_peaks')
+
+    def get_energy_envelope(self):
+        return self.get_feature('energy_envelope')
+
+    def nbytes(self) -> int:
+        """
+        return the bytes held by the record's arrays (names, paths and object headers excluded).
+        """
+        arrays = [self.hash_words, self.landmarks] + [value for value in self.features.values() if isinstance(value, np.ndarray)]
+        return sum(array.nbytes for array in arrays) + 8 * sum(not isinstance(value, np.ndarray) for value in self.features.values())
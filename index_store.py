@@ -0,0 +1,302 @@
+"""
+Binary on-disk fingerprint index.
+
+Layout:
+    MAGIC (8 bytes) | format version (uint32) | header length (uint32) | header (utf-8 json)
+    followed by the raw arrays, each one aligned to ALIGNMENT bytes.
+
+The header records the fingerprint parameters, the source signature, the per-record
+metadata (name, path, dimension, hash) and a table describing every array
+(dtype, shape, offset). Arrays are read back as views over a single read-only memory map.
+"""
+from typing import List, Dict, Tuple, Union
+import os
+import json
+import struct
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+MAGIC = b'DSPFPIDX'
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+META_KEYS = ['audio_name', 'file_path', 'dimension', 'hash_str']
+# per-fingerprint arrays stored outside raw_features
+ARRAY_KEYS = ['landmarks']
+
+def _align(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+def _pack_feature(name: str, values: List, arrays: Dict[str, np.ndarray]):
+    """
+    Convert one raw feature of every fingerprint into contiguous arrays.\n
+    scalars --> (N,) float64\n
+    equal length lists --> (N, k) float32\n
+    variable length lists --> values + offsets (N+1,)\n
+    lists of pairs (spectral peaks, landmarks) --> (M, 2) + offsets (N+1,), integer arrays keep their dtype
+    up to 32 bits (uint16 peaks stay uint16), anything else is stored as int32
+    """
+    if all(np.isscalar(v) for v in values):
+        arrays[name] = np.asarray(values, dtype=np.float64)
+        return
+
+    values = [np.asarray(v) for v in values]
+    nested = any(v.ndim == 2 for v in values)
+    lengths = np.array([len(v) for v in values], dtype=np.int64)
+
+    if not nested and np.all(lengths == lengths[0]):
+        arrays[name] = np.asarray(values, dtype=np.float32).reshape(len(values), int(lengths[0]))
+        return
+
+    offsets = np.zeros(len(values) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+
+    if nested:
+        width = next(v.shape[1] for v in values if v.ndim == 2)
+        dtypes = [v.dtype for v in values if v.ndim == 2 and v.dtype.kind in 'iu']
+        dtype = np.result_type(*dtypes) if dtypes else np.dtype(np.int32)
+        if dtype.itemsize > 4: dtype = np.dtype(np.int32)
+        arrays[name] = np.concatenate([v.reshape(len(v), width).astype(dtype, copy=False) for v in values])
+    else:
+        arrays[name] = np.concatenate([v.astype(np.float32) for v in values])
+
+    arrays[name + '/offsets'] = offsets
+
+def pack_fingerprints(fingerprints: List[Dict]):
+    """
+    return (records, arrays): the per-record metadata and the columnar feature arrays.
+    """
+    records = [{key: fp[key] for key in META_KEYS} for fp in fingerprints]
+    arrays: Dict[str, np.ndarray] = {}
+
+    if not fingerprints:
+        return records, arrays
+
+    feature_names = sorted(fingerprints[0]['raw_features'].keys())
+    for name in feature_names:
+        values = [fp['raw_features'][name] for fp in fingerprints]
+        _pack_feature('raw/' + name, values, arrays)
+        
+    for name in ARRAY_KEYS:
+        if name in fingerprints[0]:
+            _pack_feature('fp/' + name, [fp[name] for fp in fingerprints], arrays)
+
+    return records, arrays
+
+def merge_packed(chunks: List[Tuple[List[Dict], Dict[str, np.ndarray]]]):
+    """
+    return (records, arrays) of consecutive pack_fingerprints chunks, as if packed at once.\n
+    Offsets arrays are shifted by the number of values in the preceding chunks.
+    """
+    chunks = [chunk for chunk in chunks if chunk[0]]
+    records = [record for chunk_records, chunk_arrays in chunks for record in chunk_records]
+    if not chunks:
+        return records, {}
+
+    arrays = {}
+    for name in chunks[0][1]:
+        if not name.endswith('/offsets'):
+            arrays[name] = np.concatenate([chunk_arrays[name] for chunk_records, chunk_arrays in chunks])
+            continue
+
+        values_name = name[:-len('/offsets')]
+        offsets = [np.zeros(1, dtype=np.int64)]
+        total = 0
+        for chunk_records, chunk_arrays in chunks:
+            offsets.append(chunk_arrays[name][1:] + total)
+            total += len(chunk_arrays[values_name])
+        arrays[name] = np.concatenate(offsets)
+
+    return records, arrays
+
+def write_index(file_path: str, fingerprints: List[Dict], params: Dict, sources: Dict, extra_arrays: Dict[str, np.ndarray] = None):
+    """
+    Write the fingerprints into a versioned binary index.\n
+    The file is written next to the target and renamed, so readers never see a partial index.
+    """
+    records, arrays = pack_fingerprints(fingerprints)
+    write_packed(file_path, records, arrays, params, sources, extra_arrays)
+
+def write_packed(file_path: str, records: List[Dict], arrays: Dict[str, np.ndarray], params: Dict, sources: Dict,
+                 extra_arrays: Dict[str, np.ndarray] = None):
+    """
+    Write already packed fingerprints (see pack_fingerprints, merge_packed) into a versioned binary index.
+    """
+    arrays = dict(arrays)
+    if extra_arrays: arrays.update(extra_arrays)
+
+    table = {}
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        arrays[name] = array
+        table[name] = {'dtype': array.dtype.str, 'shape': list(array.shape), 'offset': offset}
+        offset = _align(offset + array.nbytes)
+
+    header = {
+        'params': params,
+        'sources': sources,
+        'count': len(records),
+        'records': records,
+        'arrays': table,
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    data_start = _align(_PREAMBLE.size + len(header_bytes))
+
+    folder = os.path.dirname(file_path)
+    if folder: os.makedirs(folder, exist_ok=True)
+    # one temp file per writer, concurrent writers never truncate each other's file
+    fd, tmp_path = tempfile.mkstemp(dir=folder or '.', prefix=os.path.basename(file_path) + '.', suffix='.tmp')
+
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(_PREAMBLE.pack(MAGIC, FORMAT_VERSION, len(header_bytes)))
+            file.write(header_bytes)
+            for name, array in arrays.items():
+                file.seek(data_start + table[name]['offset'])
+                file.write(array.tobytes())
+            file.truncate(data_start + offset)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path): os.remove(tmp_path)
+        raise
+
+@contextmanager
+def lock_index(file_path: str):
+    """
+    Hold an exclusive lock on `file_path` (through a '<file_path>.lock' file) until the block exits.\n
+    Blocks while another process or thread holds it, so an index is rebuilt by one writer at a time.
+    """
+    folder = os.path.dirname(file_path)
+    if folder: os.makedirs(folder, exist_ok=True)
+
+    with open(file_path + '.lock', 'a+b') as file:
+        if os.name == 'nt':
+            file.seek(0)
+            while True:
+                # LK_LOCK gives up after ~10 seconds, a rebuild can take longer
+                try:
+                    msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+def read_header(file_path: str) -> Union[Dict, None]:
+    """
+    return the index header only, without mapping any array.\n
+    None if the file is missing, not an index or written with another format version.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            magic, version, header_len = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                return None
+            return json.loads(file.read(header_len).decode('utf-8'))
+    except (OSError, struct.error, ValueError):
+        return None
+
+class Fingerprint_Index:
+    """
+Read-only view of an on-disk index.\n
+Arrays are zero-copy views over a memory map, fingerprint dicts are only built on request.
+    """
+    def __init__(self, file_path: str):
+        with open(file_path, 'rb') as file:
+            magic, version, header_len = _PREAMBLE.unpack(file.read(_PREAMBLE.size))
+            if magic != MAGIC:
+                raise ValueError(f"{file_path} is not a fingerprint index")
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported index format version {version}")
+            header = json.loads(file.read(header_len).decode('utf-8'))
+
+        self.file_path = file_path
+        self.header = header
+        self.params = header['params']
+        self.sources = header['sources']
+        self.records = header['records']
+        self.arrays: Dict[str, np.ndarray] = {}
+
+        data_start = _align(_PREAMBLE.size + header_len)
+        table = header['arrays']
+        if os.path.getsize(file_path) > data_start:
+            self.__mmap = np.memmap(file_path, dtype=np.uint8, mode='r')
+        for name, info in table.items():
+            dtype = np.dtype(info['dtype'])
+            shape = tuple(info['shape'])
+            count = int(np.prod(shape)) if shape else 1
+            if count == 0:
+                self.arrays[name] = np.zeros(shape, dtype=dtype)
+                continue
+            start = data_start + info['offset']
+            array = np.frombuffer(self.__mmap, dtype=dtype, count=count, offset=start)
+            self.arrays[name] = array.reshape(shape)
+
+        self.__feature_names = sorted({name.split('/')[1] for name in self.arrays if name.startswith('raw/')})
+
+    def __len__(self):
+        return len(self.records)
+
+    def feature_names(self) -> List[str]:
+        return list(self.__feature_names)
+
+    def get_feature(self, name: str, i: int, as_list: bool = True, copy: bool = False):
+        """
+        return raw feature `name` of record i.\n
+        as_list=False returns zero-copy array views instead of python lists, copy=True detaches them from the memory map.
+        """
+        array = self.arrays['raw/' + name]
+        offsets = self.arrays.get('raw/' + name + '/offsets')
+
+        if offsets is not None:
+            value = array[offsets[i]:offsets[i + 1]]
+        elif array.ndim == 1:
+            return float(array[i])
+        else:
+            value = array[i]
+
+        if as_list:
+            return value.tolist()
+        return value.copy() if copy else value
+
+    def get_array(self, name: str, i: int, copy: bool = False) -> np.ndarray:
+        """
+        return per-fingerprint array `name` (see ARRAY_KEYS) of record i.
+        """
+        array = self.arrays['fp/' + name]
+        offsets = self.arrays['fp/' + name + '/offsets']
+        value = array[offsets[i]:offsets[i + 1]]
+        
+        return value.copy() if copy else value
+
+    def fingerprint(self, i: int, as_list: bool = True, copy: bool = False) -> Dict:
+        fingerprint = dict(self.records[i])
+        fingerprint['raw_features'] = {name: self.get_feature(name, i, as_list, copy) for name in self.__feature_names}
+        for name in ARRAY_KEYS:
+            if 'fp/' + name in self.arrays:
+                fingerprint[name] = self.get_array(name, i, copy)
+        return fingerprint
+
+    def to_fingerprints(self, as_list: bool = True) -> List[Dict]:
+        return [self.fingerprint(i, as_list) for i in range(len(self))]
+
+def load_index(file_path: str) -> Fingerprint_Index:
+    return Fingerprint_Index(file_path)
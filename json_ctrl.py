@@ -10,11 +10,19 @@ def clear_json_file(file_path: str):
     with open(file_path, 'w') as file:
         file.write('')
         
+def to_builtin(value):
+    # numpy arrays and scalars (e.g. spectral peaks) are written as plain lists / numbers
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
 def write_in_json_file(file_path:str, data, indent=4):
     with open(file_path, 'w') as file:
-        json.dump(data, file, indent=indent)
-        
-clear_json_file(matches_json)
-clear_json_file(input_hash_json)
-clear_json_file(hashed_db_path)
-clear_json_file(raw_data_path)
\ No newline at end of file
+        json.dump(data, file, indent=indent, default=to_builtin)
+
+def clear_output_files():
+    """
+    Empty the JSON debug outputs (db, hashed db, matches, input hash). Call it explicitly, importing this module has no side effects.
+    """
+    for file_path in (matches_json, input_hash_json, hashed_db_path, raw_data_path):
+        clear_json_file(file_path)
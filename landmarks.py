@@ -0,0 +1,176 @@
+"""
+Shazam-style landmark hashes and the inverted index used to look them up.
+
+A landmark pairs an anchor peak with a target peak a few frames later and packs
+(anchor freq, target freq, time delta) into one integer. The inverted index maps every
+hash to its postings (track id, anchor time); a query votes on (track, time offset) so only
+the postings hit by the query hashes are touched.
+"""
+from typing import Dict, List
+import numpy as np
+import fingerprint_params as fparams
+
+FREQ_BITS = 11
+DT_BITS = 6
+
+def select_constellation(peaks: np.ndarray, spectrogram: np.ndarray, peaks_per_frame: int = None) -> np.ndarray:
+    """
+    return the strongest `peaks_per_frame` peaks of every time frame, ordered by time then frequency.\n
+    peaks: (P, 2) array of [freq_bin, time_bin].
+    """
+    if peaks_per_frame is None: peaks_per_frame = fparams.LANDMARK_PEAKS_PER_FRAME
+    if len(peaks) == 0:
+        return peaks
+
+    freqs, times = peaks[:, 0], peaks[:, 1]
+    magnitudes = spectrogram[freqs, times]
+
+    # time ascending, magnitude descending
+    order = np.lexsort((-magnitudes, times))
+    sorted_times = times[order]
+    frame_start = np.searchsorted(sorted_times, sorted_times, side='left')
+    rank = np.arange(len(order)) - frame_start
+
+    kept = order[rank < peaks_per_frame]
+    kept = kept[np.lexsort((freqs[kept], times[kept]))]
+
+    return peaks[kept]
+
+def generate_landmarks(constellation: np.ndarray, fan_out: int = None, max_dt: int = None) -> np.ndarray:
+    """
+    return a (L, 2) int32 array of [hash, anchor_time].\n
+    Every anchor is paired with up to `fan_out` following peaks that lie 1..max_dt frames later.
+    """
+    if fan_out is None: fan_out = fparams.LANDMARK_FAN_OUT
+    if max_dt is None: max_dt = fparams.LANDMARK_MAX_DT
+    max_dt = min(max_dt, (1 << DT_BITS) - 1)
+
+    if len(constellation) < 2:
+        return np.zeros((0, 2), dtype=np.int32)
+
+    freqs = constellation[:, 0].astype(np.int64)
+    times = constellation[:, 1].astype(np.int64)
+    n = len(constellation)
+
+    # first target candidate of every anchor: the first peak of a later frame
+    first_target = np.searchsorted(times, times + 1, side='left')
+
+    hashes = []
+    anchor_times = []
+    for k in range(fan_out):
+        target = first_target + k
+        valid = target < n
+        anchor = np.nonzero(valid)[0]
+        target = target[valid]
+
+        dt = times[target] - times[anchor]
+        in_zone = dt <= max_dt
+        anchor, target, dt = anchor[in_zone], target[in_zone], dt[in_zone]
+
+        hashes.append((freqs[anchor] << (FREQ_BITS + DT_BITS)) | (freqs[target] << DT_BITS) | dt)
+        anchor_times.append(times[anchor])
+
+    hashes = np.concatenate(hashes)
+    anchor_times = np.concatenate(anchor_times)
+    order = np.argsort(anchor_times, kind='stable')
+
+    return np.stack([hashes[order], anchor_times[order]], axis=1).astype(np.int32)
+
+class Inverted_Index:
+    """
+Hash --> postings (track id, anchor time), stored as sorted arrays (CSR layout).\n
+keys: unique hashes, offsets: postings range of every key, track_ids / times: the postings.
+    """
+    ARRAY_NAMES = ['keys', 'offsets', 'track_ids', 'times']
+
+    def __init__(self, keys: np.ndarray, offsets: np.ndarray, track_ids: np.ndarray, times: np.ndarray, n_tracks: int):
+        self.keys = keys
+        self.offsets = offsets
+        self.track_ids = track_ids
+        self.times = times
+        self.n_tracks = n_tracks
+
+    @classmethod
+    def build(cls, landmarks_per_track: List[np.ndarray]):
+        """
+        landmarks_per_track: one (L, 2) [hash, anchor_time] array per track, the list position is the track id.
+        """
+        lengths = [len(lm) for lm in landmarks_per_track]
+        if sum(lengths) == 0:
+            empty = np.zeros(0, dtype=np.int32)
+            return cls(empty, np.zeros(1, dtype=np.int64), empty, empty, len(landmarks_per_track))
+
+        all_landmarks = np.concatenate([np.asarray(lm, dtype=np.int32).reshape(-1, 2) for lm in landmarks_per_track])
+        track_ids = np.repeat(np.arange(len(landmarks_per_track), dtype=np.int32), lengths)
+
+        order = np.argsort(all_landmarks[:, 0], kind='stable')
+        hashes = all_landmarks[order, 0]
+        keys, starts = np.unique(hashes, return_index=True)
+        offsets = np.append(starts, len(hashes)).astype(np.int64)
+
+        return cls(keys, offsets, track_ids[order], all_landmarks[order, 1], len(landmarks_per_track))
+
+    def to_arrays(self, prefix: str = 'inverted/') -> Dict[str, np.ndarray]:
+        return {prefix + name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], n_tracks: int, prefix: str = 'inverted/'):
+        """
+        return the inverted index stored in `arrays`, None if it is missing.
+        """
+        if prefix + 'keys' not in arrays:
+            return None
+        return cls(*(arrays[prefix + name] for name in cls.ARRAY_NAMES), n_tracks)
+
+    def __len__(self):
+        return len(self.track_ids)
+
+    def slice(self, start: int, stop: int):
+        """
+        return the inverted index of tracks [start, stop) (ids shifted to start at 0).\n
+        Postings stay sorted by hash, so it is one filtering pass, no re-sort.
+        """
+        kept = (self.track_ids >= start) & (self.track_ids < stop)
+        kept_before = np.zeros(len(kept) + 1, dtype=np.int64)
+        np.cumsum(kept, out=kept_before[1:])
+        offsets = kept_before[self.offsets]
+        used = np.flatnonzero(offsets[1:] > offsets[:-1])
+
+        return Inverted_Index(self.keys[used], np.append(offsets[used], offsets[-1]), self.track_ids[kept] - start,
+                              self.times[kept], stop - start)
+
+    def vote(self, query_landmarks: np.ndarray) -> np.ndarray:
+        """
+        return the best aligned vote count of every track.\n
+        Each query hash votes for (track, db_time - query_time); a track's score is its most voted offset,
+        so matching peaks only count when they line up in time.
+        """
+        scores = np.zeros(self.n_tracks, dtype=np.int64)
+        query_landmarks = np.asarray(query_landmarks).reshape(-1, 2)
+        if len(query_landmarks) == 0 or len(self.keys) == 0:
+            return scores
+
+        query_hashes = query_landmarks[:, 0]
+        pos = np.searchsorted(self.keys, query_hashes)
+        pos = np.minimum(pos, len(self.keys) - 1)
+        hit = self.keys[pos] == query_hashes
+        pos, query_times = pos[hit], query_landmarks[hit, 1]
+        if len(pos) == 0:
+            return scores
+
+        # expand every hit into its postings range without a python loop
+        starts = self.offsets[pos]
+        counts = self.offsets[pos + 1] - starts
+        total = int(counts.sum())
+        run_starts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+        postings = run_starts + np.arange(total)
+
+        tracks = self.track_ids[postings].astype(np.int64)
+        offsets = self.times[postings].astype(np.int64) - np.repeat(query_times.astype(np.int64), counts)
+
+        offsets -= offsets.min()
+        pair = tracks * (int(offsets.max()) + 1) + offsets
+        pairs, votes = np.unique(pair, return_counts=True)
+        np.maximum.at(scores, pairs // (int(offsets.max()) + 1), votes)
+
+        return scores
@@ -0,0 +1,47 @@
+"""
+Deferred imports of the heavy dependencies.
+
+librosa, scipy.signal / stats / spatial / interpolate / ndimage and soundfile take most of the startup
+time (about 0.7 s for `import matchmaker`). Modules bind them with `librosa = lazy_import('librosa')`
+and use them as usual; the real import runs on the first attribute access, so CLI tools, servers and
+worker processes only pay for what they call.
+"""
+import importlib
+import sys
+
+# the modules deferred across the project, see preload
+DEFERRED_MODULES = ['librosa', 'soundfile', 'scipy.signal', 'scipy.ndimage', 'scipy.stats', 'scipy.interpolate',
+                    'scipy.spatial.distance']
+
+class Lazy_Module:
+    """
+Stand-in for module `name`, imported on first attribute access. The import lock makes concurrent first uses safe.
+    """
+    __slots__ = ('_name', '_module')
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self):
+        state = 'loaded' if self._module is not None else 'not loaded'
+        return f"<lazy module '{self._name}' ({state})>"
+
+def lazy_import(name: str):
+    """
+    return module `name` if it is already imported, a Lazy_Module otherwise.
+    """
+    return sys.modules.get(name) or Lazy_Module(name)
+
+def preload(names=None):
+    """
+    Import the deferred modules now (default: DEFERRED_MODULES), e.g. once a server or the GUI is up,
+    so the first search does not pay for them.
+    """
+    for name in names or DEFERRED_MODULES:
+        importlib.import_module(name)
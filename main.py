@@ -1,20 +1,68 @@
-from PyQt5 import QtWidgets, uic
+from PyQt5 import QtWidgets
 import sys
-from PyQt5.QtCore import QUrl, Qt
+from PyQt5.QtCore import QUrl, Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 from PyQt5.QtMultimedia import QMediaPlayer, QAudioOutput, QMediaContent
 from matchmaker import Match_Maker
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QPushButton, QFrame, QHBoxLayout, QWidget, QScrollArea, QSpacerItem, QSizePolicy
+from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QLabel, QPushButton, QFrame, QHBoxLayout, QWidget, QScrollArea, QSpacerItem, QSizePolicy, QProgressBar
 from stylesheet import set_stylesheet
+# generated from main_window.ui, regenerate after editing the form: pyuic5 main_window.ui -o main_window_ui.py
+from main_window_ui import Ui_MainWindow
 
 
-class MainWindow(QtWidgets.QMainWindow):
+class Worker_Signals(QObject):
+    """
+progress: (message, done, total), total = 0 --> busy indicator\n
+finished: the return value of the task\n
+failed: the error message
+    """
+    progress = pyqtSignal(str, int, int)
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+class Worker(QRunnable):
+    """
+Runs function(*args, **kwargs) on a thread pool, results are delivered to the GUI thread through signals.\n
+A cancelled worker does not start if it is still queued, and its result is dropped if it is already running.
+    """
+    def __init__(self, function, *args, **kwargs):
+        super().__init__()
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = Worker_Signals()
+        self.cancelled = False
+        
+    def cancel(self):
+        self.cancelled = True
+        
+    def report(self, done, total, message=''):
+        if not self.cancelled:
+            self.signals.progress.emit(message, done, total)
+        
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = self.function(*self.args, **self.kwargs)
+        except Exception as error:
+            if not self.cancelled: self.signals.failed.emit(f"{type(error).__name__}: {error}")
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(result)
+
+
+class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def __init__(self):
         super(MainWindow, self).__init__()
-        # Insatntiate match maker class
-        # Database will be created in the background
-        self.mk = Match_Maker()
-        # Load the UI file
-        self.ui= uic.loadUi('main_window.ui', self)
+        # Match maker is instantiated on the worker thread (see load_database), the window shows up right away
+        self.mk = None
+        # one worker thread: the database is loaded first, searches then run one at a time in pick order
+        self.pool = QThreadPool()
+        self.pool.setMaxThreadCount(1)
+        self.search_worker = None
+        # Build the precompiled form, widgets become attributes of the window as with uic.loadUi
+        self.setupUi(self)
+        self.ui = self
         self.curr_audio_file = None
         self.selected_song = None
         self.song_list = ScrollableSongList()
@@ -40,7 +88,59 @@ class MainWindow(QtWidgets.QMainWindow):
         self.mix_song2 = None
         self.w1 = 0.5
         self.w2 = 0.5
+        # once a mix was searched, moving the weight slider re-mixes after a short pause
+        self.mixed = False
+        self.remix_timer = QTimer(self)
+        self.remix_timer.setSingleShot(True)
+        self.remix_timer.setInterval(150)
+        self.remix_timer.timeout.connect(lambda: self.get_top_matches(True))
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setMaximumWidth(200)
+        self.ui.statusbar.addPermanentWidget(self.progress_bar)
+        self.set_ready(False)
         self.ui.show()
+        self.load_database()
+    
+    def set_ready(self, ready, message=None):
+        """
+        Enable the search controls once the database is loaded.
+        """
+        for btn in (self.ui.choose_file, self.ui.choose_file_2, self.ui.choose_file_3, self.ui.Mix_btn):
+            btn.setEnabled(ready)
+        self.progress_bar.setVisible(not ready)
+        if message: self.ui.statusbar.showMessage(message)
+        
+    def update_progress(self, message, done, total):
+        # total = 0 --> busy indicator
+        self.progress_bar.setVisible(True)
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.ui.statusbar.showMessage(f"{message} {done}/{total}" if total else message)
+        
+    def load_database(self):
+        def load():
+            # the list shows the 10 best matches, searches only select and rank those
+            match_maker = Match_Maker(progress=lambda done, total: worker.report(done, total, "Fingerprinting database"), top_k=10)
+            worker.report(0, 0, "Loading audio libraries...")
+            match_maker.warm_up()
+            return match_maker
+        
+        worker = Worker(load)
+        worker.signals.progress.connect(self.update_progress)
+        worker.signals.finished.connect(self.database_loaded)
+        worker.signals.failed.connect(lambda error: self.ui.statusbar.showMessage(f"Database loading failed: {error}"))
+        self.update_progress("Loading database...", 0, 0)
+        self.pool.start(worker)
+        
+    def database_loaded(self, match_maker):
+        self.mk = match_maker
+        self.set_ready(True, f"Ready: {self.mk.get_database_size()} tracks")
+        
+    def closeEvent(self, event):
+        # queued searches are dropped, a running task finishes in the background
+        if self.search_worker: self.search_worker.cancel()
+        self.pool.clear()
+        super().closeEvent(event)
     
     def connections(self):
         self.ui.choose_file.clicked.connect(lambda: self.choose_audio_file(1))
@@ -69,27 +169,71 @@ class MainWindow(QtWidgets.QMainWindow):
                 self.mix_song1 = file_path
                 self.ui.song_name_2.setText(file_path.split("/")[-1])
                 self.ui.play_song_btn_2.show()
+                self.prefetch_source(file_path)
             else:
                 self.mix_song2 = file_path
                 self.ui.song_name_3.setText(file_path.split("/")[-1])
                 self.ui.play_song_btn_3.show()
+                self.prefetch_source(file_path)
+                
+    def prefetch_source(self, file_path):
+        # decode the mix source while the user picks the other one, the Mix click then only sums buffers
+        self.mixed = False
+        if self.mk is not None:
+            self.pool.start(Worker(self.mk.load_source, file_path))
             
         
     def get_top_matches(self, mix=False):
         """
-        return the top matches
+        Search on the worker thread, the matches are shown by show_matches.\n
+        A search that has not finished yet is cancelled, its results would be stale.
         """
-        if self.song_list.songs:
-            self.song_list.clear_all_songs()    
-            
+        if self.mk is None:
+            return
+        
         if mix and self.mix_song1 and self.mix_song2:
-            self.mk.new_search(self.mix_song1, self.mix_song2, True,self.w1)
-            self.ui.Play_stop_mix.show()
-        else:       
-            self.mk.new_search(self.selected_song)  
-                   
-        matches = self.mk.get_top_matches()
+            args = (self.mix_song1, self.mix_song2, True, self.w1)
+            name = "mix"
+        elif mix:
+            return
+        else:
+            args = (self.selected_song,)
+            name = self.selected_song.split("/")[-1]
+            
+        if self.search_worker: self.search_worker.cancel()
+        
+        worker = Worker(self.run_search, *args)
+        worker.signals.finished.connect(lambda matches, worker=worker: self.show_matches(worker, matches, mix))
+        worker.signals.failed.connect(lambda error, worker=worker: self.search_failed(worker, error))
+        self.search_worker = worker
+        
+        self.update_progress(f"Searching {name}...", 0, 0)
+        self.pool.start(worker)
+        
+    def run_search(self, *args):
+        # runs on the worker thread, searches never overlap (single thread pool)
+        self.mk.new_search(*args)
+        return self.mk.get_top_matches()
+    
+    def show_matches(self, worker, matches, mix=False):
+        if worker is not self.search_worker:
+            return
+        self.search_worker = None
+        
+        if self.song_list.songs:
+            self.song_list.clear_all_songs()
         self.add_matches(matches)
+        if mix:
+            self.mixed = True
+            self.ui.Play_stop_mix.show()
+        
+        self.set_ready(True, f"Ready: {self.mk.get_database_size()} tracks")
+        
+    def search_failed(self, worker, error):
+        if worker is not self.search_worker:
+            return
+        self.search_worker = None
+        self.set_ready(True, f"Search failed: {error}")
         
 
     
@@ -101,6 +245,7 @@ class MainWindow(QtWidgets.QMainWindow):
         self.song2_w.setText(f"Song2: {int(w2*100)}")
         self.w1 = w1
         self.w2 = w2
+        if self.mixed: self.remix_timer.start()
         
     def add_matches(self, matches):
         for match in matches:
@@ -112,7 +257,8 @@ class MainWindow(QtWidgets.QMainWindow):
 
 
     def play_stop_mix(self):
-        path = self.mk.mix_path
+        # the mix is only written to disk when it is played
+        path = self.mk.get_mix_path() if self.mk else ""
         if path:
             if self.ui.Play_stop_mix.text() == "▶":
                 self.ui.Play_stop_mix.setText("◻")
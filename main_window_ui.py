@@ -0,0 +1,1012 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'main_window.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.7
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_MainWindow(object):
+    def setupUi(self, MainWindow):
+        MainWindow.setObjectName("MainWindow")
+        MainWindow.resize(947, 600)
+        MainWindow.setStyleSheet("/*\n"
+" * QDarkStyle - A dark style sheet for Qt applications\n"
+" *\n"
+" * Copyright 2012, 2013 Colin Duquesnoy <colin.duquesnoy@gmail.com>\n"
+" *\n"
+" * This software is released under the LGPLv3 license.\n"
+" * You should have received a copy of the GNU Lesser General Public License\n"
+" * along with this program. If not, see <http://www.gnu.org/licenses/>.\n"
+" */\n"
+"\n"
+"QProgressBar:horizontal {\n"
+"    border: 1px solid #3A3939;\n"
+"    text-align: center;\n"
+"    padding: 1px;\n"
+"    background: #201F1F;\n"
+"}\n"
+"QProgressBar::chunk:horizontal {\n"
+"    background-color: qlineargradient(spread:reflect, x1:1, y1:0.545, x2:1, y2:0, stop:0 rgba(28, 66, 111, 255), stop:1 rgba(37, 87, 146, 255));\n"
+"}\n"
+"\n"
+"QToolTip\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: rgb(90, 102, 117);\n"
+"    color: white;\n"
+"    padding: 1px;\n"
+"    opacity: 200;\n"
+"}\n"
+"\n"
+"QWidget\n"
+"{\n"
+"    color: silver;\n"
+"    background-color: #302F2F;\n"
+"    selection-background-color:#78879b;\n"
+"    selection-color: black;\n"
+"}\n"
+"\n"
+"QWidget:item:selected\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 0, x2: 0, y2: 1,    stop: 0 #78879b, stop: 1 #78879b\n"
+"    );\n"
+"}\n"
+"\n"
+"QMenuBar\n"
+"{\n"
+"    background-color: #302F2F;\n"
+"    color: silver;\n"
+"}\n"
+"\n"
+"QMenuBar::item\n"
+"{\n"
+"    background: transparent;\n"
+"}\n"
+"\n"
+"QMenuBar::item:selected\n"
+"{\n"
+"    background: transparent;\n"
+"    border: 1px solid #3A3939;\n"
+"}\n"
+"\n"
+"QMenuBar::item:pressed\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: #78879b;\n"
+"    color: black;\n"
+"    margin-bottom:-1px;\n"
+"    padding-bottom:1px;\n"
+"}\n"
+"\n"
+"QMenu\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    color: silver;\n"
+"}\n"
+"\n"
+"QMenu::item\n"
+"{\n"
+"    padding: 2px 20px 2px 20px;\n"
+"}\n"
+"\n"
+"QMenu::item:selected\n"
+"{\n"
+"    color: black;\n"
+"}\n"
+"\n"
+"QWidget:disabled\n"
+"{\n"
+"    color: #404040;\n"
+"    background-color: #302F2F;\n"
+"}\n"
+"\n"
+"QAbstractItemView\n"
+"{\n"
+"    alternate-background-color: #3A3939;\n"
+"    color: silver;\n"
+"    border: 1px solid 3A3939;\n"
+"    border-radius: 3px;\n"
+"    padding: 1px;\n"
+"}\n"
+"\n"
+"QWidget:focus, QMenuBar:focus\n"
+"{\n"
+"    border: 1px solid rgba(48, 86, 111);\n"
+"}\n"
+"\n"
+"QTabWidget:focus, QCheckBox:focus\n"
+"{\n"
+"    border: none;\n"
+"}\n"
+"\n"
+"QLineEdit\n"
+"{\n"
+"    background-color: #201F1F;\n"
+"    padding: 2px;\n"
+"    border-style: solid;\n"
+"    border: 1px solid #3A3939;\n"
+"    border-radius: 3px;\n"
+"    color: silver;\n"
+"}\n"
+"\n"
+"QGroupBox {\n"
+"    border:1px solid #3A3939;\n"
+"    border-radius: 7px;\n"
+"    margin-top: 2ex;\n"
+"}\n"
+"\n"
+"QGroupBox::title {\n"
+"    subcontrol-origin: margin;\n"
+"    subcontrol-position: top left;\n"
+"    padding-left: 10px;\n"
+"    padding-right: 10px;\n"
+"}\n"
+"\n"
+"QAbstractScrollArea\n"
+"{\n"
+"    border-radius: 3px;\n"
+"    border: 1px solid #3A3939;\n"
+"}\n"
+"\n"
+"QScrollBar:horizontal\n"
+"{\n"
+"    height: 15px;\n"
+"    margin: 0px 11px 0px 11px;\n"
+"    border: 1px solid #3A3939;\n"
+"    border-radius: 6px;\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 1, x2: 0, y2: 0,    stop: 0 #302F2F, stop: 1 #484846\n"
+"    );\n"
+"}\n"
+"\n"
+"QScrollBar::handle:horizontal\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 1, x2: 0, y2: 0, stop: 0 #605F5F, stop: 1 #787876\n"
+"    );\n"
+"    min-width: 5px;\n"
+"    border-radius: 5px;\n"
+"}\n"
+"\n"
+"QScrollBar::sub-line:horizontal\n"
+"{\n"
+"    border-image: url(icons/right_arrow_disabled.png);\n"
+"    width: 10px;\n"
+"    height: 10px;\n"
+"    subcontrol-position: right;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::add-line:horizontal\n"
+"{\n"
+"    border-image: url(icons/left_arrow_disabled.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: left;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::sub-line:horizontal:hover,\n"
+"QScrollBar::sub-line:horizontal:on\n"
+"{\n"
+"    border-image: url(icons/right_arrow.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: right;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"\n"
+"QScrollBar::add-line:horizontal:hover,\n"
+"QScrollBar::add-line:horizontal:on\n"
+"{\n"
+"    border-image: url(icons/left_arrow.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: left;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::up-arrow:horizontal,\n"
+"QScrollBar::down-arrow:horizontal\n"
+"{\n"
+"    background: none;\n"
+"}\n"
+"\n"
+"\n"
+"QScrollBar::add-page:horizontal,\n"
+"QScrollBar::sub-page:horizontal\n"
+"{\n"
+"    background: none;\n"
+"}\n"
+"\n"
+"QScrollBar:vertical\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 1, y1: 0, x2: 0, y2: 0, stop: 0 #302F2F, stop: 1 #484846\n"
+"    );\n"
+"    width: 15px;\n"
+"    margin: 11px 0 11px 0;\n"
+"    border: 1px solid #3A3939;\n"
+"    border-radius: 6px;\n"
+"}\n"
+"\n"
+"QScrollBar::handle:vertical\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 1, y1: 0, x2: 0, y2: 0, stop: 0 #605F5F, stop: 1 #787876\n"
+"    );\n"
+"    min-height: 5px;\n"
+"    border-radius: 5px;\n"
+"}\n"
+"\n"
+"QScrollBar::sub-line:vertical\n"
+"{\n"
+"    border-image: url(icons/up_arrow_disabled.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: top;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::add-line:vertical\n"
+"{\n"
+"    border-image: url(icons/down_arrow_disabled.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: bottom;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::sub-line:vertical:hover,\n"
+"QScrollBar::sub-line:vertical:on\n"
+"{\n"
+"\n"
+"    border-image: url(icons/up_arrow.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: top;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"\n"
+"QScrollBar::add-line:vertical:hover,\n"
+"QScrollBar::add-line:vertical:on\n"
+"{\n"
+"    border-image: url(icons/down_arrow.png);\n"
+"    height: 10px;\n"
+"    width: 10px;\n"
+"    subcontrol-position: bottom;\n"
+"    subcontrol-origin: margin;\n"
+"}\n"
+"\n"
+"QScrollBar::up-arrow:vertical,\n"
+"QScrollBar::down-arrow:vertical\n"
+"{\n"
+"    background: none;\n"
+"}\n"
+"\n"
+"\n"
+"QScrollBar::add-page:vertical,\n"
+"QScrollBar::sub-page:vertical\n"
+"{\n"
+"    background: none;\n"
+"}\n"
+"\n"
+"QTextEdit\n"
+"{\n"
+"    background-color: #302F2F;\n"
+"    color: silver;\n"
+"    border: 1px solid #3A3939;\n"
+"}\n"
+"\n"
+"QPlainTextEdit\n"
+"{\n"
+"    background-color: #201F1F;;\n"
+"    color: silver;\n"
+"    border-radius: 3px;\n"
+"    border: 1px solid #3A3939;\n"
+"}\n"
+"\n"
+"QHeaderView::section\n"
+"{\n"
+"    background-color: #3A3939;\n"
+"    color: silver;\n"
+"    padding-left: 4px;\n"
+"    border: 1px solid #6c6c6c;\n"
+"}\n"
+"\n"
+"QCheckBox:disabled\n"
+"{\n"
+"    color: #404040;\n"
+"}\n"
+"\n"
+"QSizeGrip {\n"
+"    image: url(icons/sizegrip.png);\n"
+"    width: 12px;\n"
+"    height: 12px;\n"
+"}\n"
+"\n"
+"\n"
+"QMainWindow::separator\n"
+"{\n"
+"    background-color: #302F2F;\n"
+"    color: white;\n"
+"    padding-left: 4px;\n"
+"    spacing: 2px;\n"
+"    border: 1px dashed #3A3939;\n"
+"}\n"
+"\n"
+"QMainWindow::separator:hover\n"
+"{\n"
+"\n"
+"    background-color: QLinearGradient(\n"
+"        x1:0, y1:0, x2:0, y2:1, stop:0 #58677b, stop:0.5 #78879b stop:1 #58677b\n"
+"    );\n"
+"    color: white;\n"
+"    padding-left: 4px;\n"
+"    border: 1px solid #3A3939;\n"
+"    spacing: 2px; \n"
+"}\n"
+"\n"
+"\n"
+"QMenu::separator\n"
+"{\n"
+"    height: 1px;\n"
+"    background-color: #3A3939;\n"
+"    color: white;\n"
+"    padding-left: 4px;\n"
+"    margin-left: 10px;\n"
+"    margin-right: 5px;\n"
+"}\n"
+"\n"
+"QRadioButton::indicator:checked,\n"
+"QRadioButton::indicator:unchecked\n"
+"{\n"
+"    color: #b1b1b1;\n"
+"    background-color: #302F2F;\n"
+"    border: 1px solid silver;\n"
+"    border-radius: 5px;\n"
+"}\n"
+"\n"
+"QRadioButton::indicator:checked\n"
+"{\n"
+"    background-color: qradialgradient(\n"
+"        cx: 0.5, cy: 0.5,\n"
+"        fx: 0.5, fy: 0.5,\n"
+"        radius: 1.0,\n"
+"        stop: 0.25 #78879b,\n"
+"        stop: 0.3 #302F2F\n"
+"    );\n"
+"}\n"
+"\n"
+"QCheckBox::indicator{\n"
+"    color: #b1b1b1;\n"
+"    background-color: #302F2F;\n"
+"    border: 1px solid silver;\n"
+"    width: 9px;\n"
+"    height: 9px;\n"
+"}\n"
+"\n"
+"QRadioButton::indicator\n"
+"{\n"
+"    border-radius: 7px;\n"
+"    width: 9px;\n"
+"    height: 9px;\n"
+"}\n"
+"\n"
+"QRadioButton::indicator:hover,\n"
+"QCheckBox::indicator:hover\n"
+"{\n"
+"    border: 1px solid #78879b;\n"
+"}\n"
+"\n"
+"QCheckBox::indicator:checked\n"
+"{\n"
+"    image:url(icons/checkbox.png);\n"
+"}\n"
+"\n"
+"QCheckBox::indicator:disabled,\n"
+"QRadioButton::indicator:disabled\n"
+"{\n"
+"    border: 1px solid #444;\n"
+"}\n"
+"\n"
+"QFrame\n"
+"{\n"
+"    border-radius: 3px;\n"
+"}\n"
+"\n"
+"QStackedWidget\n"
+"{\n"
+"    border: none;\n"
+"}\n"
+"\n"
+"QToolBar \n"
+"{\n"
+"    border: 1px solid #393838;\n"
+"    background: 1px solid #302F2F;\n"
+"    font-weight: bold;\n"
+"}\n"
+"\n"
+"QToolBar::handle:horizontal \n"
+"{\n"
+"    image: url(icons/Hmovetoolbar.png);\n"
+"}\n"
+"\n"
+"QToolBar::handle:vertical \n"
+"{\n"
+"    image: url(icons/Vmovetoolbar.png);\n"
+"}\n"
+"\n"
+"QToolBar::separator:horizontal \n"
+"{\n"
+"    image: url(icons/Hsepartoolbar.png);\n"
+"}\n"
+"\n"
+"QToolBar::separator:vertical \n"
+"{\n"
+"    image: url(icons/Vsepartoolbars.png);\n"
+"}\n"
+"\n"
+"QPushButton\n"
+"{\n"
+"    color: silver;\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 1, x2: 0, y2: 0,stop: 0 #302F2F, stop: 1 #484846\n"
+"    );\n"
+"    border-width: 1px;\n"
+"    border-color: #4A4949;\n"
+"    border-style: solid;\n"
+"    padding-top: 5px;\n"
+"    padding-bottom: 5px;\n"
+"    padding-left: 5px;\n"
+"    padding-right: 5px;\n"
+"    border-radius: 5px;\n"
+"}\n"
+"\n"
+"QPushButton:disabled\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 1, x2: 0, y2: 0, stop: 0 #302F2F, stop: 1 #484846\n"
+"    );\n"
+"    border-width: 1px;\n"
+"    border-color: #3A3939;\n"
+"    border-style: solid;\n"
+"    padding-top: 5px;\n"
+"    padding-bottom: 5px;\n"
+"    padding-left: 10px;\n"
+"    padding-right: 10px;\n"
+"    /*border-radius: 3px;*/\n"
+"    color: #3A3939;\n"
+"}\n"
+"\n"
+"QComboBox\n"
+"{\n"
+"    selection-background-color: #78879b;\n"
+"    background-color: #201F1F;\n"
+"    border-style: solid;\n"
+"    border: 1px solid #3A3939;\n"
+"    border-radius: 3px;\n"
+"    padding: 2px;\n"
+"}\n"
+"\n"
+"QComboBox:hover,\n"
+"QPushButton:hover,\n"
+"QAbstractSpinBox:hover,\n"
+"QLineEdit:hover,\n"
+"QTextEdit:hover,\n"
+"QPlainTextEdit:hover,\n"
+"QAbstractView:hover,\n"
+"QTreeView:hover\n"
+"{\n"
+"    border: 1px solid #78879b;\n"
+"    color: silver;\n"
+"}\n"
+"\n"
+"QComboBox:on\n"
+"{\n"
+"    background-color: #626873;\n"
+"    padding-top: 3px;\n"
+"    padding-left: 4px;\n"
+"    selection-background-color: #4a4a4a;\n"
+"}\n"
+"\n"
+"QComboBox QAbstractItemView\n"
+"{\n"
+"    background-color: #201F1F;\n"
+"    border-radius: 3px;\n"
+"    border: 1px solid #3A3939;\n"
+"    selection-background-color: QLinearGradient(\n"
+"        x1: 0, y1: 0, x2: 0, y2: 1, stop: 0 #78879b, stop: 1 #78879b\n"
+"    );\n"
+"}\n"
+"\n"
+"QComboBox::drop-down\n"
+"{\n"
+"    subcontrol-origin: padding;\n"
+"    subcontrol-position: top right;\n"
+"    width: 15px;\n"
+"    border-left-width: 0px;\n"
+"    border-left-color: darkgray;\n"
+"    border-left-style: solid;\n"
+"    border-top-right-radius: 3px; \n"
+"    border-bottom-right-radius: 3px;\n"
+"}\n"
+"\n"
+"QComboBox::down-arrow\n"
+"{\n"
+"    image: url(icons/down_arrow_disabled.png);\n"
+"}\n"
+"\n"
+"QComboBox::down-arrow:on, \n"
+"QComboBox::down-arrow:hover,\n"
+"QComboBox::down-arrow:focus\n"
+"{\n"
+"    image: url(icons/down_arrow.png);\n"
+"}\n"
+"\n"
+"QPushButton:pressed\n"
+"{\n"
+"    background-color: QLinearGradient(\n"
+"        x1: 0, y1: 0, x2: 0, y2: 1, stop: 0 #302F2F, stop: 1 #484846\n"
+"    );\n"
+"}\n"
+"\n"
+"QAbstractSpinBox {\n"
+"    padding-top: 2px;\n"
+"    padding-bottom: 2px;\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: #201F1F;\n"
+"    color: silver;\n"
+"    border-radius: 3px;\n"
+"}\n"
+"\n"
+"QAbstractSpinBox:up-button\n"
+"{\n"
+"    background-color: transparent;\n"
+"    subcontrol-origin: border;\n"
+"    subcontrol-position: center right;\n"
+"}\n"
+"\n"
+"QAbstractSpinBox:down-button\n"
+"{\n"
+"    background-color: transparent;\n"
+"    subcontrol-origin: border;\n"
+"    subcontrol-position: center left;\n"
+"}\n"
+"\n"
+"QHeaderView::down-arrow,\n"
+"QAbstractSpinBox::up-arrow,\n"
+"QAbstractSpinBox::up-arrow:disabled,\n"
+"QAbstractSpinBox::up-arrow:off\n"
+"{\n"
+"    image: url(icons/up_arrow_disabled.png);\n"
+"    width: 10px;\n"
+"    height: 10px;\n"
+"}\n"
+"\n"
+"QHeaderView::down-arrow:hover,\n"
+"QAbstractSpinBox::up-arrow:hover\n"
+"\n"
+"{\n"
+"    image: url(icons/up_arrow.png);\n"
+"}\n"
+"\n"
+"QHeaderView::down-arrow,\n"
+"QAbstractSpinBox::down-arrow,\n"
+"QAbstractSpinBox::down-arrow:disabled,\n"
+"QAbstractSpinBox::down-arrow:off\n"
+"{\n"
+"    image: url(icons/down_arrow_disabled.png);\n"
+"    width: 10px;\n"
+"    height: 10px;\n"
+"}\n"
+"\n"
+"QHeaderView::up-arrow:hover,\n"
+"QAbstractSpinBox::down-arrow:hover\n"
+"{\n"
+"    image: url(icons/down_arrow.png);\n"
+"}\n"
+"\n"
+"QLabel,\n"
+"QDateEdit::drop-down\n"
+"{\n"
+"    border: 0px solid black;\n"
+"}\n"
+"\n"
+"QTabBar::tab\n"
+"{\n"
+"    color: #b1b1b1;\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: #302F2F;\n"
+"    padding-left: 5px;\n"
+"    padding-right: 5px;\n"
+"    padding-top: 3px;\n"
+"    padding-bottom: 2px;\n"
+"    margin-right: -1px;\n"
+"}\n"
+"\n"
+"\n"
+"QTabWidget::pane {\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: QLinearGradient(\n"
+"        x1:0, y1:0, x2:0, y2:1, stop:1 #302F2F, stop:0 #3A3939\n"
+"    );\n"
+"}\n"
+"\n"
+"QTabBar::tab:last\n"
+"{\n"
+"    margin-right: 0;\n"
+"    border-top-right-radius: 3px;\n"
+"}\n"
+"\n"
+"QTabBar::tab:first:!selected\n"
+"{\n"
+"    margin-left: 0px; \n"
+"    border-top-left-radius: 3px;\n"
+"}\n"
+"\n"
+"QTabBar::tab:!selected\n"
+"{\n"
+"    color: #b1b1b1;\n"
+"    border-bottom-style: solid;\n"
+"    margin-top: 3px;\n"
+"}\n"
+"\n"
+"QTabBar::tab:selected\n"
+"{\n"
+"    border-top-left-radius: 3px;\n"
+"    border-top-right-radius: 3px;\n"
+"    margin-bottom: 0px;\n"
+"\n"
+"    background-color: QLinearGradient(\n"
+"        x1:0, y1:0, x2:0, y2:1, stop:1 #302F2F, stop:0 #5A5959\n"
+"    );\n"
+"}\n"
+"\n"
+"QTabBar::tab:!selected:hover\n"
+"{\n"
+"    color:white;\n"
+"}\n"
+"\n"
+"QTabBar::tab:selected:hover\n"
+"{\n"
+"    color:white;\n"
+"    border-top-left-radius: 3px;\n"
+"    border-top-right-radius: 3px;\n"
+"    background-color: QLinearGradient(\n"
+"        x1:0, y1:0, x2:0, y2:1, stop:1 #302F2F, stop:0 #5A5959\n"
+"    );\n"
+"}\n"
+"\n"
+"QDockWidget\n"
+"{\n"
+"    color: silver;\n"
+"    titlebar-close-icon: url(icons/close.png);\n"
+"    titlebar-normal-icon: url(icons/undock.png);\n"
+"}\n"
+"\n"
+"QDockWidget::title\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    border-bottom: #302F2F;\n"
+"    text-align: left;\n"
+"    spacing: 2px; \n"
+"    background-color: QLinearGradient(\n"
+"        x1:0, y1:0, x2:0, y2:1, stop:1 #302F2F, stop:0 #3A3939\n"
+"    );\n"
+"    background-image: none;\n"
+"    padding-left: 10px;\n"
+"}\n"
+"\n"
+"QDockWidget {\n"
+"    border: 1px solid lightgray;\n"
+"    titlebar-close-icon: url(icons/close.png);\n"
+"    titlebar-normal-icon: url(icons/undock.png);\n"
+"}\n"
+"\n"
+"QDockWidget::close-button,\n"
+"QDockWidget::float-button {\n"
+"    border: 1px solid transparent;\n"
+"    border-radius: 5px;\n"
+"    background: transparent;\n"
+"    icon-size: 10px;\n"
+"}\n"
+"\n"
+"QDockWidget::close-button:hover,\n"
+"QDockWidget::float-button:hover {\n"
+"    background: #3A3939;\n"
+"}\n"
+"\n"
+"QDockWidget::close-button:pressed,\n"
+"QDockWidget::float-button:pressed {\n"
+"    padding: 1px -1px -1px 1px;\n"
+"}\n"
+"\n"
+"QTreeView, \n"
+"QListView, \n"
+"QTableView\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    background-color: #201F1F;\n"
+"}\n"
+"\n"
+"QTreeView:branch:selected, \n"
+"QTreeView:branch:hover\n"
+"{\n"
+"    background: url(icons/transparent.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:has-siblings:!adjoins-item\n"
+"{\n"
+"    border-image: url(icons/transparent.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:has-siblings:adjoins-item\n"
+"{\n"
+"    border-image: url(icons/transparent.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:!has-children:!has-siblings:adjoins-item\n"
+"{\n"
+"    border-image: url(icons/transparent.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:has-children:!has-siblings:closed,\n"
+"QTreeView::branch:closed:has-children:has-siblings\n"
+"{\n"
+"    image: url(icons/branch_closed.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:open:has-children:!has-siblings,\n"
+"QTreeView::branch:open:has-children:has-siblings\n"
+"{\n"
+"    image: url(icons/branch_open.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:has-children:!has-siblings:closed:hover,\n"
+"QTreeView::branch:closed:has-children:has-siblings:hover\n"
+"{\n"
+"    image: url(icons/branch_closed-on.png);\n"
+"}\n"
+"\n"
+"QTreeView::branch:open:has-children:!has-siblings:hover,\n"
+"QTreeView::branch:open:has-children:has-siblings:hover\n"
+"{\n"
+"    image: url(icons/branch_open-on.png);\n"
+"}\n"
+"\n"
+"QSlider::groove:horizontal\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    height: 8px; \n"
+"    background: #201F1F;\n"
+"    margin: 2px 0;\n"
+"    border-radius: 4px;\n"
+"}\n"
+"\n"
+"QSlider::handle:horizontal\n"
+"{\n"
+"    background: QLinearGradient(\n"
+"        x1: 0, y1: 0, x2: 0, y2: 1, stop: 0.0 silver, stop: 0.2 #a8a8a8, stop: 1 #727272\n"
+"    );\n"
+"    border: 1px solid #3A3939;\n"
+"    width: 14px;\n"
+"    height: 14px;\n"
+"    margin: -4px 0;\n"
+"    border-radius: 7px;\n"
+"}\n"
+"\n"
+"QSlider::groove:vertical\n"
+"{\n"
+"    border: 1px solid #3A3939;\n"
+"    width: 8px; \n"
+"    background: #201F1F;\n"
+"    margin: 0 0px;\n"
+"    border-radius: 4px;\n"
+"}\n"
+"\n"
+"QSlider::handle:vertical\n"
+"{\n"
+"    background: QLinearGradient(\n"
+"        x1: 0, y1: 0, x2: 0, y2: 1, stop: 0.0 silver, stop: 0.2 #a8a8a8, stop: 1 #727272\n"
+"    );\n"
+"    border: 1px solid #3A3939;\n"
+"    width: 14px;\n"
+"    height: 14px;\n"
+"    margin: 0 -4px; \n"
+"    border-radius: 7px;\n"
+"}\n"
+"\n"
+"QToolButton\n"
+"{\n"
+"    background-color: #302F2F;\n"
+"}\n"
+"\n"
+"QToolButton:pressed\n"
+"{\n"
+"    background-color: #3A3939;\n"
+"}\n"
+"QToolButton:hover\n"
+"{\n"
+"    background-color: #3A3939;\n"
+"}\n"
+"\n"
+"QTableView#tagView\n"
+"{\n"
+"    background-color: transparent;\n"
+"}\n"
+"\n"
+"QLabel#inTotalLabel, QLabel#outTotalLabel, QLabel#recordCountLabel\n"
+"{\n"
+"    font: bold;\n"
+"}")
+        self.centralwidget = QtWidgets.QWidget(MainWindow)
+        self.centralwidget.setObjectName("centralwidget")
+        self.horizontalLayout = QtWidgets.QHBoxLayout(self.centralwidget)
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.widget_3 = QtWidgets.QWidget(self.centralwidget)
+        self.widget_3.setMaximumSize(QtCore.QSize(450, 626296))
+        self.widget_3.setObjectName("widget_3")
+        self.verticalLayout_6 = QtWidgets.QVBoxLayout(self.widget_3)
+        self.verticalLayout_6.setObjectName("verticalLayout_6")
+        self.fileInputGroup = QtWidgets.QGroupBox(self.widget_3)
+        self.fileInputGroup.setObjectName("fileInputGroup")
+        self.verticalLayout_5 = QtWidgets.QVBoxLayout(self.fileInputGroup)
+        self.verticalLayout_5.setObjectName("verticalLayout_5")
+        self.horizontalLayout_4 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_4.setObjectName("horizontalLayout_4")
+        self.verticalLayout_5.addLayout(self.horizontalLayout_4)
+        self.widget_4 = QtWidgets.QWidget(self.fileInputGroup)
+        self.widget_4.setMaximumSize(QtCore.QSize(16777215, 30))
+        self.widget_4.setObjectName("widget_4")
+        self.horizontalLayout_5 = QtWidgets.QHBoxLayout(self.widget_4)
+        self.horizontalLayout_5.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_5.setObjectName("horizontalLayout_5")
+        self.choose_file_2 = QtWidgets.QPushButton(self.widget_4)
+        self.choose_file_2.setMinimumSize(QtCore.QSize(100, 0))
+        self.choose_file_2.setMaximumSize(QtCore.QSize(93, 16777215))
+        self.choose_file_2.setObjectName("choose_file_2")
+        self.horizontalLayout_5.addWidget(self.choose_file_2)
+        self.song_name_2 = QtWidgets.QLabel(self.widget_4)
+        self.song_name_2.setEnabled(True)
+        self.song_name_2.setText("")
+        self.song_name_2.setObjectName("song_name_2")
+        self.horizontalLayout_5.addWidget(self.song_name_2)
+        self.play_song_btn_2 = QtWidgets.QPushButton(self.widget_4)
+        self.play_song_btn_2.setEnabled(True)
+        self.play_song_btn_2.setMinimumSize(QtCore.QSize(50, 0))
+        self.play_song_btn_2.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.play_song_btn_2.setObjectName("play_song_btn_2")
+        self.horizontalLayout_5.addWidget(self.play_song_btn_2)
+        self.verticalLayout_5.addWidget(self.widget_4)
+        self.widget_5 = QtWidgets.QWidget(self.fileInputGroup)
+        self.widget_5.setMaximumSize(QtCore.QSize(16777215, 30))
+        self.widget_5.setObjectName("widget_5")
+        self.horizontalLayout_6 = QtWidgets.QHBoxLayout(self.widget_5)
+        self.horizontalLayout_6.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_6.setObjectName("horizontalLayout_6")
+        self.choose_file_3 = QtWidgets.QPushButton(self.widget_5)
+        self.choose_file_3.setMinimumSize(QtCore.QSize(100, 0))
+        self.choose_file_3.setMaximumSize(QtCore.QSize(93, 16777215))
+        self.choose_file_3.setObjectName("choose_file_3")
+        self.horizontalLayout_6.addWidget(self.choose_file_3)
+        self.song_name_3 = QtWidgets.QLabel(self.widget_5)
+        self.song_name_3.setEnabled(True)
+        self.song_name_3.setText("")
+        self.song_name_3.setObjectName("song_name_3")
+        self.horizontalLayout_6.addWidget(self.song_name_3)
+        self.play_song_btn_3 = QtWidgets.QPushButton(self.widget_5)
+        self.play_song_btn_3.setEnabled(True)
+        self.play_song_btn_3.setMinimumSize(QtCore.QSize(50, 0))
+        self.play_song_btn_3.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.play_song_btn_3.setObjectName("play_song_btn_3")
+        self.horizontalLayout_6.addWidget(self.play_song_btn_3)
+        self.verticalLayout_5.addWidget(self.widget_5)
+        self.Play_stop_mix = QtWidgets.QPushButton(self.fileInputGroup)
+        self.Play_stop_mix.setObjectName("Play_stop_mix")
+        self.verticalLayout_5.addWidget(self.Play_stop_mix)
+        self.horizontalLayout_9 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_9.setObjectName("horizontalLayout_9")
+        self.verticalLayout_5.addLayout(self.horizontalLayout_9)
+        self.mixingGroup_3 = QtWidgets.QGroupBox(self.fileInputGroup)
+        self.mixingGroup_3.setMaximumSize(QtCore.QSize(16777215, 100))
+        self.mixingGroup_3.setObjectName("mixingGroup_3")
+        self.mixingLayout_3 = QtWidgets.QHBoxLayout(self.mixingGroup_3)
+        self.mixingLayout_3.setObjectName("mixingLayout_3")
+        self.song1_w = QtWidgets.QLabel(self.mixingGroup_3)
+        self.song1_w.setMinimumSize(QtCore.QSize(71, 0))
+        self.song1_w.setObjectName("song1_w")
+        self.mixingLayout_3.addWidget(self.song1_w)
+        self.weighting = QtWidgets.QSlider(self.mixingGroup_3)
+        self.weighting.setMaximum(100)
+        self.weighting.setProperty("value", 50)
+        self.weighting.setOrientation(QtCore.Qt.Horizontal)
+        self.weighting.setObjectName("weighting")
+        self.mixingLayout_3.addWidget(self.weighting)
+        self.song2_w = QtWidgets.QLabel(self.mixingGroup_3)
+        self.song2_w.setMinimumSize(QtCore.QSize(71, 0))
+        self.song2_w.setObjectName("song2_w")
+        self.mixingLayout_3.addWidget(self.song2_w)
+        self.verticalLayout_5.addWidget(self.mixingGroup_3)
+        self.horizontalLayout_10 = QtWidgets.QHBoxLayout()
+        self.horizontalLayout_10.setObjectName("horizontalLayout_10")
+        self.Mix_btn = QtWidgets.QPushButton(self.fileInputGroup)
+        self.Mix_btn.setMaximumSize(QtCore.QSize(150, 16777215))
+        self.Mix_btn.setObjectName("Mix_btn")
+        self.horizontalLayout_10.addWidget(self.Mix_btn)
+        self.verticalLayout_5.addLayout(self.horizontalLayout_10)
+        spacerItem = QtWidgets.QSpacerItem(20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding)
+        self.verticalLayout_5.addItem(spacerItem)
+        self.verticalLayout_6.addWidget(self.fileInputGroup)
+        self.horizontalLayout.addWidget(self.widget_3)
+        self.rank_wgt = QtWidgets.QWidget(self.centralwidget)
+        self.rank_wgt.setMinimumSize(QtCore.QSize(300, 0))
+        self.rank_wgt.setObjectName("rank_wgt")
+        self.verticalLayout_3 = QtWidgets.QVBoxLayout(self.rank_wgt)
+        self.verticalLayout_3.setObjectName("verticalLayout_3")
+        self.widget_2 = QtWidgets.QWidget(self.rank_wgt)
+        self.widget_2.setMaximumSize(QtCore.QSize(16777215, 30))
+        self.widget_2.setObjectName("widget_2")
+        self.horizontalLayout_3 = QtWidgets.QHBoxLayout(self.widget_2)
+        self.horizontalLayout_3.setContentsMargins(0, 0, 0, 0)
+        self.horizontalLayout_3.setObjectName("horizontalLayout_3")
+        self.choose_file = QtWidgets.QPushButton(self.widget_2)
+        self.choose_file.setMinimumSize(QtCore.QSize(100, 0))
+        self.choose_file.setMaximumSize(QtCore.QSize(93, 16777215))
+        self.choose_file.setObjectName("choose_file")
+        self.horizontalLayout_3.addWidget(self.choose_file)
+        self.song_name = QtWidgets.QLabel(self.widget_2)
+        self.song_name.setEnabled(True)
+        self.song_name.setText("")
+        self.song_name.setObjectName("song_name")
+        self.horizontalLayout_3.addWidget(self.song_name)
+        self.play_song_btn = QtWidgets.QPushButton(self.widget_2)
+        self.play_song_btn.setEnabled(True)
+        self.play_song_btn.setMinimumSize(QtCore.QSize(50, 0))
+        self.play_song_btn.setMaximumSize(QtCore.QSize(50, 16777215))
+        self.play_song_btn.setObjectName("play_song_btn")
+        self.horizontalLayout_3.addWidget(self.play_song_btn)
+        self.verticalLayout_3.addWidget(self.widget_2)
+        self.label = QtWidgets.QLabel(self.rank_wgt)
+        self.label.setMaximumSize(QtCore.QSize(16777215, 50))
+        self.label.setStyleSheet("font: 16pt \"MS Shell Dlg 2\";")
+        self.label.setObjectName("label")
+        self.verticalLayout_3.addWidget(self.label)
+        self.horizontalLayout.addWidget(self.rank_wgt)
+        MainWindow.setCentralWidget(self.centralwidget)
+        self.menubar = QtWidgets.QMenuBar(MainWindow)
+        self.menubar.setGeometry(QtCore.QRect(0, 0, 947, 26))
+        self.menubar.setObjectName("menubar")
+        MainWindow.setMenuBar(self.menubar)
+        self.statusbar = QtWidgets.QStatusBar(MainWindow)
+        self.statusbar.setObjectName("statusbar")
+        MainWindow.setStatusBar(self.statusbar)
+
+        self.retranslateUi(MainWindow)
+        QtCore.QMetaObject.connectSlotsByName(MainWindow)
+
+    def retranslateUi(self, MainWindow):
+        _translate = QtCore.QCoreApplication.translate
+        MainWindow.setWindowTitle(_translate("MainWindow", "MainWindow"))
+        self.fileInputGroup.setTitle(_translate("MainWindow", "Mixer"))
+        self.choose_file_2.setText(_translate("MainWindow", "Choose song1"))
+        self.play_song_btn_2.setText(_translate("MainWindow", "Play"))
+        self.choose_file_3.setText(_translate("MainWindow", "Choose song2"))
+        self.play_song_btn_3.setText(_translate("MainWindow", "Play"))
+        self.Play_stop_mix.setText(_translate("MainWindow", "▶"))
+        self.mixingGroup_3.setTitle(_translate("MainWindow", "Weighting "))
+        self.song1_w.setText(_translate("MainWindow", "Song1: 50%"))
+        self.song2_w.setText(_translate("MainWindow", "song2: 50%"))
+        self.Mix_btn.setText(_translate("MainWindow", "Mix"))
+        self.choose_file.setText(_translate("MainWindow", "Choose song"))
+        self.play_song_btn.setText(_translate("MainWindow", "Play"))
+        self.label.setText(_translate("MainWindow", "Top matching songs"))
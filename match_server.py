@@ -0,0 +1,257 @@
+"""
+Local HTTP matching service.
+
+One `Match_Maker` is loaded at startup and kept warm, every request is fingerprinted and scored
+against it on a bounded worker pool. Requests beyond the pool and its queue get 503.
+
+GET  /health                      --> {"status": "ok", "tracks": N}
+GET  /stats                       --> rolling per stage latency histograms, see timing.HISTOGRAMS
+POST /search?top_k=10             body: an audio file (wav, mp3, ...) or raw PCM
+POST /mix-search?w1=0.5&top_k=10  body: multipart/form-data with the parts `audio1` and `audio2`
+Both searches also take `min_score` (0-100), matches below it are dropped, and `dimension` (repeatable:
+full_song, vocals, music or all) to only match those partitions of the index.
+
+Raw PCM is sent with Content-Type `audio/pcm; rate=44100; channels=2; format=s16le` (or f32le),
+on the body or on each multipart part. Responses are {"matches": [...], "timings": {...}} or {"error": message}.
+
+usage: python match_server.py [--host 127.0.0.1] [--port 8080] [--workers 4] [--queue 16] [--shards N]
+"""
+from typing import Dict, Tuple
+import os
+import sys
+import traceback
+import json
+import time
+import argparse
+import tempfile
+import threading
+import mimetypes
+import numpy as np
+from email.parser import BytesParser
+from email.policy import HTTP
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+import processing_and_searching as ps
+import fingerprint_params as fparams
+from matchmaker import Match_Maker
+from json_ctrl import to_builtin
+import timing
+from lazy_imports import lazy_import
+
+librosa = lazy_import('librosa')
+
+#uploads above this size are rejected (413)
+max_upload_bytes = 64 * 1024 ** 2
+
+PCM_FORMATS = {'s16le': ('<i2', 32768.0), 'f32le': ('<f4', 1.0)}
+
+class Request_Error(Exception):
+    """
+An error reported to the client with an HTTP status.
+    """
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+def decode_pcm(data: bytes, params: Dict) -> Tuple[np.ndarray, int]:
+    """
+    return the analysed window of raw little endian PCM as extract_audio_signal would.\n
+    params: rate, channels and format ('s16le' or 'f32le') from the Content-Type.
+    """
+    try:
+        rate = int(params.get('rate', fparams.SAMPLE_RATE))
+        channels = int(params.get('channels', 1))
+        dtype, scale = PCM_FORMATS[params.get('format', 's16le')]
+    except (ValueError, KeyError):
+        raise Request_Error(400, f"Invalid PCM parameters {params}. Supported formats: {sorted(PCM_FORMATS)}.")
+    if rate < 1 or channels < 1:
+        raise Request_Error(400, f"Invalid PCM parameters {params}. Supported: rate >= 1, channels >= 1.")
+
+    audio = np.frombuffer(data[:len(data) - len(data) % (np.dtype(dtype).itemsize * channels)], dtype=dtype)
+    audio = audio.astype(np.float32).reshape(-1, channels).mean(axis=1) / scale
+    audio = audio[:int(round(fparams.ANALYSIS_SECONDS * rate))]
+    if rate != fparams.SAMPLE_RATE:
+        audio = librosa.resample(audio, orig_sr=rate, target_sr=fparams.SAMPLE_RATE)
+
+    return ps.peak_normalize(audio), fparams.SAMPLE_RATE
+
+def decode_upload(data: bytes, content_type: str, params: Dict, filename: str = None) -> Tuple[np.ndarray, int]:
+    """
+    return (audio, sr) of an uploaded audio file or raw PCM body.
+    """
+    if not data:
+        raise Request_Error(400, "Empty audio upload")
+    if content_type == 'audio/pcm':
+        return decode_pcm(data, params)
+
+    # encoded files go through the same decoder as the database, which reads from a path
+    ext = os.path.splitext(filename)[1] if filename else mimetypes.guess_extension(content_type) or '.wav'
+    file = tempfile.NamedTemporaryFile(suffix=ext, delete=False)
+    try:
+        with file:
+            file.write(data)
+        return ps.extract_audio_signal(file.name)
+    except Exception as error:
+        raise Request_Error(400, f"Cannot decode audio upload: {type(error).__name__}: {error}")
+    finally:
+        os.remove(file.name)
+
+def parse_content_type(header: str) -> Tuple[str, Dict]:
+    parts = [part.strip() for part in (header or 'application/octet-stream').split(';')]
+    params = dict(part.split('=', 1) for part in parts[1:] if '=' in part)
+    return parts[0].lower(), {key.strip().lower(): value.strip().strip('"') for key, value in params.items()}
+
+class Match_Service:
+    """
+Warm `Match_Maker` behind a bounded pool: `workers` searches run at once, `queue` more may wait.
+    """
+    def __init__(self, match_maker: Match_Maker, workers: int = 4, queue: int = 16):
+        self.match_maker = match_maker
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.slots = threading.BoundedSemaphore(workers + queue)
+
+    def submit(self, function, *args):
+        """
+        run function(*args) on the pool and return its result, Request_Error(503) when the pool is full.
+        """
+        if not self.slots.acquire(blocking=False):
+            raise Request_Error(503, "Server busy, retry later")
+        try:
+            return self.pool.submit(function, *args).result()
+        finally:
+            self.slots.release()
+
+    def search(self, audio: np.ndarray, sr, top_k: int, audio_name: str = 'query', min_score: float = None,
+               dimensions=None) -> Dict:
+        with timing.collect() as report:
+            start = time.perf_counter()
+            fingerprint = self.match_maker.fingerprint_audio(audio, sr, audio_name)
+            fingerprinted = time.perf_counter()
+            matches = self.match_maker.search_fingerprint(fingerprint, top_k, min_score, dimensions)
+
+        return {'matches': matches,
+                'timings': {'fingerprint_s': fingerprinted - start, 'search_s': time.perf_counter() - fingerprinted,
+                            'stages': report.as_dict()['stages']}}
+
+    def mix_search(self, audio1: np.ndarray, audio2: np.ndarray, sr, w1: float, top_k: int, min_score: float = None,
+                   dimensions=None) -> Dict:
+        return self.search(ps.mix_signals(audio1, audio2, w1, 1 - w1), sr, top_k, 'mix', min_score, dimensions)
+
+class Match_Request_Handler(BaseHTTPRequestHandler):
+    # set on the handler class by `serve`
+    service: Match_Service = None
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == '/health':
+            self.__send_json(200, {'status': 'ok', 'tracks': self.service.match_maker.get_database_size()})
+        elif path == '/stats':
+            self.__send_json(200, self.service.match_maker.get_timing_histograms())
+        else:
+            self.__send_json(404, {'error': f"Unknown path '{self.path}'"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        try:
+            top_k = int(query.get('top_k', ['10'])[0])
+            min_score = float(query['min_score'][0]) if 'min_score' in query else None
+            dimensions = self.service.match_maker.select_dimensions(query.get('dimension'))
+            body = self.__read_body()
+            content_type, params = parse_content_type(self.headers.get('Content-Type'))
+
+            if url.path == '/search':
+                if content_type.startswith('multipart/'):
+                    raise Request_Error(400, "Send the audio as the request body")
+                audio, sr = self.service.submit(decode_upload, body, content_type, params)
+                result = self.service.submit(self.service.search, audio, sr, top_k, 'query', min_score, dimensions)
+            elif url.path == '/mix-search':
+                w1 = float(query.get('w1', ['0.5'])[0])
+                if not 0 <= w1 <= 1:
+                    raise Request_Error(400, f"Invalid weight w1={w1}. Supported: 0 <= w1 <= 1.")
+                parts = self.__multipart_parts(body)
+                if 'audio1' not in parts or 'audio2' not in parts:
+                    raise Request_Error(400, "Expected the multipart parts 'audio1' and 'audio2'")
+                audio1, sr = self.service.submit(decode_upload, *parts['audio1'])
+                audio2, sr = self.service.submit(decode_upload, *parts['audio2'])
+                result = self.service.submit(self.service.mix_search, audio1, audio2, sr, w1, top_k, min_score, dimensions)
+            else:
+                raise Request_Error(404, f"Unknown path '{url.path}'")
+        except Request_Error as error:
+            self.__send_json(error.status, {'error': str(error)})
+        except ValueError as error:
+            self.__send_json(400, {'error': str(error)})
+        except Exception as error:
+            # the client always gets a status line, whatever failed
+            traceback.print_exc()
+            self.__send_json(500, {'error': f"{type(error).__name__}: {error}"})
+        else:
+            self.__send_json(200, result)
+
+    def __read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > max_upload_bytes:
+            raise Request_Error(413, f"Upload larger than {max_upload_bytes} bytes")
+        return self.rfile.read(length)
+
+    def __multipart_parts(self, body: bytes) -> Dict:
+        """
+        return {field name: (data, content type, params, filename)} of a multipart/form-data body.
+        """
+        header = f"Content-Type: {self.headers.get('Content-Type')}\r\n\r\n".encode()
+        message = BytesParser(policy=HTTP).parsebytes(header + body)
+        if not message.is_multipart():
+            raise Request_Error(400, "Expected a multipart/form-data body")
+
+        parts = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            content_type, params = parse_content_type(part.get('Content-Type'))
+            parts[name] = (part.get_payload(decode=True), content_type, params, part.get_filename())
+        return parts
+
+    def __send_json(self, status: int, data):
+        payload = json.dumps(data, default=to_builtin).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+def serve(host: str = '127.0.0.1', port: int = 8080, workers: int = 4, queue: int = 16, match_maker: Match_Maker = None):
+    """
+    Load (or reuse) the database and serve requests until interrupted.
+    """
+    match_maker = match_maker or Match_Maker()
+    match_maker.warm_up()
+    Match_Request_Handler.service = Match_Service(match_maker, workers, queue)
+
+    server = ThreadingHTTPServer((host, port), Match_Request_Handler)
+    print(f"Serving {match_maker.get_database_size()} tracks on http://{host}:{server.server_port}", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        Match_Request_Handler.service.pool.shutdown()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve audio matching over HTTP with a warm in-memory index.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=4, help="searches run concurrently")
+    parser.add_argument('--queue', type=int, default=16, help="requests waiting for a worker before 503")
+    parser.add_argument('--mode', default='landmarks', choices=['landmarks', 'lsh', 'scan'], help="Match_Maker search mode")
+    parser.add_argument('--shards', type=int, default=None, help="search processes each keeping a shard of the index, see shard_search")
+    args = parser.parse_args(argv)
+
+    match_maker = Match_Maker(search_mode=args.mode, shards=args.shards)
+    try:
+        serve(args.host, args.port, args.workers, args.queue, match_maker)
+    finally:
+        match_maker.close()
+
+if __name__ == '__main__':
+    main()
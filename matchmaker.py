@@ -1,12 +1,20 @@
 import numpy as np
 from typing import Dict, List
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
+from contextlib import contextmanager
 from Audio_Fingerprint import Audio_Fingerprint
 import processing_and_searching as ps
 import database
-import librosa
 import os
 import json_ctrl
-import soundfile as sf
+import scoring
+import partitions
+import shard_search
+import spectrogram_cache
+import timing
+import lazy_imports
 
 path = "Data/original_data/songs/FE!N.wav"
 
@@ -25,17 +33,190 @@ class SingletonMeta(type):
 class Match_Maker():
     """
 A singelton class responsible for processing all inputs and performing the search process\n
-Also once instantiated, entire database will be loaded.\n
-A slightly expensive process that will take a minute at most. 
+Also once instantiated, entire database will be loaded from the on-disk index.\n
+The index is only rebuilt (a minute at most) when the source files or fingerprint parameters change.\n
+search_mode: 'landmarks' --> landmark hashes vote in the inverted index and only the best
+`candidates_n` tracks get the full similarity score\n
+'lsh' --> the `candidates_n` tracks closest in perceptual hash (bit Hamming) get the full similarity score\n
+'scan' --> every fingerprint in the database is scored.\n
+Mixes are built and fingerprinted in memory from decoded sources cached per path, `get_mix_path`
+writes the last mix to disk only when a file is needed (e.g. playback), save_mixes=True writes every mix in the background.\n
+top_k: matches kept per search (None --> all), only the winners are sorted and turned into result dicts.\n
+min_score: matches scoring below it are dropped, rows that cannot reach it skip the peak comparison.\n
+The index is partitioned by dimension (see partitions): searches given `dimensions` only read those partitions,
+several partitions are searched concurrently and their matches merged.\n
+shards: N > 1 --> searches run on N long-lived worker processes, each keeping 1/N of every partition resident
+(see shard_search), close() stops them.\n
+Every search is timed per stage (decode, stft, features, hash, scoring, select, ...), see `get_timing_report` and
+`timing.HISTOGRAMS`. profile_searches=True also dumps a cProfile of every search into timing.profile_dir.
     """
-    def __init__(self):
+    #decoded sources kept for re-mixing
+    sources_cache_size = 8
+    
+    def __init__(self, search_mode:str = 'landmarks', candidates_n:int = 50, progress = None, save_mixes:bool = False, index = None,
+                 profile_searches:bool = False, top_k:int = None, min_score:float = None, shards:int = None):
         self.mix_path = ""         
-        self.__full_db = database.create_database()
+        self.search_mode = search_mode
+        self.candidates_n = candidates_n
+        self.top_k = top_k
+        self.min_score = min_score
+        self.save_mixes = save_mixes
+        self.profile_searches = profile_searches
+        self.__report = None
+        
+        # (path, size, mtime) --> (audio, sr), least recently used first
+        self.__sources: OrderedDict = OrderedDict()
+        self.__sources_lock = threading.Lock()
+        # (path1, path2, w1, w2, audio, sr) of the last mix
+        self.__mix = None
+        # (path1, path2, w1, w2) and future of the last mix written to disk
+        self.__mix_save = None
+        self.__writer = ThreadPoolExecutor(max_workers=1)
+        
+        # progress(done, total) is reported while new or changed files are fingerprinted
+        # an already loaded index_store.Fingerprint_Index (e.g. a synthetic one) is used as is
+        if index is None: index = database.refresh_index(progress=progress)
+        # columnar layout, every search scores all candidate rows in one vectorized pass
+        self.__db = scoring.Database_Matrix.from_index(index)
+        # one partition per dimension, unfiltered searches vote through all of them at once
+        self.__partitions = partitions.load_partitions(index, self.__db, database.dim)
+        self.__whole = partitions.Partition(None, 0, len(self.__db), self.__db, partitions.Partitioned_Index(self.__partitions))
+        self.__partition_pool = ThreadPoolExecutor(max_workers=max(1, len(self.__partitions)))
+        # the workers map the same index file, the coordinator only keeps the records for the results
+        self.__shards = shard_search.Shard_Pool(index.file_path, shards) if shards and shards > 1 else None
+        
+    def new_search(self, path1:str, path2:str = None, mix=False, w1=0.5, top_k:int = None, min_score:float = None, dimensions = None):        
+        with self.__instrumented():
+            with timing.stage('fingerprint'):
+                fingerprint = self.__create_fingerprint(path1, path2, mix, w1)
+            self.search_fingerprint(fingerprint, top_k, min_score, dimensions)
+        
+    def search_fingerprint(self, fingerprint:Audio_Fingerprint, top_k:int = None, min_score:float = None, dimensions = None):
+        """
+        Search with an already computed query fingerprint (Audio_Fingerprint or Fingerprint_Record), return the matches
+        best first: the `top_k` best (default: self.top_k) scoring at least `min_score` (default: self.min_score).\n
+        dimensions: None --> the whole database in one pass, a dimension or a list of them (e.g. 'vocals') --> only
+        those partitions, 'all' --> every partition; several partitions are searched concurrently and merged, with
+        `candidates_n` candidates per partition.\n
+        Searches only read the database, concurrent calls are safe (get_all_matches then returns the last one).
+        """
+        if top_k is None: top_k = self.top_k
+        if min_score is None: min_score = self.min_score
+        with self.__instrumented():
+            matches = self.__search_database(fingerprint, top_k, min_score, dimensions)
+        self.__fingerprint = fingerprint
+        self.__matches = matches
+        return matches
+    
+    def close(self):
+        """
+        Stop the shard workers, if any, and release the writer and partition threads.\n
+        Pending result writes still complete in the background.
+        """
+        if self.__shards is not None:
+            self.__shards.close()
+            self.__shards = None
+        self.__writer.shutdown(wait=False)
+        self.__partition_pool.shutdown(wait=False)
+
+    def warm_up(self):
+        """
+        Import the audio libraries deferred at startup (see lazy_imports), e.g. on a background thread after loading.
+        """
+        lazy_imports.preload()
+        
+    def get_timing_report(self):
+        """
+        return {'total_s', 'stages': {name: {'seconds', 'calls'}}} of the last search, None before the first one.
+        """
+        return self.__report.as_dict() if self.__report else None
+    
+    def get_timing_histograms(self):
+        """
+        return the rolling per stage latency histograms (count, mean, p50, p90, p99, buckets) of recent searches.
+        """
+        return timing.HISTOGRAMS.summary()
+    
+    @contextmanager
+    def __instrumented(self):
+        # only the outermost search block is reported (and profiled), nested ones add to its stages
+        outermost = timing.current_report() is None
+        with timing.collect() as report:
+            if outermost and self.profile_searches:
+                with timing.profiled('search'):
+                    yield report
+            else:
+                yield report
+        if outermost: self.__report = report
+    
+    def fingerprint_audio(self, audio:np.ndarray, sr, audio_name:str = 'query', path:str = ''):
+        """
+        return the query fingerprint record of a decoded signal (see ps.extract_audio_signal), e.g. an upload.
+        """
+        sg = ps.generate_spectrogram(audio)
+        return Audio_Fingerprint(audio_name=audio_name, dimension='none', file_path=path, sampling_rate=sr, spectrogram=sg, profile='query').to_record()
+        
+    def load_source(self, path:str):
+        """
+        return (audio, sr) of the analysed window of a file, decoded once and cached for re-mixing.
+        """
+        path = os.path.normpath(path)
+        stat = os.stat(path)
+        key = (path, stat.st_size, stat.st_mtime_ns)
+        
+        with self.__sources_lock:
+            if key in self.__sources:
+                self.__sources.move_to_end(key)
+                return self.__sources[key]
+            
+        source = ps.extract_audio_signal(path)
+        with self.__sources_lock:
+            self.__sources[key] = source
+            while len(self.__sources) > self.sources_cache_size:
+                self.__sources.popitem(last=False)
+                
+        return source
+    
+    def save_mix_async(self):
+        """
+        Write the last mix to disk in the background, return a future of its file path.
+        """
+        if self.__mix is None:
+            return None
+        path1, path2, w1, w2, audio, sr = self.__mix
+        key = (path1, path2, w1, w2)
         
-    def new_search(self, path1:str, path2:str = None, mix=False, w1=0.5):        
+        if self.__mix_save is None or self.__mix_save[0] != key:
+            self.__mix_save = (key, self.__writer.submit(lambda: ps.save_mix(path1, path2, audio, sr, w1, w2)[1]))
+        return self.__mix_save[1]
+    
+    def get_mix_path(self):
+        """
+        return the file path of the last mix, written to disk on first request.
+        """
+        future = self.save_mix_async()
+        if future is None:
+            return ""
+        self.mix_path = future.result()
+        return self.mix_path
         
-        self.__fingerprint = self.__create_fingerprint(path1, path2, mix, w1)
-        self.__matches = self.__search_database()
+    def select_dimensions(self, dimensions):
+        """
+        return the dimension names a search with `dimensions` reads (see search_fingerprint), None for the whole database.\n
+        ValueError for unknown dimensions, e.g. to check a request before searching.
+        """
+        if dimensions is None:
+            return None
+        return [partition.dimension for partition in partitions.select_partitions(self.__partitions, dimensions)]
+    
+    def get_partition_sizes(self):
+        """
+        return {dimension: number of tracks} of the index partitions, in index order.
+        """
+        return {partition.dimension: len(partition) for partition in self.__partitions}
+    
+    def get_database_size(self):
+        return len(self.__db)
         
     def get_all_matches(self):
         return self.__matches
@@ -45,61 +226,100 @@ A slightly expensive process that will take a minute at most.
                 
     def __create_fingerprint(self, path1:str, path2:str=None, mix:bool = False, w1:float = None):        
         if mix:
-            audio, sr, audio_name, path = ps.mix_audio(path1, path2, w1, 1-w1)
-            self.mix_path = path
+            # sources are decoded once, moving the weight only redoes the sum and the STFT
+            audio1, sr = self.load_source(path1)
+            audio2, sr = self.load_source(path2)
+            audio = ps.mix_signals(audio1, audio2, w1, 1-w1)
+            audio_name, path = ps.mix_name(path1, path2, w1, 1-w1)
+            
+            self.__mix = (path1, path2, w1, 1-w1, audio, sr)
+            self.mix_path = ""
+            if self.save_mixes: self.save_mix_async()
+            sg = ps.generate_spectrogram(audio)
         else:
-            audio, sr = ps.extract_audio_signal(path1)
+            # repeated queries of the same file skip decoding and the STFT
+            with timing.stage('spectrogram'):
+                sg, sr = spectrogram_cache.get_spectrogram(path1)
             audio_name = os.path.basename(path1)
             audio_name, ext = os.path.splitext(audio_name)
             path = path1
-        
-        sg = ps.generate_spectrogram(audio)
             
-        finger_print = Audio_Fingerprint(audio_name=audio_name, dimension='none', file_path=path, sampling_rate=sr, spectrogram=sg)
+        # query profile: only the features the scorer and the hash read, the last query is kept as a compact record
+        finger_print = Audio_Fingerprint(audio_name=audio_name, dimension='none', file_path=path, sampling_rate=sr, spectrogram=sg, profile='query')
         
-        return finger_print
+        return finger_print.to_record()
         
     
 
-    def __search_database(self):
-        indices = []
-        
-        for fp in self.__full_db:
-            index = self.__calc_similarity_index(fp)
-            indices.append(index)
-                
-        indices = sorted(indices, key=lambda x: x["score"], reverse=True)
-        
-        return indices         
-
-
-    def __calc_similarity_index(self, db_fingerprint):
-        name = db_fingerprint['audio_name']
-        path = db_fingerprint['file_path']
-        dim = db_fingerprint['dimension']
-        hash_str = db_fingerprint['hash_str']
-        raw_features = db_fingerprint['raw_features']
-        peaks = raw_features['spectral_peaks']
-        e = raw_features['energy_envelope']
-        
-        peaks = {tuple(inner_list) for inner_list in peaks}
-        
-        hash_dist = ps.calculate_hash_distance(hash_str, self.__fingerprint.get_hash_str())
-        score = 1 - float(hash_dist)
-        
-        score += ps.calc_shared_spectral_peaks_ratio(peaks, self.__fingerprint.get_spectral_peaks_set())
+    def __search_database(self, fingerprint, top_k:int = None, min_score:float = None, dimensions = None):
+        selected = None if dimensions is None else partitions.select_partitions(self.__partitions, dimensions)
+        if self.__shards is not None:
+            with timing.stage('shards'):
+                names = None if selected is None else [partition.dimension for partition in selected]
+                hits = self.__shards.search(fingerprint, self.search_mode, self.candidates_n, top_k, min_score, names)
+        elif selected is None:
+            hits = [self.__search_partition(fingerprint, self.__whole, top_k, min_score)]
+        else:
+            with timing.stage('partitions'):
+                if len(selected) > 1:
+                    # numpy releases the GIL in the heavy loops, the partitions overlap on the pool threads
+                    tasks = list(self.__partition_pool.map(lambda partition: self.__search_partition_task(fingerprint, partition, top_k, min_score), selected))
+                    hits = [hit for hit, report in tasks]
+                    # stages timed on the pool threads are added to this search's report
+                    caller = timing.current_report()
+                    if caller is not None:
+                        for hit, report in tasks: caller.merge(report)
+                else:
+                    hits = [self.__search_partition(fingerprint, partition, top_k, min_score) for partition in selected]
         
-        score += ps.calc_energy_envelope_correlation(e, self.__fingerprint.get_energy_envelope())
+        with timing.stage('results'):
+            # every hit is already ranked, several ones are merged and ranked again
+            ids, scores, votes = partitions.merge_hits(hits, top_k)
+            indices = self.__db.results(ids, scores)
+            if votes is not None:
+                for index, vote in zip(indices, votes):
+                    index['landmark_votes'] = int(vote)
         
-        score = (score / 3) * 100
+        return indices
+    
+    def __search_partition(self, fingerprint, partition, top_k:int = None, min_score:float = None):
+        return partitions.search_partition(fingerprint, partition, self.search_mode, self.candidates_n, top_k, min_score)
+    
+    def __search_partition_task(self, fingerprint, partition, top_k:int = None, min_score:float = None):
+        with timing.task() as report:
+            hit = self.__search_partition(fingerprint, partition, top_k, min_score)
+        return hit, report
+    
+    def weight_sweep(self, path1:str, path2:str, weights = None):
+        """
+        Score the mixes of two files for a whole range of weights in one batch.\n
+        weights: values of w1 (w2 = 1 - w1), default 0, 0.1, ..., 1.\n
+        Each source is decoded and transformed once, the mixed spectra are formed in the complex STFT domain
+        (see ps.mix_spectrograms) and all mixes are scored against the union of their candidates.\n
+        return {'weights': (K,) array, 'tracks': candidate records (audio_name, file_path, dimension),
+        'scores': (K, C) array, scores[k, c] = score of mix k against track c}
+        """
+        weights = np.linspace(0, 1, 11) if weights is None else np.asarray(weights, dtype=float)
+        audio1, sr = self.load_source(path1)
+        audio2, sr = self.load_source(path2)
         
-        return {
-            'score': score, 
-            'audio_name': name, 
-            'file_path':path,
-            'dimension':dim
-        }
+        fingerprints = []
+        for w1, sg in zip(weights, ps.mix_spectrograms(audio1, audio2, weights)):
+            audio_name, path = ps.mix_name(path1, path2, float(w1), float(1-w1))
+            fingerprints.append(Audio_Fingerprint(audio_name=audio_name, dimension='none', file_path=path,
+                                                  sampling_rate=sr, spectrogram=sg, profile='query').to_record())
+            
+        if self.search_mode == 'scan':
+            candidates = np.arange(len(self.__db))
+        else:
+            candidates = np.unique(np.concatenate([partitions.candidates(fp, self.__whole, self.search_mode, self.candidates_n)[0] for fp in fingerprints]))
+            
+        scores = self.__db.score_batch(fingerprints, candidates)
+        tracks = [{key: record[key] for key in ['audio_name', 'file_path', 'dimension']}
+                  for record in (self.__db.records[int(i)] for i in candidates)]
         
+        return {'weights': weights, 'tracks': tracks, 'scores': scores}
+    
 
 def main():
     file_path = 'Data/original_data/songs/Rolling_in_the_deep(Original).mp3.wav'
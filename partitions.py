@@ -0,0 +1,185 @@
+"""
+Per-dimension partitions of the index.
+
+Index rows are grouped by dimension (full_song, vocals, music, see database.dim). Partition d owns the
+rows [start, stop) and its own inverted landmark index with partition-local track ids, stored in the
+index as 'partition/<d>/range' and 'partition/<d>/inverted/...'. A search restricted to one dimension
+only reads that partition, and since tracks never share postings, the votes of the whole database are
+the concatenated votes of its partitions (no global inverted index is kept).
+
+search_partition is the search of one partition (candidates, score, top-k), shared by Match_Maker and the
+shard workers (see shard_search); merge_hits merges the ranked hits of several partitions or shards.
+"""
+from typing import Dict, List, Sequence
+import numpy as np
+import landmarks
+import scoring
+import processing_and_searching as ps
+import timing
+
+PREFIX = 'partition/'
+
+def group_order(dimensions: Sequence[str], order: Sequence[str]) -> np.ndarray:
+    """
+    return the stable row order grouping `dimensions` by `order`, dimensions not in it follow by first appearance.
+    """
+    ranks = {name: rank for rank, name in enumerate(order)}
+    for name in dimensions:
+        if name not in ranks: ranks[name] = len(ranks)
+
+    return np.argsort([ranks[name] for name in dimensions], kind='stable')
+
+def partition_arrays(dimensions: Sequence[str], landmarks_per_track: Sequence[np.ndarray], order: Sequence[str] = ()) -> Dict[str, np.ndarray]:
+    """
+    return the partition arrays of rows grouped by dimension (see group_order).\n
+    Every dimension of `order` gets a partition, empty ones (at the end) included. ValueError if the rows are not grouped.
+    """
+    names = list(dict.fromkeys(dimensions))
+    names += [name for name in order if name not in names]
+    dimensions = np.asarray(dimensions, dtype=object)
+
+    arrays = {}
+    start = 0
+    for name in names:
+        stop = start + int(np.count_nonzero(dimensions == name))
+        if np.any(dimensions[start:stop] != name):
+            raise ValueError(f"Rows of dimension '{name}' are not contiguous, order them with partitions.group_order")
+
+        inverted_index = landmarks.Inverted_Index.build(landmarks_per_track[start:stop])
+        arrays[PREFIX + name + '/range'] = np.array([start, stop], dtype=np.int64)
+        arrays.update(inverted_index.to_arrays(PREFIX + name + '/inverted/'))
+        start = stop
+
+    return arrays
+
+def has_partitions(index) -> bool:
+    return any(name.startswith(PREFIX) for name in index.arrays)
+
+class Partition:
+    """
+Rows [start, stop) of one dimension: a Database_Matrix of views over them and their inverted index (local track ids).
+    """
+    __slots__ = ('dimension', 'start', 'stop', 'db', 'inverted_index')
+
+    def __init__(self, dimension: str, start: int, stop: int, db: scoring.Database_Matrix, inverted_index):
+        self.dimension = dimension
+        self.start = start
+        self.stop = stop
+        self.db = db
+        self.inverted_index = inverted_index
+
+    def __len__(self):
+        return self.stop - self.start
+
+    def vote(self, query_landmarks: np.ndarray) -> np.ndarray:
+        return self.inverted_index.vote(query_landmarks)
+
+class Partitioned_Index:
+    """
+Votes of several consecutive partitions as one inverted index over their rows.
+    """
+    def __init__(self, partitions: List[Partition]):
+        self.partitions = partitions
+
+    def vote(self, query_landmarks: np.ndarray) -> np.ndarray:
+        votes = [partition.vote(query_landmarks) for partition in self.partitions]
+        return np.concatenate(votes) if votes else np.zeros(0, dtype=np.int64)
+
+def load_partitions(index, db: scoring.Database_Matrix, order: Sequence[str] = ()) -> List[Partition]:
+    """
+    return the partitions of a loaded index in row order.\n
+    Indexes written before partitioning (e.g. older synthetic ones) are partitioned in memory when their rows
+    are grouped by dimension, otherwise they are one partition (dimension None) over a global inverted index.
+    """
+    arrays = index.arrays
+    if not has_partitions(index):
+        dimensions = [record['dimension'] for record in index.records]
+        if 'fp/landmarks' in arrays and len(index):
+            landmarks_per_track = np.split(arrays['fp/landmarks'], arrays['fp/landmarks/offsets'][1:-1])
+        else:
+            landmarks_per_track = [np.zeros((0, 2), dtype=np.int32)] * len(index)
+        try:
+            arrays = partition_arrays(dimensions, landmarks_per_track, order)
+        except ValueError:
+            inverted_index = landmarks.Inverted_Index.from_arrays(index.arrays, len(index))
+            if inverted_index is None: inverted_index = landmarks.Inverted_Index.build(landmarks_per_track)
+            return [Partition(None, 0, len(index), db, inverted_index)]
+
+    partitions = []
+    for name in arrays:
+        if not (name.startswith(PREFIX) and name.endswith('/range')):
+            continue
+        dimension = name[len(PREFIX):-len('/range')]
+        start, stop = (int(value) for value in arrays[name])
+        inverted_index = landmarks.Inverted_Index.from_arrays(arrays, stop - start, PREFIX + dimension + '/inverted/')
+        partitions.append(Partition(dimension, start, stop, db.slice(start, stop), inverted_index))
+
+    return sorted(partitions, key=lambda partition: partition.start)
+
+def select_partitions(partitions: List[Partition], dimensions) -> List[Partition]:
+    """
+    return the partitions of `dimensions`: a dimension or a list of them, 'all' (alone or in a list) selects every one.
+    ValueError for unknown dimensions.
+    """
+    names = [partition.dimension for partition in partitions]
+    if isinstance(dimensions, str):
+        dimensions = [dimensions]
+    if 'all' in dimensions:
+        dimensions = names
+    for dimension in dimensions:
+        if dimension not in names:
+            raise ValueError(f"Invalid dimension '{dimension}'. Supported: {', '.join(repr(name) for name in names)}, 'all'.")
+
+    return [partition for partition in partitions if partition.dimension in dimensions]
+
+def candidates(fingerprint, partition: Partition, search_mode: str, candidates_n: int):
+    """
+    return (candidate ids, landmark votes or None) of a query fingerprint for the search mode, ids within the partition.\n
+    'landmarks' --> the `candidates_n` most voted tracks (tracks without votes are skipped)\n
+    'lsh' --> the `candidates_n` tracks with the closest perceptual hash, one popcount pass over the partition\n
+    'scan' --> every track.
+    """
+    if search_mode == 'landmarks':
+        votes = partition.vote(fingerprint.get_landmarks())
+        voted = np.nonzero(votes)[0]
+        voted = voted[np.argsort(-votes[voted], kind='stable')]
+        return voted[:candidates_n], votes
+    elif search_mode == 'lsh':
+        query_words = ps.hash_to_words(fingerprint.get_hash_str())
+        distances = ps.hamming_distances(query_words, partition.db.hash_words)
+        return np.argsort(distances, kind='stable')[:candidates_n], None
+    elif search_mode == 'scan':
+        return np.arange(len(partition)), None
+    else:
+        raise ValueError(f"Invalid search mode '{search_mode}'. Supported modes: 'landmarks', 'lsh', 'scan'.")
+
+def search_partition(fingerprint, partition: Partition, search_mode: str, candidates_n: int, top_k: int = None,
+                     min_score: float = None):
+    """
+    return (database ids, scores, landmark votes or None) of the ranked matches within one partition.
+    """
+    with timing.stage('candidates'):
+        ids, votes = candidates(fingerprint, partition, search_mode, candidates_n)
+
+    with timing.stage('score'):
+        scores = partition.db.score(fingerprint, None if search_mode == 'scan' else ids, min_score)
+    with timing.stage('select'):
+        # partial selection, only the winners are sorted and turned into result dicts
+        order = scoring.top_k(scores, top_k, min_score)
+
+    ids = ids[order]
+    return ids + partition.start, scores[order], None if votes is None else votes[ids]
+
+def merge_hits(hits: List[tuple], top_k: int = None):
+    """
+    return the `top_k` best of several ranked (ids, scores, votes or None) hits as one ranked hit.
+    """
+    if len(hits) == 1:
+        return hits[0]
+    if not hits:
+        return np.zeros(0, dtype=np.int64), np.zeros(0), None
+
+    scores = np.concatenate([hit[1] for hit in hits])
+    order = scoring.top_k(scores, top_k)
+    votes = None if hits[0][2] is None else np.concatenate([hit[2] for hit in hits])[order]
+    return np.concatenate([hit[0] for hit in hits])[order], scores[order], votes
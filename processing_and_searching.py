@@ -1,12 +1,19 @@
 from typing import List, Dict, Any, Union, Tuple, Set
 import hashlib
 import numpy as np
-from scipy.spatial.distance import cosine, euclidean, cityblock, jensenshannon, hamming
 import os
-import librosa
-from scipy.stats import pearsonr
-import soundfile as sf
-from scipy.interpolate import interp1d
+from functools import lru_cache
+import fingerprint_params as fparams
+import timing
+from lazy_imports import lazy_import
+
+# imported on first use, see lazy_imports
+librosa = lazy_import('librosa')
+sf = lazy_import('soundfile')
+scipy_distance = lazy_import('scipy.spatial.distance')
+scipy_interpolate = lazy_import('scipy.interpolate')
+scipy_signal = lazy_import('scipy.signal')
+scipy_stats = lazy_import('scipy.stats')
 
 def peak_normalize(data:np.ndarray):
     max_val = np.max(data)
@@ -20,21 +27,99 @@ def min_max_normalize(data:np.ndarray):
     data = (data - min_val) / (max_val - min_val)
     return data
 
+def z_normalize(data:np.ndarray):
+    """
+    return the data (or every row of a matrix) centered and scaled to unit standard deviation.\n
+    For two z-normalized vectors of length L, dot(a, b) / L is their Pearson correlation.
+    """
+    data = np.asarray(data, dtype=np.float32)
+    data = data - data.mean(axis=-1, keepdims=True)
+    std = data.std(axis=-1, keepdims=True)
+    
+    return np.divide(data, std, out=np.zeros_like(data), where=std > 0)
+
+def resample_fft(data:np.ndarray, length:int):
+    """
+    return the signal resampled to `length` samples in the frequency domain (band limited, no aliasing).
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if len(data) == length:
+        return data
+    
+    return scipy_signal.resample(data, length)
+
+def canonical_envelope(energy:np.ndarray, length:int = None):
+    """
+    return the energy envelope resampled to the canonical length as a contiguous, z-normalized float32 vector.\n
+    Computed once per fingerprint so envelope correlation is a single dot product.
+    """
+    if length is None: length = fparams.ENVELOPE_LENGTH
+    
+    return np.ascontiguousarray(z_normalize(resample_fft(energy, length)))
+
 def trim_and_perform_monoticity(audio_data: np.ndarray, sample_rate):
     if len(audio_data.shape) > 1: audio_data = np.mean(audio_data, axis=1)
-    audio_data = audio_data[:sample_rate * 18]
+    audio_data = audio_data[:sample_rate * fparams.ANALYSIS_SECONDS]
     
     return audio_data
 
-def extract_audio_signal(file_path:str, sr = 48000):
+#formats soundfile can seek in, the rest is decoded through librosa/audioread
+WINDOWED_FORMATS = ('.wav', '.flac', '.ogg', '.aiff', '.aif')
+BLOCK_FRAMES = 1 << 16
+#extra audio read past the window so the resampler has context at the window edge
+RESAMPLE_MARGIN_SECONDS = 0.1
+
+def read_audio_window(file_path:str, sr = fparams.SAMPLE_RATE, offset:float = 0.0, duration:float = None):
+    """
+    return the mono signal of [offset, offset + duration) seconds resampled to sr, and sr.\n
+    Only the requested window is decoded: WAV and other soundfile formats are read in blocks
+    from the seek position, other formats go through librosa.load(offset, duration).\n
+    duration=None reads until the end of the file.
+    """
+    ext = os.path.splitext(file_path)[1].lower()
+    
+    if ext not in WINDOWED_FORMATS:
+        # decoding and resampling happen together in librosa.load
+        with timing.stage('decode'):
+            audio_data, sr = librosa.load(file_path, sr=sr, offset=offset, duration=duration)
+    else:
+        audio_data = __read_soundfile_window(file_path, sr, offset, duration)
+        
+    if duration is not None:
+        audio_data = audio_data[:int(round(duration * sr))]
+        
+    return audio_data, sr
+
+def __read_soundfile_window(file_path:str, sr, offset:float, duration:float):
     """
-    return the normalized audio signal with its native sampling rate.\n
+    Seek to the window start and decode it block by block, down-mixing every block to mono.
+    """
+    with timing.stage('decode'), sf.SoundFile(file_path) as file:
+        native_sr = file.samplerate
+        start = min(int(round(offset * native_sr)), file.frames)
+        frames = file.frames - start
+        if duration is not None:
+            frames = min(frames, int(round((duration + RESAMPLE_MARGIN_SECONDS) * native_sr)))
+        
+        file.seek(start)
+        blocks = [block.mean(axis=1) for block in file.blocks(blocksize=BLOCK_FRAMES, frames=frames, dtype='float32', always_2d=True)]
+    
+    audio_data = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float32)
+    
+    if native_sr != sr:
+        with timing.stage('resample'):
+            audio_data = librosa.resample(y=audio_data, orig_sr=native_sr, target_sr=sr)
+        
+    return audio_data
+
+def extract_audio_signal(file_path:str, sr = fparams.SAMPLE_RATE, offset:float = 0.0, duration:float = fparams.ANALYSIS_SECONDS):
+    """
+    return the normalized audio signal of the analysed window, resampled to sr.\n
+    Only [offset, offset + duration) is decoded, duration=None reads the whole file.\n
     Peak Normalization is applied if required.
     """
     file_path = os.path.normpath(file_path)
-    audio_data, sample_rate = librosa.load(file_path, sr=sr)
-    
-    audio_data = trim_and_perform_monoticity(audio_data, sample_rate)
+    audio_data, sample_rate = read_audio_window(file_path, sr, offset, duration)
     
     audio_data = peak_normalize(audio_data)
     
@@ -51,23 +136,28 @@ def mix_audio(path1:str, path2:str, w1:float, w2:float):
     
     audio1, sr = extract_audio_signal(path1)
     audio2, sr = extract_audio_signal(path2)
-            
-    
-    audio1 = trim_and_perform_monoticity(audio1, sr)
-    audio2 = trim_and_perform_monoticity(audio2, sr)       
-    
-    mix_audio = (w1*audio1) + (w2*audio2)
     
-    mix_audio = peak_normalize(mix_audio)
+    mix_audio = mix_signals(audio1, audio2, w1, w2)
     
     name, path =  save_mix(path1, path2, mix_audio, sr, w1, w2)
     
     return mix_audio, sr, name, path 
- 
-def save_mix(path1, path2, mix_audio, sr, w1, w2):
+
+def mix_signals(audio1:np.ndarray, audio2:np.ndarray, w1:float, w2:float):
     """
-    save mix audio in a .wav file.\n
-    return mix_name and mix_file_path
+    return the peak normalized weighted sum of two decoded signals (see extract_audio_signal), in memory.\n
+    The shorter signal is zero padded.
+    """
+    length = max(len(audio1), len(audio2))
+    mix_audio = np.zeros(length, dtype=np.result_type(audio1, audio2))
+    mix_audio[:len(audio1)] += w1 * audio1
+    mix_audio[:len(audio2)] += w2 * audio2
+    
+    return peak_normalize(mix_audio)
+
+def mix_name(path1:str, path2:str, w1:float, w2:float):
+    """
+    return the mix name and the file path save_mix writes it to.
     """
     name1 = os.path.basename(path1)
     name1, ext = os.path.splitext(name1)
@@ -77,7 +167,17 @@ def save_mix(path1, path2, mix_audio, sr, w1, w2):
         
     audio_name = name1+'weight_'+str(w1)+' and '+name2 + 'weight_' + str(w2)+' mix'
     save_path = os.path.join('saved_mix/'+audio_name+'.wav') 
-            
+    
+    return audio_name, save_path
+ 
+def save_mix(path1, path2, mix_audio, sr, w1, w2):
+    """
+    save mix audio in a .wav file.\n
+    return mix_name and mix_file_path
+    """
+    audio_name, save_path = mix_name(path1, path2, w1, w2)
+    
+    os.makedirs(os.path.dirname(save_path), exist_ok=True)
     sf.write(save_path, mix_audio, sr) 
             
     return audio_name, save_path 
@@ -87,63 +187,60 @@ def generate_spectrogram(audio_data:np.ndarray):
     return normalized spectrogram in decibel scale.\n
     min-max normalization is applied if required.
     """
-    sg = np.abs(librosa.stft(audio_data))
+    with timing.stage('stft'):
+        stft_matrix = librosa.stft(audio_data, n_fft=fparams.N_FFT, hop_length=fparams.HOP_LENGTH)
+    return spectrogram_from_stft(stft_matrix)
+
+@timing.timed('spectrogram_db')
+def spectrogram_from_stft(stft_matrix:np.ndarray):
+    """
+    return the normalized decibel spectrogram of a complex STFT, see generate_spectrogram.
+    """
+    sg = np.abs(stft_matrix)
     sg = librosa.amplitude_to_db(sg, ref=1)
     sg = min_max_normalize(sg)
         
     return sg
 
-def __generate_spectrograms(input_folder_path):
-    sampling_rates = []
-    audios = []
-    paths = []
-    names = []
-    
-    spectrograms:List[Dict] = []
-    files = os.listdir(input_folder_path)
-    
-    for file in files:
-        if file.endswith('.wav'):
-            file_path = os.path.join(input_folder_path, file)
-            file_path = os.path.normpath(file_path)
-            audio_name, ext = os.path.splitext(file)
-            audio_data, sample_rate = extract_audio_signal(file_path)
-            
-            audios.append(audio_data)
-            sampling_rates.append(sample_rate)
-            names.append(audio_name)
-            paths.append(file_path)
-            
-    audios, max_sr = resample_audios_with_max_sr(audios, sampling_rates)
+def mix_spectrograms(audio1:np.ndarray, audio2:np.ndarray, weights):
+    """
+    return the spectrograms of mix_signals(audio1, audio2, w, 1 - w) for every weight w.\n
+    The STFT is linear, so each source is transformed once and every mix is formed in the complex
+    STFT domain: w * STFT(audio1) + (1 - w) * STFT(audio2), scaled by the peak of the mixed signal.
+    """
+    length = max(len(audio1), len(audio2))
+    audio1 = np.pad(audio1, (0, length - len(audio1)))
+    audio2 = np.pad(audio2, (0, length - len(audio2)))
     
-    for audio, path, name in zip(audios, paths, names):
-        S_db = generate_spectrogram(audio)
-        spectrograms.append({'file_path':path, 'audio_name': name, 'SG': S_db, 'SR':max_sr})
+    stft1 = librosa.stft(audio1, n_fft=fparams.N_FFT, hop_length=fparams.HOP_LENGTH)
+    stft2 = librosa.stft(audio2, n_fft=fparams.N_FFT, hop_length=fparams.HOP_LENGTH)
     
-    return spectrograms        
-
-
-def resample_audios_with_max_sr(audios, og_sampling_rates):
-    max_sr = max(og_sampling_rates)
-    new_audios = []
-    
-    for audio, og_sr in zip(audios, og_sampling_rates):
-        audio = librosa.resample(y=audio, orig_sr=og_sr, target_sr=max_sr)
-        new_audios.append(audio)
+    spectrograms = []
+    for w in weights:
+        # peak normalization of the mixed signal is a scalar factor of its STFT
+        peak = np.max(w * audio1 + (1 - w) * audio2)
+        spectrograms.append(spectrogram_from_stft((w * stft1 + (1 - w) * stft2) / peak))
         
-    return new_audios, max_sr    
+    return spectrograms
 
-def generate_dataset_spectrograms(paths:List):
+def file_digest(file_path: str, chunk_size: int = 1 << 20) -> str:
     """
-    return a list where each entry is a list of dictionaries.\n
-    Each dict contains a wav file paramters as name, path, sampling_rate and spectrogram
+    return the content digest of a file, read in chunks.
     """
-    full_songs_spectrograms = __generate_spectrograms(paths[0])
-    vocals_spectrograms = __generate_spectrograms(paths[1])
-    music_spectrograms = __generate_spectrograms(paths[2])
-
-    return [full_songs_spectrograms, vocals_spectrograms, music_spectrograms]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+            
+    return digest.hexdigest()
 
+def list_audio_files(input_folder_path):
+    """
+    return the sorted, normalized paths of the .wav files in a folder.
+    """
+    files = sorted(os.listdir(input_folder_path))
+    
+    return [os.path.normpath(os.path.join(input_folder_path, file)) for file in files if file.endswith('.wav')]
 
 def flatten_and_normalize(features: Dict):
     flattened_features = []
@@ -151,6 +248,8 @@ def flatten_and_normalize(features: Dict):
     for key, val in sorted(features.items()):
         if isinstance(val, float) or isinstance(val, int):
             flattened_features.append(val)
+        elif isinstance(val, np.ndarray):
+            flattened_features.extend(val.ravel().tolist())
         elif isinstance(val, list):
             if isinstance(val[0], list):
                 for item in val:
@@ -164,14 +263,74 @@ def flatten_and_normalize(features: Dict):
         
     return flattened_features.tolist()                
 
-def p_hash(features: Dict) -> str:
+def __standardize(vector: np.ndarray):
+    vector = vector - vector.mean()
+    norm = np.linalg.norm(vector)
+    
+    return vector / norm if norm > 0 else vector
+
+def lsh_feature_vector(features: Dict) -> np.ndarray:
+    """
+    return the fixed-length vector the locality-sensitive hash is computed on.\n
+    mfccs, spectral contrast, the energy envelope resampled to LSH_ENVELOPE_LENGTH and a histogram of
+    the spectral peak frequencies. Each group is centered and L2 normalized so no group dominates.
+    """
+    envelope = np.asarray(features['energy_envelope'], dtype=np.float64)
+    envelope = np.interp(np.linspace(0, 1, fparams.LSH_ENVELOPE_LENGTH), np.linspace(0, 1, len(envelope)), envelope)
+    
+    peak_freqs = np.asarray(features['spectral_peaks']).reshape(-1, 2)[:, 0]
+    n_bins = fparams.N_FFT // 2 + 1
+    peak_histogram, _ = np.histogram(peak_freqs, bins=fparams.LSH_PEAK_BANDS, range=(0, n_bins))
+    
+    groups = [features['mfccs'], features['spectral_contrast'], envelope, peak_histogram]
+    
+    return np.concatenate([__standardize(np.asarray(group, dtype=np.float64)) for group in groups])
+
+@lru_cache(maxsize=8)
+def __hyperplanes(dim: int, n_bits: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((n_bits, dim))
+
+def simhash(vector: np.ndarray, n_bits: int = None, seed: int = None) -> np.ndarray:
+    """
+    Random-hyperplane SimHash.\n
+    return the sign bits of `n_bits` random projections packed into n_bits/64 uint64 words.
+    """
+    if n_bits is None: n_bits = fparams.HASH_BITS
+    if seed is None: seed = fparams.HASH_SEED
+    
+    bits = __hyperplanes(len(vector), n_bits, seed) @ vector > 0
     
-    features = flatten_and_normalize(features)
-    features = str(features).encode()
-    features = hashlib.sha256(features)
-    features = features.hexdigest()
+    return np.frombuffer(np.packbits(bits).tobytes(), dtype='>u8').astype(np.uint64)
+
+def hash_to_words(hash_str: str) -> np.ndarray:
+    return np.frombuffer(bytes.fromhex(hash_str), dtype='>u8').astype(np.uint64)
+
+def words_to_hash(words: np.ndarray) -> str:
+    return np.asarray(words, dtype='>u8').tobytes().hex()
+
+@timing.timed('hash')
+def p_hash(features: Dict) -> str:
+    """
+    return the locality-sensitive perceptual hash of the features as a hex string.\n
+    Similar features give hashes with a small bit Hamming distance.
+    """
+    words = simhash(lsh_feature_vector(features))
         
-    return features
+    return words_to_hash(words)
+
+__POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def hamming_distances(query_words: np.ndarray, words_matrix: np.ndarray) -> np.ndarray:
+    """
+    return the normalized bit Hamming distance between one packed hash and every row of `words_matrix`, in one vectorized pass.
+    """
+    words_matrix = np.ascontiguousarray(words_matrix, dtype=np.uint64).reshape(-1, len(query_words))
+    xor = np.bitwise_xor(words_matrix, np.asarray(query_words, dtype=np.uint64))
+    
+    bit_counts = __POPCOUNT_TABLE[xor.view(np.uint8)].sum(axis=1, dtype=np.int64)
+    
+    return bit_counts / (64 * len(query_words))
 
 def perceptual_hash(features: Dict[str, Any]) -> str:
     """
@@ -219,15 +378,19 @@ def search_hashed_database(query_features: Dict[str, Any], hashed_database: List
     distances.sort(key=lambda x: x[0])
     return [song for _, song in distances[:top_n]]
 
-def calculate_hash_distance(hash1: str, hash2: str, distance_metric: str = 'h') -> float:
+def calculate_hash_distance(hash1: str, hash2: str, distance_metric: str = 'b') -> float:
     """ 
     Calculate the distance between two hashes based on the selected distance metric.\n
     distance_metric: cos --> cosine \n
     e -- > euclidean\n
     c --> cityblock\n
     j --> jensenshannon\n
-    h --> hamming
+    h --> hamming over the hash bytes\n
+    b --> hamming over the hash bits (meaningful for the locality-sensitive p_hash)
     """
+    if distance_metric == 'b':
+        return float(hamming_distances(hash_to_words(hash1), hash_to_words(hash2))[0])
+    
     hash1_array = np.frombuffer(bytes.fromhex(hash1), dtype=np.uint8)
     hash2_array = np.frombuffer(bytes.fromhex(hash2), dtype=np.uint8)
 
@@ -237,15 +400,15 @@ def calculate_hash_distance(hash1: str, hash2: str, distance_metric: str = 'h')
     #     hash2_array = hash2_array / np.linalg.norm(hash2_array)
 
     if distance_metric == 'cos':
-        return cosine(hash1_array, hash2_array)
+        return scipy_distance.cosine(hash1_array, hash2_array)
     elif distance_metric == 'e':
-        return euclidean(hash1_array, hash2_array)
+        return scipy_distance.euclidean(hash1_array, hash2_array)
     elif distance_metric == 'c':
-        return cityblock(hash1_array, hash2_array)
+        return scipy_distance.cityblock(hash1_array, hash2_array)
     elif distance_metric == 'j':
-        return jensenshannon(hash1_array, hash2_array)
+        return scipy_distance.jensenshannon(hash1_array, hash2_array)
     elif distance_metric == 'h':
-        return hamming(hash1_array, hash2_array)
+        return scipy_distance.hamming(hash1_array, hash2_array)
     else:
         raise ValueError(
             "Invalid distance metric. Supported metrics: 'cosine', 'euclidean', 'cityblock', 'jensenshannon'.")
@@ -271,16 +434,21 @@ def __sinc_interpolate(x_vals, y_vals, new_x_vals):
     return interpolated.tolist()
     
 
-def calc_energy_envelope_correlation(e1: List, e2: List, interpolation='sinc'):
+def calc_energy_envelope_correlation(e1: List, e2: List, interpolation='fft'):
     """
-    return a metric that indicates how similar the energy distribution is
+    return a metric that indicates how similar the energy distribution is\n
+    Envelopes of different lengths are resampled to the longer one: fft (default), sinc or any interp1d kind.
     """ 
+    if interpolation == 'fft' and len(e1) != len(e2):
+        length = max(len(e1), len(e2))
+        e1, e2 = resample_fft(e1, length), resample_fft(e2, length)
+    
     if len(e1) < len(e2):
         old = np.linspace(0, 1, len(e1))
         new = np.linspace(0, 1, len(e2))
         if interpolation=='sinc': e1 = __sinc_interpolate(old, e1, new)
         else:
-            f = interp1d(old, e1, interpolation)
+            f = scipy_interpolate.interp1d(old, e1, interpolation)
             e1 = f(new)
     
     elif len(e2) < len(e1):
@@ -288,10 +456,10 @@ def calc_energy_envelope_correlation(e1: List, e2: List, interpolation='sinc'):
         new = np.linspace(0, 1, len(e1))
         if interpolation=='sinc': e2 = __sinc_interpolate(old, e2, new)
         else:
-            f = interp1d(old, e2, interpolation)
+            f = scipy_interpolate.interp1d(old, e2, interpolation)
             e2 = f(new)
                      
-    correlation, _ = pearsonr(e1, e2)
+    correlation, _ = scipy_stats.pearsonr(e1, e2)
     return correlation
 
 
@@ -0,0 +1,241 @@
+"""
+Columnar, in-memory layout of the database and batched similarity scoring.
+
+Every fingerprint is one row of a set of matrices (hash words, envelopes, features), the
+spectral peaks of all fingerprints are one concatenated array with per-row offsets.
+The composite score of `Match_Maker` is computed for all rows with vectorized operations:
+
+    score = (hash term + peak term + envelope term) / 3 * 100
+
+hash term: 1 - bit Hamming distance of the perceptual hashes\n
+peak term: Jaccard similarity of the (freq, time) spectral peak sets\n
+envelope term: Pearson correlation of the energy envelopes
+"""
+from typing import Dict, List
+import numpy as np
+import processing_and_searching as ps
+import fingerprint_params as fparams
+from fingerprint_record import PEAK_DTYPE
+import timing
+
+def segment_positions(offsets: np.ndarray, ids: np.ndarray):
+    """
+    return (positions, lengths): the concatenated element positions of the segments `ids` of a CSR offsets array.
+    """
+    starts = offsets[ids]
+    lengths = offsets[ids + 1] - starts
+    total = int(lengths.sum())
+    positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+
+    return positions, lengths
+
+def top_k(scores: np.ndarray, k: int = None, min_score: float = None) -> np.ndarray:
+    """
+    return the positions of the `k` highest scores (all when k is None) that reach `min_score`, highest first.\n
+    Same order as the first k of a stable descending argsort (ties by position), but the winners are
+    selected with one O(n) partition and only they are sorted.
+    """
+    positions = None
+    if min_score is not None:
+        positions = np.flatnonzero(scores >= min_score)
+        scores = scores[positions]
+
+    n = len(scores)
+    if k is None or k >= n:
+        order = np.argsort(-scores, kind='stable')
+    elif k <= 0:
+        order = np.zeros(0, dtype=np.int64)
+    else:
+        kth = np.partition(scores, n - k)[n - k]
+        above = np.flatnonzero(scores > kth)
+        ties = np.flatnonzero(scores == kth)[:k - len(above)]
+        winners = np.concatenate([above, ties])
+        order = winners[np.lexsort((winners, -scores[winners]))]
+
+    return order if positions is None else positions[order]
+
+class Database_Matrix:
+    """
+Columnar database: one row per fingerprint.\n
+records: metadata dicts (audio_name, file_path, dimension, hash_str)\n
+hash_words: (N, W) uint64 packed perceptual hashes\n
+peaks + peak_offsets: (M, 2) [freq, time] peaks of all rows, row i owns peaks[peak_offsets[i]:peak_offsets[i+1]]\n
+envelopes: (N, ENVELOPE_LENGTH) z-normalized float32 energy envelopes, see ps.canonical_envelope\n
+features: (N, k) float32 matrices of the fixed-length raw features (mfccs, spectral_contrast, ...)
+    """
+    def __init__(self, records: List[Dict], hash_words: np.ndarray, peaks: np.ndarray, peak_offsets: np.ndarray,
+                 envelopes: np.ndarray, features: Dict[str, np.ndarray] = None):
+        self.records = records
+        self.hash_words = hash_words
+        self.peaks = peaks
+        self.peak_offsets = peak_offsets
+        self.peak_counts = np.diff(peak_offsets)
+        self.envelopes = envelopes
+        self.features = features or {}
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_index(cls, index):
+        """
+        Build the layout from an `index_store.Fingerprint_Index`, peaks and hashes stay memory mapped.
+        """
+        if len(index) == 0:
+            # an empty library stores no raw/ arrays
+            return cls([], np.zeros((0, fparams.HASH_BITS // 64), dtype=np.uint64), np.zeros((0, 2), dtype=PEAK_DTYPE),
+                       np.zeros(1, dtype=np.int64), np.zeros((0, fparams.ENVELOPE_LENGTH), dtype=np.float32))
+
+        arrays = index.arrays
+        # stored at canonical length and z-normalized, used as is
+        envelopes = arrays['raw/energy_envelope']
+
+        features = {}
+        for name in index.feature_names():
+            array = arrays['raw/' + name]
+            if 'raw/' + name + '/offsets' not in arrays and name != 'energy_envelope':
+                features[name] = array
+
+        return cls(index.records, arrays['hash/words'], arrays['raw/spectral_peaks'], arrays['raw/spectral_peaks/offsets'],
+                   envelopes, features)
+
+    def slice(self, start: int, stop: int):
+        """
+        return rows [start, stop) as a Database_Matrix of views (hashes, peaks and envelopes are not copied).
+        """
+        first_peak = self.peak_offsets[start]
+        return Database_Matrix(self.records[start:stop], self.hash_words[start:stop], self.peaks[first_peak:self.peak_offsets[stop]],
+                               self.peak_offsets[start:stop + 1] - first_peak, self.envelopes[start:stop],
+                               {name: feature[start:stop] for name, feature in self.features.items()})
+
+    def hash_scores(self, query_hash: str, ids: np.ndarray = None) -> np.ndarray:
+        words = self.hash_words if ids is None else self.hash_words[ids]
+        return 1 - ps.hamming_distances(ps.hash_to_words(query_hash), words)
+
+    def peak_scores(self, query_peaks: np.ndarray, ids: np.ndarray = None) -> np.ndarray:
+        """
+        return the Jaccard similarity between the query peak set and the peak set of every row.\n
+        The query peaks are written into a dense (freq x time) bitmap, so every stored peak is a single lookup.
+        """
+        return self.__peak_jaccard(query_peaks, *self.__row_peaks(ids))
+
+    def __row_peaks(self, ids: np.ndarray = None):
+        """
+        return (peaks, lengths) of rows `ids`, concatenated.
+        """
+        if ids is None:
+            return self.peaks, self.peak_counts
+        positions, lengths = segment_positions(self.peak_offsets, ids)
+        return self.peaks[positions], lengths
+
+    @staticmethod
+    def __peak_jaccard(query_peaks, peaks: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+        query_peaks = np.asarray(query_peaks, dtype=np.int64).reshape(-1, 2)
+        n_rows = len(lengths)
+        if len(query_peaks) == 0:
+            return np.zeros(n_rows)
+
+        n_freqs = max(int(query_peaks[:, 0].max()), int(peaks[:, 0].max()) if len(peaks) else 0) + 1
+        n_times = int(query_peaks[:, 1].max()) + 1
+        bitmap = np.zeros((n_freqs, n_times), dtype=bool)
+        bitmap[query_peaks[:, 0], query_peaks[:, 1]] = True
+        n_query = int(bitmap.sum())
+
+        times = peaks[:, 1]
+        in_range = times < n_times
+        hits = np.zeros(len(peaks), dtype=np.int64)
+        hits[in_range] = bitmap[peaks[in_range, 0], times[in_range]]
+
+        # per row sum of hits through a cumulative sum over the row boundaries
+        cumulative = np.concatenate([[0], np.cumsum(hits)])
+        ends = np.cumsum(lengths)
+        shared = cumulative[ends] - cumulative[ends - lengths]
+
+        union = lengths + n_query - shared
+        return np.divide(shared, union, out=np.zeros(n_rows), where=union > 0)
+
+    def envelope_scores(self, query_envelope, ids: np.ndarray = None) -> np.ndarray:
+        """
+        return the Pearson correlation of the query envelope with every row: one matrix-vector product.
+        """
+        envelopes = self.envelopes if ids is None else self.envelopes[ids]
+        query = np.asarray(query_envelope, dtype=np.float32)
+        if len(query) != envelopes.shape[1]:
+            query = ps.canonical_envelope(query, envelopes.shape[1])
+
+        return envelopes @ query / envelopes.shape[1]
+
+    def score(self, query_fingerprint, ids: np.ndarray = None, min_score: float = None) -> np.ndarray:
+        """
+        return the composite similarity score (0-100) of the query against every row, or only against rows `ids`.\n
+        min_score: the peak term (at most 1) is only computed for rows whose hash and envelope terms can still
+        reach it, the other rows score -inf.
+        """
+        if ids is not None: ids = np.asarray(ids, dtype=np.int64)
+
+        with timing.stage('score/hash'):
+            hash_term = self.hash_scores(query_fingerprint.get_hash_str(), ids)
+        with timing.stage('score/envelope'):
+            envelope_term = self.envelope_scores(query_fingerprint.get_energy_envelope(), ids)
+
+        alive = None
+        if min_score is not None:
+            alive = np.flatnonzero((hash_term + envelope_term + 1) / 3 * 100 >= min_score)
+
+        with timing.stage('score/peaks'):
+            # gathering the peaks of scattered rows costs more than scanning all of them unless most rows are pruned
+            if alive is None or 2 * len(alive) > len(hash_term):
+                peak_term = self.peak_scores(query_fingerprint.get_spectral_peaks(), ids)
+            else:
+                peak_term = np.zeros(len(hash_term))
+                peak_term[alive] = self.peak_scores(query_fingerprint.get_spectral_peaks(), alive if ids is None else ids[alive])
+
+        # same summation order as the unpruned score, so both give identical values
+        score = ((hash_term + peak_term + envelope_term) / 3) * 100
+        if alive is not None:
+            pruned = np.ones(len(score), dtype=bool)
+            pruned[alive] = False
+            score[pruned] = -np.inf
+
+        return score
+
+    def score_batch(self, query_fingerprints: List, ids: np.ndarray = None) -> np.ndarray:
+        """
+        return the (K, rows) composite scores of K queries, the values of `score` for each query up to float32 rounding.\n
+        The candidate peaks are gathered once and the envelope terms are one matrix product.
+        """
+        if ids is not None: ids = np.asarray(ids, dtype=np.int64)
+        n_rows = len(self) if ids is None else len(ids)
+        scores = np.zeros((len(query_fingerprints), n_rows))
+        if not query_fingerprints:
+            return scores
+
+        words = self.hash_words if ids is None else self.hash_words[ids]
+        peaks, lengths = self.__row_peaks(ids)
+        for k, fp in enumerate(query_fingerprints):
+            scores[k] = 1 - ps.hamming_distances(ps.hash_to_words(fp.get_hash_str()), words)
+            scores[k] += self.__peak_jaccard(fp.get_spectral_peaks(), peaks, lengths)
+
+        envelopes = self.envelopes if ids is None else self.envelopes[ids]
+        queries = np.zeros((len(query_fingerprints), envelopes.shape[1]), dtype=np.float32)
+        for k, fp in enumerate(query_fingerprints):
+            query = np.asarray(fp.get_energy_envelope(), dtype=np.float32)
+            queries[k] = query if len(query) == envelopes.shape[1] else ps.canonical_envelope(query, envelopes.shape[1])
+        scores += queries @ envelopes.T / envelopes.shape[1]
+
+        return (scores / 3) * 100
+
+    def results(self, ids: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """
+        return result dicts (score, audio_name, file_path, dimension) for rows `ids`, in the given order.
+        """
+        results = []
+        for i, score in zip(ids, scores):
+            record = self.records[int(i)]
+            results.append({
+                'score': float(score),
+                'audio_name': record['audio_name'],
+                'file_path': record['file_path'],
+                'dimension': record['dimension']
+            })
+        return results
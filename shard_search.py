@@ -0,0 +1,170 @@
+"""
+Multi-process sharded search.
+
+One process scores the whole database on one core. Here the index is split into N shards, each owned by
+a long-lived worker process that keeps it resident: every partition (see partitions) is cut into N
+consecutive row ranges and shard i owns range i of each, so dimension filtered searches use every worker too.
+
+The workers memory-map the index file themselves (the pages are shared through the page cache) and fault
+their rows in at startup. For every search the coordinator pickles the query record once, sends the same
+bytes to every worker and gathers their ranked hits, which the caller merges (partitions.merge_hits).
+With landmarks / lsh, `candidates_n` candidates are taken per shard and partition (a superset of the
+candidates of one process), scan gives the same matches as one process.
+"""
+from typing import List
+import os
+import pickle
+import threading
+import multiprocessing
+import numpy as np
+import database
+import index_store
+import partitions
+import scoring
+from fingerprint_record import Fingerprint_Record
+
+# one byte read per page when a worker faults its shard in
+PAGE_SIZE = 4096
+# empty message: the worker exits
+_STOP = b''
+
+def shard_range(start: int, stop: int, shard: int, n_shards: int):
+    """
+    return the rows [start, stop) of `shard` out of `n_shards` consecutive ranges of [start, stop).
+    """
+    size = stop - start
+    return start + size * shard // n_shards, start + size * (shard + 1) // n_shards
+
+def load_shard(file_path: str, shard: int, n_shards: int) -> List[partitions.Partition]:
+    """
+    return the pieces of `shard`: one Partition per index partition, with its rows, views and inverted index.
+    """
+    index = index_store.load_index(file_path)
+    db = scoring.Database_Matrix.from_index(index)
+
+    pieces = []
+    for partition in partitions.load_partitions(index, db, database.dim):
+        start, stop = shard_range(partition.start, partition.stop, shard, n_shards)
+        inverted_index = partition.inverted_index.slice(start - partition.start, stop - partition.start)
+        pieces.append(partitions.Partition(partition.dimension, start, stop, db.slice(start, stop), inverted_index))
+
+    for piece in pieces:
+        _touch(piece.db)
+    return pieces
+
+def _touch(db: scoring.Database_Matrix):
+    """
+    Read one byte per page of the mapped arrays of `db`, so the first search does not page them in.
+    """
+    for array in [db.hash_words, db.peaks, db.envelopes] + list(db.features.values()):
+        if array.size:
+            int(array.reshape(-1).view(np.uint8)[::PAGE_SIZE].sum())
+
+def _serve_shard(connection, file_path: str, shard: int, n_shards: int):
+    """
+    Worker process: load the shard, answer ('ready', tracks), then one (status, hit) per search until stopped.
+    """
+    try:
+        pieces = load_shard(file_path, shard, n_shards)
+    except Exception as error:
+        connection.send(('error', error))
+        return
+    connection.send(('ready', sum(len(piece) for piece in pieces)))
+
+    while True:
+        try:
+            message = connection.recv_bytes()
+        except EOFError:
+            break
+        if message == _STOP:
+            break
+
+        fingerprint, search_mode, candidates_n, top_k, min_score, dimensions = pickle.loads(message)
+        try:
+            selected = [piece for piece in pieces if len(piece) and (dimensions is None or piece.dimension in dimensions)]
+            hits = [partitions.search_partition(fingerprint, piece, search_mode, candidates_n, top_k, min_score) for piece in selected]
+            connection.send(('ok', partitions.merge_hits(hits, top_k)))
+        except Exception as error:
+            connection.send(('error', error))
+
+class Shard_Pool:
+    """
+`n_shards` worker processes (default: one per CPU core) over the index file, worker i keeps shard i resident.\n
+A search is broadcast to every worker and their hits gathered; searches run one at a time, each already uses all workers.
+    """
+    def __init__(self, file_path: str, n_shards: int = None):
+        self.file_path = os.path.abspath(file_path)
+        self.n_shards = n_shards or os.cpu_count() or 1
+        self.__lock = threading.Lock()
+        self.__connections = []
+        self.__workers = []
+
+        # spawned, not forked: the parent may run threads (GUI, server pools) and the workers need none of its state
+        context = multiprocessing.get_context('spawn')
+        try:
+            for shard in range(self.n_shards):
+                connection, worker_connection = context.Pipe()
+                worker = context.Process(target=_serve_shard, args=(worker_connection, self.file_path, shard, self.n_shards),
+                                         name=f'shard-{shard}', daemon=True)
+                worker.start()
+                worker_connection.close()
+                self.__connections.append(connection)
+                self.__workers.append(worker)
+            self.shard_sizes = self.__gather()
+        except BaseException:
+            self.close()
+            raise
+
+    def __len__(self):
+        return self.n_shards
+
+    def search(self, fingerprint, search_mode: str, candidates_n: int, top_k: int = None, min_score: float = None,
+               dimensions: List[str] = None) -> List[tuple]:
+        """
+        return the ranked (database ids, scores, landmark votes or None) hits of the shards that matched.\n
+        dimensions: the partitions searched, None --> all of them.
+        """
+        if not isinstance(fingerprint, Fingerprint_Record):
+            fingerprint = fingerprint.to_record()
+        # pickled once, the same bytes go to every worker
+        message = pickle.dumps((fingerprint, search_mode, candidates_n, top_k, min_score, dimensions), protocol=pickle.HIGHEST_PROTOCOL)
+
+        with self.__lock:
+            for connection in self.__connections:
+                connection.send_bytes(message)
+            hits = self.__gather()
+
+        return [hit for hit in hits if len(hit[0])]
+
+    def __gather(self) -> List:
+        """
+        return the answer of every worker; every answer is read before an error is raised, so the pipes stay in step.
+        """
+        answers = []
+        for shard, connection in enumerate(self.__connections):
+            try:
+                answers.append(connection.recv())
+            except EOFError:
+                answers.append(('error', RuntimeError(f"Shard worker {shard} exited")))
+
+        for status, value in answers:
+            if status == 'error':
+                raise value
+        return [value for status, value in answers]
+
+    def close(self, timeout: float = 5.0):
+        """
+        Stop the workers.
+        """
+        for connection in self.__connections:
+            try:
+                connection.send_bytes(_STOP)
+            except OSError:
+                pass
+        for worker in self.__workers:
+            worker.join(timeout)
+            if worker.is_alive(): worker.terminate()
+        for connection in self.__connections:
+            connection.close()
+        self.__connections = []
+        self.__workers = []
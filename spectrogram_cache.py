@@ -0,0 +1,154 @@
+"""
+Content-addressed spectrogram cache.
+
+Spectrograms are stored as .npy files named after a digest of the audio content and the
+STFT parameters, so the same audio is never transformed twice, whatever its path.
+float32 entries are memory mapped on load, uint8 entries trade precision (1/255) for 4x less disk.
+The cache directory is capped in size, least recently used entries are evicted first.
+"""
+from typing import Dict, Tuple, Union
+import os
+import json
+import hashlib
+import tempfile
+import numpy as np
+import processing_and_searching as ps
+import fingerprint_params as fparams
+
+cache_dir = 'Data/cache/spectrograms'
+max_cache_bytes = 2 * 1024 ** 3
+enabled = True
+
+def stft_params() -> Dict:
+    return {
+        'sample_rate': fparams.SAMPLE_RATE,
+        'analysis_seconds': fparams.ANALYSIS_SECONDS,
+        'n_fft': fparams.N_FFT,
+        'hop_length': fparams.HOP_LENGTH,
+    }
+
+class Spectrogram_Cache:
+    """
+Spectrogram cache on disk, see the module docstring.\n
+get() returns (spectrogram, sampling_rate) and computes + stores it on a miss.
+    """
+    def __init__(self, folder: str = None, max_bytes: int = None, dtype: str = None):
+        self.folder = folder or cache_dir
+        self.max_bytes = max_bytes if max_bytes is not None else max_cache_bytes
+        self.dtype = dtype or fparams.SPECTROGRAM_DTYPE
+        if self.dtype not in ('float32', 'uint8'):
+            raise ValueError(f"Invalid cache dtype '{self.dtype}'. Supported: 'float32', 'uint8'.")
+
+        # (path, size, mtime_ns) --> content digest, avoids re-reading files that are queried again
+        self.__digests: Dict[Tuple, str] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def content_digest(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        if key not in self.__digests:
+            self.__digests[key] = ps.file_digest(file_path)
+        return self.__digests[key]
+
+    def key(self, digest: str) -> str:
+        params = json.dumps(dict(stft_params(), dtype=self.dtype), sort_keys=True)
+        return hashlib.blake2b((digest + params).encode(), digest_size=16).hexdigest()
+
+    def __entry_path(self, key: str) -> str:
+        return os.path.join(self.folder, key + '.npy')
+
+    def load(self, key: str) -> Union[np.ndarray, None]:
+        path = self.__entry_path(key)
+        try:
+            if self.dtype == 'float32':
+                sg = np.load(path, mmap_mode='r')
+            else:
+                sg = np.load(path).astype(np.float32) / 255
+            # recently used entries are evicted last
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return sg
+
+    def store(self, key: str, sg: np.ndarray) -> np.ndarray:
+        """
+        Write the entry and return the spectrogram as it will be read back (quantized in uint8 mode).
+        """
+        os.makedirs(self.folder, exist_ok=True)
+        if self.dtype == 'uint8':
+            sg = np.round(np.clip(sg, 0, 1) * 255).astype(np.uint8)
+        else:
+            sg = np.asarray(sg, dtype=np.float32)
+
+        path = self.__entry_path(key)
+        # unique per writer: threads of one process may store the same key at once
+        fd, tmp_path = tempfile.mkstemp(dir=self.folder, prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as file:
+                np.save(file, sg)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path): os.remove(tmp_path)
+            raise
+
+        self.evict()
+
+        return sg.astype(np.float32) / 255 if self.dtype == 'uint8' else sg
+
+    def evict(self):
+        """
+        Delete least recently used entries until the cache fits in max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.folder) as it:
+            for entry in it:
+                if entry.name.endswith('.npy'):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                # entry in use by another process, try the next one
+                pass
+
+    def get(self, file_path: str, digest: str = None):
+        """
+        return (spectrogram, sampling_rate) of the analysed window of a file.\n
+        digest: content digest if already known (e.g. from the index manifest), computed otherwise.
+        """
+        key = self.key(digest or self.content_digest(file_path))
+        sg = self.load(key)
+
+        if sg is not None:
+            self.hits += 1
+            return sg, fparams.SAMPLE_RATE
+
+        self.misses += 1
+        audio, sr = ps.extract_audio_signal(file_path)
+        sg = self.store(key, ps.generate_spectrogram(audio))
+
+        return sg, sr
+
+__default_cache = None
+
+def get_spectrogram(file_path: str, digest: str = None):
+    """
+    return (spectrogram, sampling_rate) through the default cache, or computed directly if the cache is disabled.
+    """
+    global __default_cache
+
+    if not enabled:
+        audio, sr = ps.extract_audio_signal(file_path)
+        return ps.generate_spectrogram(audio), sr
+
+    if __default_cache is None:
+        __default_cache = Spectrogram_Cache()
+    return __default_cache.get(file_path, digest)
@@ -0,0 +1,201 @@
+"""
+Deterministic synthetic corpora for scale and load testing.
+
+index: random fingerprints shaped like the index profile, written into the same on-disk index
+       `database.refresh_index` produces, so `Match_Maker(index=index_store.load_index(path))`
+       searches them like a real library. Entry i only depends on (seed, i, n), so any chunking
+       or number of workers gives the same index. Millions of entries fit on a laptop with a
+       small peak count (real tracks carry ~85k peaks, the default here is 500).
+
+audio: short synthetic tracks (note sequences with harmonics + percussive noise) laid out
+       like Data/original_data (songs / vocals / music), plus query clips with a known answer:
+       noisy excerpts of one track and weighted mixes of two, listed in ground_truth.jsonl.
+
+usage: python synthetic_corpus.py index --n 1000000 --peaks 100 --output Data/index/synthetic.idx
+       python synthetic_corpus.py audio --tracks 30 --queries 60 --output Data/synthetic
+"""
+from typing import Dict, List
+import os
+import json
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import processing_and_searching as ps
+import fingerprint_params as fparams
+import database
+import index_store
+import landmarks
+import partitions
+from fingerprint_record import PEAK_DTYPE
+from lazy_imports import lazy_import
+
+sf = lazy_import('soundfile')
+
+N_FREQS = fparams.N_FFT // 2 + 1
+N_FRAMES = fparams.SAMPLE_RATE * fparams.ANALYSIS_SECONDS // fparams.HOP_LENGTH + 1
+
+def synthetic_fingerprint(i: int, seed: int = 0, n_peaks: int = 500, total: int = None) -> Dict:
+    """
+    return synthetic fingerprint number `i`, shaped like the index profile.\n
+    total: corpus size, the dimensions are assigned in contiguous blocks (one partition each), None --> round robin.
+    """
+    rng = np.random.default_rng((seed, i))
+
+    times = np.sort(rng.integers(0, N_FRAMES, n_peaks))
+    peaks = np.stack([rng.integers(1, N_FREQS - 1, n_peaks), times], axis=1).astype(PEAK_DTYPE)
+    # about 100 constellation points per entry, a few hundred landmarks
+    constellation = peaks[::max(1, n_peaks // 100)]
+
+    return {
+        'file_path': f'synthetic/{i:08d}.wav',
+        'audio_name': f'synthetic_{i:08d}',
+        'dimension': database.dim[i * len(database.dim) // total if total else i % len(database.dim)],
+        'raw_features': {
+            'spectral_centroid': float(rng.uniform(500, 5000)),
+            'spectral_contrast': rng.normal(20, 5, 7).tolist(),
+            'mfccs': rng.normal(0, 20, fparams.N_MFCC).tolist(),
+            'energy_envelope': ps.canonical_envelope(rng.random(N_FRAMES)),
+            'spectral_peaks': peaks,
+        },
+        'hash_str': rng.bytes(fparams.HASH_BITS // 8).hex(),
+        'landmarks': landmarks.generate_landmarks(constellation),
+    }
+
+def synthetic_fingerprints(n: int, seed: int = 0, n_peaks: int = 500, start: int = 0, total: int = None) -> List[Dict]:
+    return [synthetic_fingerprint(i, seed, n_peaks, total) for i in range(start, start + n)]
+
+def __pack_chunk(args):
+    start, n, seed, n_peaks, total = args
+    fingerprints = synthetic_fingerprints(n, seed, n_peaks, start, total)
+    return index_store.pack_fingerprints(fingerprints), database.hash_words_matrix(fingerprints)
+
+def write_corpus_index(file_path: str, n: int, seed: int = 0, n_peaks: int = 500, chunk_size: int = 10000, workers: int = 1):
+    """
+    Generate `n` synthetic fingerprints in chunks (packed as soon as they are generated, so only the
+    columnar arrays are kept) and write them as an index with its per-dimension partitions and hash words.\n
+    return the loaded index.
+    """
+    chunks = [(start, min(chunk_size, n - start), seed, n_peaks, n) for start in range(0, n, chunk_size)]
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            packed = list(pool.map(__pack_chunk, chunks))
+    else:
+        packed = [__pack_chunk(chunk) for chunk in chunks]
+
+    records, arrays = index_store.merge_packed([chunk for chunk, words in packed])
+    hash_words = np.concatenate([words for chunk, words in packed]) if packed else np.zeros((0, fparams.HASH_BITS // 64), dtype=np.uint64)
+    del packed
+
+    landmark_offsets = arrays['fp/landmarks/offsets'] if n else np.zeros(1, dtype=np.int64)
+    landmarks_per_track = np.split(arrays['fp/landmarks'], landmark_offsets[1:-1]) if n else []
+    extra_arrays = partitions.partition_arrays([record['dimension'] for record in records], landmarks_per_track, database.dim)
+    extra_arrays['hash/words'] = hash_words
+
+    sources = {'synthetic': {'n': n, 'seed': seed, 'peaks': n_peaks}}
+    index_store.write_packed(file_path, records, arrays, fparams.get_params(), sources, extra_arrays)
+
+    return index_store.load_index(file_path)
+
+def corpus_paths(folder: str) -> List[str]:
+    """
+    return the source folders of an audio corpus, in the order of database.dim (assign to database.paths).
+    """
+    return [os.path.join(folder, name) for name in ('songs', 'vocals', 'music')]
+
+def synthetic_track(rng: np.random.Generator, seconds: float, sr: int) -> np.ndarray:
+    """
+    return a peak normalized track: a random note sequence with decaying harmonics over a noise beat.
+    """
+    n = int(seconds * sr)
+    track = np.zeros(n, dtype=np.float32)
+    t = 0
+    while t < n:
+        length = int(rng.uniform(0.15, 0.8) * sr)
+        note = np.arange(min(length, n - t)) / sr
+        f0 = 440.0 * 2 ** ((rng.integers(40, 90) - 69) / 12)
+        tone = sum(np.sin(2 * np.pi * f0 * k * note) / k for k in range(1, 5) if f0 * k < sr / 2)
+        track[t:t + len(note)] += (tone * np.exp(-3 * note)).astype(np.float32)
+        t += length
+
+    beat = int(sr * 60 / rng.uniform(70, 160))
+    burst = int(0.05 * sr)
+    for start in range(int(rng.integers(0, beat)), n - burst, beat):
+        track[start:start + burst] += (rng.normal(0, 0.5, burst) * np.exp(-np.arange(burst) / (0.01 * sr))).astype(np.float32)
+
+    return track / np.max(np.abs(track))
+
+def write_audio_corpus(folder: str, n_tracks: int = 30, n_queries: int = 60, seconds: float = 20.0, sr: int = 22050,
+                       seed: int = 0, snr_db: float = 20.0) -> List[Dict]:
+    """
+    Write `n_tracks` synthetic tracks into corpus_paths(folder) and `n_queries` query clips into folder/queries.\n
+    Queries alternate between excerpts (one track, shifted by up to 2 s, noise at `snr_db`) and mixes of two
+    tracks with a random weight. return the ground truth entries, also written to folder/ground_truth.jsonl.
+    """
+    rng = np.random.default_rng(seed)
+    paths = corpus_paths(folder)
+    for path in paths + [os.path.join(folder, 'queries')]:
+        os.makedirs(path, exist_ok=True)
+
+    tracks = []
+    for i in range(n_tracks):
+        audio = synthetic_track(np.random.default_rng((seed, i)), seconds, sr)
+        file_path = os.path.join(paths[i % len(paths)], f'track_{i:05d}.wav')
+        sf.write(file_path, audio, sr)
+        tracks.append((os.path.normpath(file_path), audio))
+
+    clip = int(min(seconds - 2, fparams.ANALYSIS_SECONDS) * sr)
+    truth = []
+    for q in range(n_queries):
+        if q % 2 == 0 or n_tracks < 2:
+            i = int(rng.integers(n_tracks))
+            offset = int(rng.uniform(0, 2) * sr)
+            audio = tracks[i][1][offset:offset + clip]
+            noise = rng.normal(0, 1, len(audio)) * np.sqrt(np.mean(audio ** 2) / 10 ** (snr_db / 10))
+            audio = audio + noise.astype(np.float32)
+            entry = {'kind': 'excerpt', 'sources': [tracks[i][0]], 'weights': [1.0], 'offset_s': offset / sr, 'snr_db': snr_db}
+        else:
+            i, j = (int(k) for k in rng.choice(n_tracks, 2, replace=False))
+            w1 = round(float(rng.uniform(0.2, 0.8)), 2)
+            audio = ps.mix_signals(tracks[i][1][:clip], tracks[j][1][:clip], w1, 1 - w1)
+            entry = {'kind': 'mix', 'sources': [tracks[i][0], tracks[j][0]], 'weights': [w1, round(1 - w1, 2)]}
+
+        query_path = os.path.normpath(os.path.join(folder, 'queries', f'query_{q:05d}.wav'))
+        sf.write(query_path, audio / np.max(np.abs(audio)), sr)
+        truth.append(dict(entry, query=query_path))
+
+    with open(os.path.join(folder, 'ground_truth.jsonl'), 'w') as file:
+        for entry in truth:
+            file.write(json.dumps(entry) + '\n')
+
+    return truth
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Generate deterministic synthetic fingerprint indexes or audio corpora.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    index_parser = commands.add_parser('index', help="synthetic fingerprint index")
+    index_parser.add_argument('--n', type=int, required=True, help="number of fingerprints")
+    index_parser.add_argument('--peaks', type=int, default=500, help="spectral peaks per fingerprint")
+    index_parser.add_argument('--seed', type=int, default=0)
+    index_parser.add_argument('--chunk-size', type=int, default=10000)
+    index_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    index_parser.add_argument('--output', default='Data/index/synthetic.idx')
+
+    audio_parser = commands.add_parser('audio', help="synthetic tracks and queries with ground truth")
+    audio_parser.add_argument('--tracks', type=int, default=30)
+    audio_parser.add_argument('--queries', type=int, default=60)
+    audio_parser.add_argument('--seconds', type=float, default=20.0)
+    audio_parser.add_argument('--seed', type=int, default=0)
+    audio_parser.add_argument('--snr-db', type=float, default=20.0, help="noise level of the excerpt queries")
+    audio_parser.add_argument('--output', default='Data/synthetic')
+
+    args = parser.parse_args(argv)
+    if args.command == 'index':
+        index = write_corpus_index(args.output, args.n, args.seed, args.peaks, args.chunk_size, args.workers)
+        print(f"{len(index)} synthetic fingerprints written to {args.output}")
+    else:
+        truth = write_audio_corpus(args.output, args.tracks, args.queries, args.seconds, seed=args.seed, snr_db=args.snr_db)
+        print(f"{args.tracks} tracks and {len(truth)} queries written to {args.output}, see ground_truth.jsonl")
+
+if __name__ == '__main__':
+    main()
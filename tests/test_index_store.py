@@ -0,0 +1,38 @@
+import numpy as np
+import index_store
+import synthetic_corpus
+
+def test_round_trip(tmp_path):
+    fingerprints = synthetic_corpus.synthetic_fingerprints(12, total=12)
+    params, sources = {'sample_rate': 22050}, {'manifest': [{'file_path': 'a.wav'}]}
+    file_path = str(tmp_path / 'fingerprints.idx')
+
+    index_store.write_index(file_path, fingerprints, params, sources)
+    index = index_store.load_index(file_path)
+
+    assert len(index) == len(fingerprints)
+    assert index.params == params and index.sources == sources
+    for i, expected in enumerate(fingerprints):
+        fingerprint = index.fingerprint(i, as_list=False)
+        for key in index_store.META_KEYS:
+            assert fingerprint[key] == expected[key]
+        np.testing.assert_array_equal(fingerprint['landmarks'], expected['landmarks'])
+        np.testing.assert_array_equal(fingerprint['raw_features']['spectral_peaks'], expected['raw_features']['spectral_peaks'])
+        assert fingerprint['raw_features']['spectral_centroid'] == expected['raw_features']['spectral_centroid']
+        # fixed-length features are stored as float32
+        for name in ['mfccs', 'spectral_contrast', 'energy_envelope']:
+            np.testing.assert_allclose(fingerprint['raw_features'][name], expected['raw_features'][name], rtol=1e-6, atol=1e-4)
+
+def test_round_trip_empty(tmp_path):
+    file_path = str(tmp_path / 'empty.idx')
+    index_store.write_index(file_path, [], {}, {})
+
+    assert len(index_store.load_index(file_path)) == 0
+
+def test_rewrite_leaves_no_temp_files(tmp_path):
+    file_path = str(tmp_path / 'fingerprints.idx')
+    for n in [3, 5]:
+        index_store.write_index(file_path, synthetic_corpus.synthetic_fingerprints(n), {}, {})
+
+    assert len(index_store.load_index(file_path)) == 5
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['fingerprints.idx']
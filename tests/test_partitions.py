@@ -0,0 +1,57 @@
+import pytest
+import synthetic_corpus
+from fingerprint_record import Fingerprint_Record
+from matchmaker import Match_Maker
+
+N = 240
+
+@pytest.fixture(scope='module')
+def index(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp('index') / 'synthetic.idx')
+    return synthetic_corpus.write_corpus_index(file_path, N, n_peaks=200)
+
+@pytest.fixture(scope='module')
+def queries(index):
+    # stored entries of every partition and an unrelated fingerprint
+    return [Fingerprint_Record.from_fingerprint(index.fingerprint(i, as_list=False)) for i in (5, 100, 200)] + \
+           [Fingerprint_Record.from_fingerprint(synthetic_corpus.synthetic_fingerprint(0, seed=1, n_peaks=200))]
+
+def search_all(match_maker, queries, **kwargs):
+    return [match_maker.search_fingerprint(query, **kwargs) for query in queries]
+
+def assert_same_matches(results, expected):
+    """
+    Same matches in the same order; the float32 envelope products of a row slice may round differently.
+    """
+    assert len(results) == len(expected)
+    for matches, expected_matches in zip(results, expected):
+        assert [dict(match, score=None) for match in matches] == [dict(match, score=None) for match in expected_matches]
+        assert [match['score'] for match in matches] == pytest.approx([match['score'] for match in expected_matches], abs=1e-4)
+
+# with every track a candidate, the candidates of one process and of the partitions are the same
+@pytest.mark.parametrize('mode', ['scan', 'landmarks', 'lsh'])
+def test_partitioned_equals_single_process(index, queries, mode):
+    match_maker = Match_Maker(search_mode=mode, candidates_n=N, index=index)
+    try:
+        expected = search_all(match_maker, queries, top_k=20)
+        assert_same_matches(search_all(match_maker, queries, top_k=20, dimensions='all'), expected)
+        assert_same_matches(search_all(match_maker, queries, top_k=20, dimensions=['vocals', 'all']), expected)
+
+        everything = search_all(match_maker, queries)
+        for dimension in ['vocals', ['music', 'full_song']]:
+            names = [dimension] if isinstance(dimension, str) else dimension
+            filtered = [[match for match in matches if match['dimension'] in names] for matches in everything]
+            assert_same_matches(search_all(match_maker, queries, dimensions=dimension), filtered)
+    finally:
+        match_maker.close()
+
+@pytest.mark.parametrize('mode', ['scan', 'landmarks'])
+def test_sharded_equals_single_process(index, queries, mode):
+    match_maker = Match_Maker(search_mode=mode, candidates_n=N, index=index)
+    sharded = Match_Maker(search_mode=mode, candidates_n=N, index=index, shards=3)
+    try:
+        for kwargs in [{'top_k': 20}, {'top_k': 20, 'min_score': 30}, {'dimensions': 'music'}, {'top_k': 5, 'dimensions': ['vocals', 'music']}]:
+            assert_same_matches(search_all(sharded, queries, **kwargs), search_all(match_maker, queries, **kwargs))
+    finally:
+        sharded.close()
+        match_maker.close()
@@ -0,0 +1,51 @@
+import os
+import shutil
+import numpy as np
+import database
+import spectrogram_cache
+import synthetic_corpus
+
+def assert_same_index(index, expected):
+    assert index.records == expected.records
+    assert index.sources == expected.sources
+    assert sorted(index.arrays) == sorted(expected.arrays)
+    for name, array in expected.arrays.items():
+        np.testing.assert_array_equal(index.arrays[name], array, err_msg=name)
+
+def test_refresh_equals_rebuild(tmp_path, monkeypatch):
+    corpus = str(tmp_path / 'corpus')
+    synthetic_corpus.write_audio_corpus(corpus, n_tracks=6, n_queries=0, seconds=4.0)
+    synthetic_corpus.write_audio_corpus(str(tmp_path / 'extra'), n_tracks=1, n_queries=0, seconds=4.0, seed=1)
+    monkeypatch.setattr(database, 'paths', synthetic_corpus.corpus_paths(corpus))
+    monkeypatch.setattr(spectrogram_cache, 'enabled', False)
+    songs, vocals, music = database.paths
+
+    refreshed = str(tmp_path / 'refreshed.idx')
+    assert len(database.refresh_index(refreshed, verbose=False, workers=1)) == 6
+
+    # one file removed, one added, one touched with the same content
+    os.remove(os.path.join(vocals, 'track_00001.wav'))
+    shutil.copy(os.path.join(tmp_path, 'extra', 'songs', 'track_00000.wav'), os.path.join(music, 'track_00099.wav'))
+    touched = os.path.join(songs, 'track_00000.wav')
+    stat = os.stat(touched)
+    os.utime(touched, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    index = database.refresh_index(refreshed, verbose=False, workers=1)
+    rebuilt = database.build_index(str(tmp_path / 'rebuilt.idx'), workers=1)
+
+    assert len(index) == 6
+    assert_same_index(index, rebuilt)
+
+def test_refresh_of_current_index_keeps_it(tmp_path, monkeypatch):
+    corpus = str(tmp_path / 'corpus')
+    synthetic_corpus.write_audio_corpus(corpus, n_tracks=3, n_queries=0, seconds=4.0)
+    monkeypatch.setattr(database, 'paths', synthetic_corpus.corpus_paths(corpus))
+    monkeypatch.setattr(spectrogram_cache, 'enabled', False)
+
+    file_path = str(tmp_path / 'fingerprints.idx')
+    database.refresh_index(file_path, verbose=False, workers=1)
+    mtime = os.stat(file_path).st_mtime_ns
+
+    index = database.refresh_index(file_path, verbose=False, workers=1)
+    assert len(index) == 3
+    assert os.stat(file_path).st_mtime_ns == mtime
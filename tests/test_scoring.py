@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+import scoring
+import synthetic_corpus
+from fingerprint_record import Fingerprint_Record
+
+N = 300
+
+@pytest.fixture(scope='module')
+def db(tmp_path_factory):
+    file_path = str(tmp_path_factory.mktemp('index') / 'synthetic.idx')
+    return scoring.Database_Matrix.from_index(synthetic_corpus.write_corpus_index(file_path, N, n_peaks=200))
+
+@pytest.fixture(scope='module')
+def queries():
+    # one stored entry and one unrelated fingerprint
+    return [Fingerprint_Record.from_fingerprint(fp) for fp in
+            [synthetic_corpus.synthetic_fingerprint(7, n_peaks=200, total=N), synthetic_corpus.synthetic_fingerprint(0, seed=1, n_peaks=200)]]
+
+@pytest.mark.parametrize('quantile', [0.1, 0.5, 0.9, 0.99, 1.0])
+@pytest.mark.parametrize('subset', [False, True])
+def test_min_score_equals_unpruned(db, queries, quantile, subset):
+    ids = np.arange(0, N, 3) if subset else None
+    for query in queries:
+        full = db.score(query, ids)
+        min_score = float(np.quantile(full, quantile))
+        pruned = db.score(query, ids, min_score)
+
+        kept = full >= min_score
+        np.testing.assert_array_equal(pruned[kept], full[kept])
+        assert np.all(pruned[~kept] < min_score)
+        np.testing.assert_array_equal(scoring.top_k(pruned, 10, min_score), scoring.top_k(full, 10, min_score))
+
+def test_score_batch_equals_score(db, queries):
+    # the envelope terms come from one float32 matrix product, summed in another order
+    ids = np.arange(5, N, 7)
+    np.testing.assert_allclose(db.score_batch(queries), [db.score(query) for query in queries], atol=1e-4)
+    np.testing.assert_allclose(db.score_batch(queries, ids), [db.score(query, ids) for query in queries], atol=1e-4)
+
+@pytest.mark.parametrize('k', [None, 0, 1, 5, 50, 200, 500])
+def test_top_k_matches_stable_argsort(k):
+    rng = np.random.default_rng(0)
+    # rounded, so there are many ties to order by position
+    scores = np.round(rng.uniform(0, 100, 200))
+    expected = np.argsort(-scores, kind='stable')
+
+    np.testing.assert_array_equal(scoring.top_k(scores, k), expected if k is None else expected[:k])
+
+@pytest.mark.parametrize('k', [None, 3, 500])
+def test_top_k_min_score(k):
+    scores = np.round(np.random.default_rng(1).uniform(0, 100, 200))
+    expected = [i for i in np.argsort(-scores, kind='stable') if scores[i] >= 60]
+
+    np.testing.assert_array_equal(scoring.top_k(scores, k, 60), expected if k is None else expected[:k])
+    assert len(scoring.top_k(scores, k, 101)) == 0
@@ -0,0 +1,194 @@
+"""
+Low-overhead stage timers for the query path.
+
+Code marks its stages with `with timing.stage('stft'):`. Stages are only timed inside a
+`timing.collect()` block, which gathers them into a `Timing_Report` (per thread, so concurrent
+searches do not mix). Outside of one, a stage costs an attribute lookup.
+
+Finished reports are added to the rolling per-stage histograms `HISTOGRAMS`.
+`profiled()` wraps a block in cProfile and dumps the stats for snakeviz / pstats.
+"""
+from typing import Dict
+import os
+import time
+import threading
+import itertools
+import cProfile
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+
+#cProfile dumps of profiled searches
+profile_dir = 'Data/profiles'
+
+_local = threading.local()
+_dump_ids = itertools.count()
+
+def current_report():
+    """
+    return the report collected on this thread, None outside of `collect`.
+    """
+    return getattr(_local, 'report', None)
+
+class Timing_Report:
+    """
+Seconds and calls per stage of one search. Stages may nest (e.g. 'decode' inside 'fingerprint'),
+so stage times do not add up to the total.
+    """
+    __slots__ = ('seconds', 'calls', 'total')
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+        self.calls: Dict[str, int] = {}
+        self.total = 0.0
+
+    def add(self, name: str, seconds: float):
+        self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+        self.calls[name] = self.calls.get(name, 0) + 1
+
+    def merge(self, other: 'Timing_Report'):
+        """
+        Add the stages of `other` (e.g. a `task` run on a pool thread) to this report.
+        """
+        for name, seconds in other.seconds.items():
+            self.seconds[name] = self.seconds.get(name, 0.0) + seconds
+            self.calls[name] = self.calls.get(name, 0) + other.calls[name]
+
+    def as_dict(self) -> Dict:
+        return {'total_s': self.total,
+                'stages': {name: {'seconds': seconds, 'calls': self.calls[name]} for name, seconds in self.seconds.items()}}
+
+class stage:
+    """
+Context manager timing a named stage into the current report, no-op when nothing is collected.
+    """
+    __slots__ = ('name', 'report', 'start')
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.report = getattr(_local, 'report', None)
+        if self.report is not None:
+            self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.report is not None:
+            self.report.add(self.name, time.perf_counter() - self.start)
+        return False
+
+def timed(name: str):
+    """
+    Decorator timing every call of a function as stage `name`.
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+@contextmanager
+def collect():
+    """
+    Collect the stages run on this thread into a report.\n
+    Nested collect blocks share the outer report, only the outermost one is timed as a whole and
+    added to HISTOGRAMS.
+    """
+    report = current_report()
+    if report is not None:
+        yield report
+        return
+
+    report = Timing_Report()
+    _local.report = report
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.total = time.perf_counter() - start
+        _local.report = None
+        HISTOGRAMS.record(report)
+
+@contextmanager
+def task():
+    """
+    Collect the stages of a task run on a pool thread into its own report, not added to HISTOGRAMS.\n
+    Reports are per thread, the caller merges it into its report (Timing_Report.merge) on its own thread.
+    """
+    outer = current_report()
+    report = Timing_Report()
+    _local.report = report
+    start = time.perf_counter()
+    try:
+        yield report
+    finally:
+        report.total = time.perf_counter() - start
+        _local.report = outer
+
+class Rolling_Histogram:
+    """
+Durations of the last `window` runs of one stage.\n
+bounds: bucket edges in seconds, log spaced from 10 us to 100 s by default.
+    """
+    def __init__(self, window: int = 1024, bounds: np.ndarray = None):
+        self.values = deque(maxlen=window)
+        self.bounds = bounds if bounds is not None else np.logspace(-5, 2, 15)
+
+    def add(self, seconds: float):
+        self.values.append(seconds)
+
+    def summary(self) -> Dict:
+        values = np.fromiter(self.values, dtype=float, count=len(self.values))
+        if not len(values):
+            return {'count': 0}
+        p50, p90, p99 = np.percentile(values, [50, 90, 99])
+        counts, edges = np.histogram(values, bins=np.concatenate([[0.0], self.bounds, [np.inf]]))
+        return {'count': len(values), 'mean': float(values.mean()), 'p50': float(p50), 'p90': float(p90),
+                'p99': float(p99), 'max': float(values.max()),
+                'buckets': [{'le': float(edge), 'count': int(count)} for edge, count in zip(edges[1:], counts)]}
+
+class Stage_Histograms:
+    """
+Rolling histograms of every stage (and 'total') over the last `window` reports, thread safe.
+    """
+    def __init__(self, window: int = 1024):
+        self.window = window
+        self.histograms: Dict[str, Rolling_Histogram] = {}
+        self.__lock = threading.Lock()
+
+    def record(self, report: Timing_Report):
+        with self.__lock:
+            for name, seconds in list(report.seconds.items()) + [('total', report.total)]:
+                if name not in self.histograms:
+                    self.histograms[name] = Rolling_Histogram(self.window)
+                self.histograms[name].add(seconds)
+
+    def summary(self) -> Dict:
+        with self.__lock:
+            return {name: histogram.summary() for name, histogram in self.histograms.items()}
+
+    def clear(self):
+        with self.__lock:
+            self.histograms.clear()
+
+HISTOGRAMS = Stage_Histograms()
+
+@contextmanager
+def profiled(name: str = 'search', folder: str = None):
+    """
+    Run the block under cProfile and dump the stats to `folder`/<name>_<time>_<pid>_<n>.prof.\n
+    cProfile profiles one thread at a time, use it on one search at a time.
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        folder = folder or profile_dir
+        os.makedirs(folder, exist_ok=True)
+        profiler.dump_stats(os.path.join(folder, f"{name}_{time.strftime('%Y%m%d_%H%M%S')}_{os.getpid()}_{next(_dump_ids)}.prof"))